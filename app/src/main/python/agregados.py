@@ -0,0 +1,229 @@
+###
+# Estadísticas del historial calculadas en SQLite
+# Última medición, mínimo/máximo/media, medias mensuales y tendencia de los últimos días,
+# sin traer el historial a Python. Los totales y las medias mensuales salen de la tabla
+# resumen_mensual (una fila por tipo, sexo y mes, mantenida por disparadores; ver
+# _migracion_4 en utilidades.py), así que cuestan O(meses) y no O(mediciones).
+#
+# Las mediciones sin timestamp (fechas antiguas que no se pudieron interpretar) no
+# entran en los agregados por mes ni en la tendencia.
+###
+
+import time
+from datetime import datetime
+
+from utilidades import SEXOS_GUARDADOS, SQL_FIN_MES, conexion_base_datos, sql_codigo_sexo
+
+SQL_RESUMENES_OBSOLETOS = (
+    f"SELECT es_adulto, sexo, inicio, {SQL_FIN_MES.format(ts='inicio')} FROM resumen_mensual WHERE obsoleto = 1"
+)
+SQL_RECALCULAR_RESUMEN = (
+    "SELECT COUNT(*), TOTAL(imc), MIN(imc), MAX(imc), COUNT(percentil), TOTAL(percentil), MIN(percentil), "
+    "MAX(percentil) FROM perfiles WHERE (sexo IS NULL) = ? AND timestamp >= ? AND timestamp < ? "
+    f"AND {sql_codigo_sexo('sexo')} = ?"
+)
+SQL_ACTUALIZAR_RESUMEN = (
+    "UPDATE resumen_mensual SET mediciones = ?, suma_imc = ?, min_imc = ?, max_imc = ?, con_percentil = ?, "
+    "suma_percentil = ?, min_percentil = ?, max_percentil = ?, obsoleto = 0 "
+    "WHERE es_adulto = ? AND sexo = ? AND inicio = ?"
+)
+SQL_BORRAR_RESUMEN = "DELETE FROM resumen_mensual WHERE es_adulto = ? AND sexo = ? AND inicio = ?"
+
+# {filtro} restringe por sexo cuando se pide ("AND sexo = ?" o "")
+SQL_ESTADISTICAS = (
+    "SELECT TOTAL(mediciones), TOTAL(suma_imc), MIN(min_imc), MAX(max_imc), TOTAL(con_percentil), "
+    "TOTAL(suma_percentil), MIN(min_percentil), MAX(max_percentil) "
+    "FROM resumen_mensual WHERE es_adulto = ? {filtro}"
+)
+SQL_MEDIAS_MENSUALES = (
+    "SELECT inicio, SUM(mediciones), SUM(suma_imc), MIN(min_imc), MAX(max_imc), SUM(con_percentil), "
+    "SUM(suma_percentil) FROM resumen_mensual WHERE es_adulto = ? {filtro} "
+    "GROUP BY inicio ORDER BY inicio DESC LIMIT ?"
+)
+SQL_ULTIMA_MEDICION = (
+    "SELECT peso, altura, imc, fecha, sexo, edad_meses, percentil, timestamp FROM perfiles "
+    "WHERE (sexo IS NULL) = ? {filtro} ORDER BY timestamp DESC, id DESC LIMIT 1"
+)
+# Recta de mínimos cuadrados sobre (días desde el inicio de la ventana, valor), por el índice de timestamp
+SQL_TENDENCIA = (
+    "SELECT COUNT(x), TOTAL(x), TOTAL(y), TOTAL(x * x), TOTAL(x * y), MIN(x), MAX(x) FROM ("
+    "SELECT (timestamp - ?) / 86400.0 AS x, {columna} AS y FROM perfiles "
+    "WHERE (sexo IS NULL) = ? AND timestamp >= ? AND {columna} IS NOT NULL {filtro})"
+)
+# Separación mínima (en días) entre la primera y la última medición para dar una pendiente:
+# con mediciones de unos segundos de diferencia saldrían pendientes por día enormes
+DIAS_MINIMOS_TENDENCIA = 1
+
+CAMPOS_ULTIMA_MEDICION = ("peso", "altura", "imc", "fecha", "sexo", "edad_meses", "percentil", "timestamp")
+
+
+def _recalcular_obsoletos(conexion):
+    """Recalcula desde 'perfiles' los meses marcados como obsoletos por un borrado o una modificación."""
+    obsoletos = conexion.execute(SQL_RESUMENES_OBSOLETOS).fetchall()
+    for es_adulto, sexo, inicio, fin in obsoletos:
+        totales = conexion.execute(SQL_RECALCULAR_RESUMEN, (es_adulto, inicio, fin, sexo)).fetchone()
+        if totales[0]:
+            conexion.execute(SQL_ACTUALIZAR_RESUMEN, (*totales, es_adulto, sexo, inicio))
+        else:
+            conexion.execute(SQL_BORRAR_RESUMEN, (es_adulto, sexo, inicio))
+
+
+def _filtro_sexo(es_adulto, sexo, columna):
+    """(texto SQL, parámetros) para filtrar por sexo; ValueError si el sexo no es conocido."""
+    if sexo is None or es_adulto:
+        return "", ()
+    for codigo, textos in SEXOS_GUARDADOS.items():
+        if sexo in textos:
+            if columna == "sexo":
+                return f"AND {sql_codigo_sexo('sexo')} = ?", (codigo,)
+            return f"AND {columna} = ?", (codigo,)
+    raise ValueError(f"Sexo desconocido: {sexo}")
+
+
+def _ultima_medicion(conexion, es_adulto, sexo):
+    filtro, parametros = _filtro_sexo(es_adulto, sexo, "sexo")
+    fila = conexion.execute(SQL_ULTIMA_MEDICION.format(filtro=filtro), (es_adulto, *parametros)).fetchone()
+    return None if fila is None else dict(zip(CAMPOS_ULTIMA_MEDICION, fila))
+
+
+def _estadisticas(conexion, es_adulto, sexo):
+    filtro, parametros = _filtro_sexo(es_adulto, sexo, "resumen_mensual.sexo")
+    mediciones, suma_imc, min_imc, max_imc, con_percentil, suma_percentil, min_percentil, max_percentil = (
+        conexion.execute(SQL_ESTADISTICAS.format(filtro=filtro), (es_adulto, *parametros)).fetchone()
+    )
+    mediciones = int(mediciones)
+    estadisticas = {
+        "mediciones": mediciones,
+        "imc": {"media": suma_imc / mediciones if mediciones else None, "minimo": min_imc, "maximo": max_imc},
+    }
+    if not es_adulto:
+        con_percentil = int(con_percentil)
+        estadisticas["percentil"] = {
+            "media": suma_percentil / con_percentil if con_percentil else None,
+            "minimo": min_percentil,
+            "maximo": max_percentil,
+        }
+    return estadisticas
+
+
+def _medias_mensuales(conexion, es_adulto, sexo, meses):
+    filtro, parametros = _filtro_sexo(es_adulto, sexo, "resumen_mensual.sexo")
+    datos = conexion.execute(SQL_MEDIAS_MENSUALES.format(filtro=filtro), (es_adulto, *parametros, meses)).fetchall()
+    resultado = {"meses": [], "mediciones": [], "media_imc": [], "minimo_imc": [], "maximo_imc": []}
+    if not es_adulto:
+        resultado["media_percentil"] = []
+    for inicio, mediciones, suma_imc, min_imc, max_imc, con_percentil, suma_percentil in reversed(datos):
+        resultado["meses"].append(datetime.fromtimestamp(inicio))
+        resultado["mediciones"].append(mediciones)
+        resultado["media_imc"].append(suma_imc / mediciones)
+        resultado["minimo_imc"].append(min_imc)
+        resultado["maximo_imc"].append(max_imc)
+        if not es_adulto:
+            resultado["media_percentil"].append(suma_percentil / con_percentil if con_percentil else None)
+    return resultado
+
+
+def _tendencia(conexion, es_adulto, sexo, dias, ahora):
+    columna = "imc" if es_adulto else "percentil"
+    desde = int(ahora) - int(dias * 86400)
+    filtro, parametros = _filtro_sexo(es_adulto, sexo, "sexo")
+    n, sx, sy, sxx, sxy, primera, ultima = conexion.execute(
+        SQL_TENDENCIA.format(columna=columna, filtro=filtro), (desde, es_adulto, desde, *parametros)
+    ).fetchone()
+    pendiente = None
+    if n >= 2 and ultima - primera >= DIAS_MINIMOS_TENDENCIA:
+        pendiente = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+    return {
+        "dias": dias,
+        "columna": columna,
+        "mediciones": n,
+        "media": sy / n if n else None,
+        "pendiente_por_dia": pendiente,
+        "variacion": pendiente * dias if pendiente is not None else None,
+    }
+
+
+def _es_adulto(tipo_historial):
+    if tipo_historial not in ("adultos", "menores"):
+        raise ValueError(f"Tipo de historial no válido: {tipo_historial}")
+    return int(tipo_historial == "adultos")
+
+
+def obtener_ultima_medicion(tipo_historial, sexo=None):
+    """
+    Medición más reciente (dict con CAMPOS_ULTIMA_MEDICION) o None. Se lee por el
+    índice de timestamp, sin recorrer el historial.
+
+    Args:
+        tipo_historial (str): 'adultos' o 'menores'.
+        sexo: Solo menores de ese sexo ("Masculino"/"Femenino" o su texto localizado)
+    """
+    es_adulto = _es_adulto(tipo_historial)
+    with conexion_base_datos() as conexion:
+        return _ultima_medicion(conexion, es_adulto, sexo)
+
+
+def obtener_estadisticas_historial(tipo_historial, sexo=None) -> dict:
+    """
+    Número de mediciones y media, mínimo y máximo del IMC (y del percentil en menores).
+
+    Returns:
+        dict: {"mediciones": int, "imc": {"media", "minimo", "maximo"}, "percentil": {...} (menores)}
+    """
+    es_adulto = _es_adulto(tipo_historial)
+    with conexion_base_datos() as conexion:
+        _recalcular_obsoletos(conexion)
+        return _estadisticas(conexion, es_adulto, sexo)
+
+
+def obtener_medias_mensuales(tipo_historial, sexo=None, meses=12) -> dict:
+    """
+    Media, mínimo y máximo del IMC por mes natural (hora local), de los `meses` meses
+    más recientes con mediciones, del más antiguo al más reciente.
+
+    Returns:
+        dict: {"meses": [datetime de inicio], "mediciones", "media_imc", "minimo_imc",
+               "maximo_imc" y, en menores, "media_percentil"}
+    """
+    es_adulto = _es_adulto(tipo_historial)
+    with conexion_base_datos() as conexion:
+        _recalcular_obsoletos(conexion)
+        return _medias_mensuales(conexion, es_adulto, sexo, meses)
+
+
+def obtener_tendencia(tipo_historial, dias=30, sexo=None, ahora=None) -> dict:
+    """
+    Tendencia del IMC (adultos) o del percentil (menores) en los últimos `dias` días:
+    pendiente de la recta de mínimos cuadrados, en unidades por día. Solo recorre las
+    mediciones de la ventana, por el índice de timestamp.
+
+    Args:
+        ahora: Timestamp de referencia (por defecto, el actual)
+
+    Returns:
+        dict: {"dias", "columna", "mediciones", "media", "pendiente_por_dia" (None si
+               entre la primera y la última medición no pasa DIAS_MINIMOS_TENDENCIA),
+               "variacion" (pendiente * dias)}
+    """
+    es_adulto = _es_adulto(tipo_historial)
+    with conexion_base_datos() as conexion:
+        return _tendencia(conexion, es_adulto, sexo, dias, time.time() if ahora is None else ahora)
+
+
+def obtener_resumen_historial(tipo_historial, sexo=None, meses=12, dias_tendencia=30) -> dict:
+    """
+    Todas las estadísticas anteriores en una sola llamada (un solo cruce del puente
+    desde Kotlin y una sola toma de la conexión).
+
+    Returns:
+        dict: {"ultima": ..., "estadisticas": ..., "mensual": ..., "tendencia": ...}
+    """
+    es_adulto = _es_adulto(tipo_historial)
+    with conexion_base_datos() as conexion:
+        _recalcular_obsoletos(conexion)
+        return {
+            "ultima": _ultima_medicion(conexion, es_adulto, sexo),
+            "estadisticas": _estadisticas(conexion, es_adulto, sexo),
+            "mensual": _medias_mensuales(conexion, es_adulto, sexo, meses),
+            "tendencia": _tendencia(conexion, es_adulto, sexo, dias_tendencia, time.time()),
+        }
@@ -0,0 +1,168 @@
+###
+# Acceso asíncrono a la base de datos del historial
+# Todas las operaciones se ejecutan en un único hilo trabajador que consume una cola
+# de peticiones, de modo que quien llama (el hilo de la interfaz o un bucle asyncio)
+# nunca espera a un commit lento ni a un fetchall grande.
+#
+# Semántica:
+# - Las peticiones se ejecutan de una en una y en orden de llegada.
+# - Cancelar una petición (Future.cancel() o cancelar la tarea asyncio que la espera)
+#   solo tiene efecto si aún no ha empezado; una operación en curso termina
+#   (cada una es una transacción completa, nunca se aplica a medias).
+# - cerrar() deja de aceptar peticiones; por defecto ejecuta las pendientes antes de
+#   parar el hilo, o las cancela con cancelar_pendientes=True. Al salir del proceso se
+#   llama a cerrar() para que ninguna escritura encolada se pierda.
+###
+
+import asyncio
+import atexit
+import functools
+import queue
+import threading
+from concurrent.futures import Future
+
+import agregados
+import exportacion
+import utilidades
+
+# Marca en la cola que indica al hilo trabajador que debe terminar
+_FIN = object()
+
+
+class TrabajadorBaseDatos:
+    """Hilo único que ejecuta en orden las operaciones de base de datos encoladas."""
+
+    def __init__(self, nombre="imc-base-datos"):
+        self._cola = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._cerrado = False
+        self._hilo = threading.Thread(target=self._bucle, name=nombre, daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            peticion = self._cola.get()
+            if peticion is _FIN:
+                return
+            future, funcion, args, kwargs = peticion
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                resultado = funcion(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(resultado)
+
+    def enviar(self, funcion, *args, **kwargs) -> Future:
+        """
+        Encola funcion(*args, **kwargs) y devuelve enseguida un concurrent.futures.Future
+        con su resultado. Lanza RuntimeError si el trabajador ya está cerrado.
+        """
+        future = Future()
+        with self._lock:
+            if self._cerrado:
+                raise RuntimeError("El trabajador de base de datos está cerrado")
+            self._cola.put((future, funcion, args, kwargs))
+        return future
+
+    def vaciar(self, timeout=None):
+        """Espera a que terminen todas las peticiones encoladas hasta este momento."""
+        self.enviar(lambda: None).result(timeout)
+
+    def cerrar(self, cancelar_pendientes=False, timeout=None):
+        """
+        Deja de aceptar peticiones y para el hilo. Las pendientes se ejecutan antes
+        (vaciado) salvo que cancelar_pendientes sea True, en cuyo caso se cancelan.
+        """
+        with self._lock:
+            if self._cerrado:
+                return
+            self._cerrado = True
+            if cancelar_pendientes:
+                while True:
+                    try:
+                        peticion = self._cola.get_nowait()
+                    except queue.Empty:
+                        break
+                    peticion[0].cancel()
+            self._cola.put(_FIN)
+        if threading.current_thread() is not self._hilo:
+            self._hilo.join(timeout)
+
+    @property
+    def cerrado(self):
+        return self._cerrado
+
+
+_trabajador = None
+_lock_trabajador = threading.Lock()
+
+
+def obtener_trabajador() -> TrabajadorBaseDatos:
+    """Devuelve el trabajador compartido, creándolo (o recreándolo tras cerrarlo) si hace falta."""
+    global _trabajador
+    with _lock_trabajador:
+        if _trabajador is None or _trabajador.cerrado:
+            _trabajador = TrabajadorBaseDatos()
+        return _trabajador
+
+
+def cerrar_trabajador(cancelar_pendientes=False, timeout=None):
+    """Cierra el trabajador compartido (ver TrabajadorBaseDatos.cerrar)."""
+    with _lock_trabajador:
+        trabajador = _trabajador
+    if trabajador is not None:
+        trabajador.cerrar(cancelar_pendientes, timeout)
+
+
+atexit.register(cerrar_trabajador)
+
+
+def enviar_operacion(funcion, *args, **kwargs) -> Future:
+    """Ejecuta una función de utilidades en el hilo de base de datos; devuelve un Future."""
+    return obtener_trabajador().enviar(funcion, *args, **kwargs)
+
+
+def _asincrona(funcion):
+    """Versión corrutina de una operación síncrona de base de datos."""
+
+    @functools.wraps(funcion)
+    async def corrutina(*args, **kwargs):
+        return await asyncio.wrap_future(enviar_operacion(funcion, *args, **kwargs))
+
+    corrutina.__name__ = corrutina.__qualname__ = f"{funcion.__name__}_async"
+    return corrutina
+
+
+# Escritura
+guardar_medicion_async = _asincrona(utilidades.guardar_medicion)
+guardar_mediciones_lote_async = _asincrona(utilidades.guardar_mediciones_lote)
+
+# Historial
+mostrar_historial_async = _asincrona(utilidades.mostrar_historial)
+obtener_historial_adultos_async = _asincrona(utilidades.obtener_historial_adultos)
+obtener_historial_menores_async = _asincrona(utilidades.obtener_historial_menores)
+obtener_historial_columnas_async = _asincrona(utilidades.obtener_historial_columnas)
+obtener_pagina_historial_async = _asincrona(utilidades.obtener_pagina_historial)
+obtener_cambios_historial_async = _asincrona(utilidades.obtener_cambios_historial)
+
+# Gráfico
+obtener_datos_para_grafico_async = _asincrona(utilidades.obtener_datos_para_grafico)
+obtener_serie_agregada_async = _asincrona(utilidades.obtener_serie_agregada)
+
+# Borrado
+borrar_historial_adultos_async = _asincrona(utilidades.borrar_historial_adultos)
+borrar_historial_menores_async = _asincrona(utilidades.borrar_historial_menores)
+borrar_todos_historiales_async = _asincrona(utilidades.borrar_todos_historiales)
+
+# Exportación e importación
+exportar_historial_async = _asincrona(exportacion.exportar_historial)
+importar_historial_async = _asincrona(exportacion.importar_historial)
+
+# Estadísticas del historial
+obtener_ultima_medicion_async = _asincrona(agregados.obtener_ultima_medicion)
+obtener_estadisticas_historial_async = _asincrona(agregados.obtener_estadisticas_historial)
+obtener_medias_mensuales_async = _asincrona(agregados.obtener_medias_mensuales)
+obtener_tendencia_async = _asincrona(agregados.obtener_tendencia)
+obtener_resumen_historial_async = _asincrona(agregados.obtener_resumen_historial)
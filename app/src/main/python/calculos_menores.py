@@ -3,43 +3,389 @@
 # Incluye cálculo de percentiles usando tablas de la OMS
 ###
 
+import csv
 import io
-import pandas as pd
 import math
-from java import jclass
-from utilidades import convertir_peso_a_float, convertir_altura_a_metros, calcular_imc, calcular_edad_exacta_en_meses
-
-
-def cargar_percentiles(sexo):
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from statistics import NormalDist
+
+from clasificacion import TablaClasificacion
+from utilidades import (
+    convertir_peso_a_float,
+    convertir_altura_a_metros,
+    calcular_imc,
+    calcular_edad_exacta_en_meses,
+    calcular_edades_en_meses_batch,
+    convertir_pesos_a_float,
+    convertir_alturas_a_metros,
+    calcular_imc_array,
+    anotar_errores,
+)
+
+# Archivos CSV de la OMS (en los assets de la app) según el sexo
+ARCHIVOS_PERCENTILES = {
+    "Masculino": "percentiles_imc_niños.csv",
+    "Femenino": "percentiles_imc_niñas.csv",
+}
+
+# Directorio de assets del proyecto, usado como fuente fuera de Android (desarrollo/testing)
+DIRECTORIO_ASSETS_LOCAL = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assets"))
+
+# Rango de edad admitido para menores (5-19 años) y duración media de un mes según la OMS
+EDAD_MINIMA_MESES = 60
+EDAD_MAXIMA_MESES = 228
+DIAS_POR_MES = 30.4375
+
+# Tabla declarativa de la barra de percentiles de la OMS (ver TablaClasificacion):
+# cada frontera (3, 85, 97) ya pertenece al tramo superior.
+TRAMOS_PERCENTIL = (
+    {
+        "key": "bajo_peso",
+        "nombre": "Bajo peso",
+        "rango_texto": "<3",
+        "min_valor": 0.0,
+        "max_valor": 3.0,
+        "color": "#2196F3",  # Azul
+        "max_incluido": False,
+        "interpretacion": "interpretacion_bajo_peso",
+        "barra": (0.0, 0.15),
+    },
+    {
+        "key": "peso_saludable",
+        "nombre": "Peso saludable",
+        "rango_texto": "3-84",
+        "min_valor": 3.0,
+        "max_valor": 85.0,
+        "color": "#4CAF50",  # Verde
+        "max_incluido": False,
+        "interpretacion": "interpretacion_peso_saludable",
+        "barra": (0.15, 0.55),  # Más espacio por ser el rango más amplio
+    },
+    {
+        "key": "sobrepeso",
+        "nombre": "Sobrepeso",
+        "rango_texto": "85-96",
+        "min_valor": 85.0,
+        "max_valor": 97.0,
+        "color": "#FF9800",  # Naranja
+        "max_incluido": False,
+        "interpretacion": "interpretacion_sobrepeso",
+        "barra": (0.70, 0.20),
+    },
+    {
+        "key": "obesidad",
+        "nombre": "Obesidad",
+        "rango_texto": "≥97",
+        "min_valor": 97.0,
+        "max_valor": 100.0,  # Valor máximo para la barra
+        "color": "#D32F2F",  # Rojo
+        "max_incluido": False,
+        "interpretacion": "interpretacion_obesidad",
+        "barra": (0.90, 0.10),
+    },
+)
+CLASIFICACION_PERCENTIL = TablaClasificacion(TRAMOS_PERCENTIL)
+
+# Vistas de la tabla usadas por el cálculo por lotes
+FRONTERAS_PERCENTIL = CLASIFICACION_PERCENTIL.fronteras_categoria
+CLAVES_INTERPRETACION_PERCENTIL = CLASIFICACION_PERCENTIL.claves_interpretacion
+
+# Motores de búsqueda LMS disponibles: "estandar" usa solo la biblioteca estándar (csv/array/bisect)
+# y es el predeterminado; "pandas" reproduce la búsqueda original sobre el DataFrame
+MOTORES_LMS = ("estandar", "pandas")
+_motor_lms = "estandar"
+
+# Fuente usada cuando no se indica ninguna: None son los assets de Android; fuera del
+# dispositivo (p. ej. cribado_cohortes.py) se apunta al directorio de assets local
+_fuente_predeterminada = None
+
+# Caché en memoria de tablas LMS ya cargadas: (sexo, fuente) -> TablaLMS
+_tablas_lms = {}
+_tablas_lms_lock = threading.Lock()
+
+# Caché de curvas de referencia: (sexo, percentiles, resolución) -> dict de tuplas
+_curvas_percentiles = {}
+
+
+class TablaLMS:
     """
-    Carga la tabla de percentiles para el sexo dado desde un archivo CSV
-    almacenado en los assets de la aplicación usando Chaquopy.
+    Tabla de percentiles de la OMS para un sexo, guardada en arrays contiguos.
+    Se construye una sola vez; las búsquedas posteriores no hacen E/S ni parseo.
+    Incluye un índice denso mes -> fila que cubre al menos EDAD_MINIMA_MESES..EDAD_MAXIMA_MESES,
+    así que buscar la fila de una edad es indexar un array, sin recorrer la tabla.
     """
-    nombre_archivo = "percentiles_imc_niños.csv" if sexo == "Masculino" else "percentiles_imc_niñas.csv"
-    try:
-        context = jclass("android.app.ActivityThread").currentApplication()
-        asset_manager = context.getAssets()
-        input_stream = asset_manager.open(nombre_archivo)
-
-        # Leer el contenido usando Java BufferedReader
-        BufferedReader = jclass("java.io.BufferedReader")
-        InputStreamReader = jclass("java.io.InputStreamReader")
 
-        reader = BufferedReader(InputStreamReader(input_stream, "UTF-8"))
-        contenido = ""
+    __slots__ = ("sexo", "fuente", "meses", "L", "M", "S", "columnas", "mes_inicial", "indice_mes", "_por_dia")
+
+    def __init__(self, sexo, fuente, columnas):
+        for col in ("Month", "L", "M", "S"):
+            if col not in columnas:
+                raise ValueError(f"Columna '{col}' no encontrada en tabla de percentiles")
+        self.sexo = sexo
+        self.fuente = fuente
+        self.columnas = columnas
+        self.meses = array("i", (int(m) for m in columnas["Month"]))
+        self.L = columnas["L"]
+        self.M = columnas["M"]
+        self.S = columnas["S"]
+
+        # Fuera de [mes_inicial, mes_final] la fila más cercana es siempre la del extremo
+        self.mes_inicial = min(EDAD_MINIMA_MESES, self.meses[0])
+        mes_final = max(EDAD_MAXIMA_MESES, self.meses[-1])
+        self.indice_mes = array("i", (self._indice_bisect(m) for m in range(self.mes_inicial, mes_final + 1)))
+        self._por_dia = None
+
+    def __len__(self):
+        return len(self.meses)
+
+    def _indice_bisect(self, edad_meses):
+        """Búsqueda binaria de la fila más cercana; se usa para construir el índice denso."""
+        meses = self.meses
+        i = bisect_left(meses, edad_meses)
+        if i == 0:
+            return 0
+        if i == len(meses):
+            return i - 1
+        return i - 1 if edad_meses - meses[i - 1] <= meses[i] - edad_meses else i
+
+    def indice_mas_cercano(self, edad_meses):
+        """
+        Índice de la fila con el mes más cercano (en empate, la fila anterior, igual que idxmin).
+        Con edades enteras es un acceso O(1) al índice denso; por debajo o por encima
+        del rango cubierto devuelve la primera o la última fila.
+        """
+        if not isinstance(edad_meses, int):
+            return self._indice_bisect(edad_meses)
+        i = edad_meses - self.mes_inicial
+        if i < 0:
+            return 0
+        if i >= len(self.indice_mes):
+            return len(self.meses) - 1
+        return self.indice_mes[i]
+
+    def indices_mas_cercanos(self, edades_meses):
+        """Versión vectorizada de indice_mas_cercano para un array de edades enteras en meses."""
+        import numpy as np
+
+        indice_mes = np.frombuffer(self.indice_mes, dtype=np.intc)
+        return indice_mes[np.clip(edades_meses - self.mes_inicial, 0, len(indice_mes) - 1)]
+
+    def _construir_por_dia(self):
+        """
+        Interpola linealmente L, M y S entre meses consecutivos de la tabla para cada día
+        de edad, desde el primer día del mes inicial hasta el último mes cubierto.
+        """
+        meses, L, M, S = self.meses, self.L, self.M, self.S
+        dia_inicial = int(self.mes_inicial * DIAS_POR_MES)
+        dia_final = math.ceil((self.mes_inicial + len(self.indice_mes) - 1) * DIAS_POR_MES)
+        L_dia, M_dia, S_dia = array("d"), array("d"), array("d")
+        for dia in range(dia_inicial, dia_final + 1):
+            mes = dia / DIAS_POR_MES
+            j = min(max(bisect_left(meses, mes) - 1, 0), len(meses) - 2)
+            # Antes de la primera fila o después de la última se usan los valores del extremo
+            fraccion = min(max((mes - meses[j]) / (meses[j + 1] - meses[j]), 0.0), 1.0)
+            L_dia.append(L[j] + fraccion * (L[j + 1] - L[j]))
+            M_dia.append(M[j] + fraccion * (M[j + 1] - M[j]))
+            S_dia.append(S[j] + fraccion * (S[j + 1] - S[j]))
+        self._por_dia = (dia_inicial, L_dia, M_dia, S_dia)
+
+    def tabla_diaria(self):
+        """Devuelve (día inicial, L, M, S) de la tabla interpolada por días, construyéndola la primera vez."""
+        if self._por_dia is None:
+            self._construir_por_dia()
+        return self._por_dia
+
+    def lms_por_dia(self, edad_dias):
+        """
+        Devuelve (L, M, S) interpolados para una edad en días (resolución diaria).
+        Fuera del rango de la tabla diaria se usan los valores de los extremos.
+        """
+        dia_inicial, L_dia, M_dia, S_dia = self.tabla_diaria()
+        i = min(max(int(edad_dias) - dia_inicial, 0), len(L_dia) - 1)
+        return L_dia[i], M_dia[i], S_dia[i]
+
+
+def _leer_asset_android(nombre_archivo):
+    """Lee un archivo de los assets de la aplicación a través de Chaquopy."""
+    from java import jclass
+
+    context = jclass("android.app.ActivityThread").currentApplication()
+    input_stream = context.getAssets().open(nombre_archivo)
+
+    # Leer el contenido usando Java BufferedReader
+    BufferedReader = jclass("java.io.BufferedReader")
+    InputStreamReader = jclass("java.io.InputStreamReader")
+
+    reader = BufferedReader(InputStreamReader(input_stream, "UTF-8"))
+    try:
+        lineas = []
         linea = reader.readLine()
         while linea is not None:
-            contenido += linea + "\n"
+            lineas.append(linea)
             linea = reader.readLine()
-
+    finally:
         reader.close()
         input_stream.close()
+    return "\n".join(lineas) + "\n"
 
-        df = pd.read_csv(io.StringIO(contenido), sep=";", decimal=",")
-        return df
-    except Exception as e:
-        print(f"Error al cargar el archivo CSV '{nombre_archivo}': {e}")
+
+def _leer_csv_percentiles(nombre_archivo, fuente):
+    """
+    Devuelve el texto del CSV. Con fuente=None se leen los assets de Android;
+    con una ruta de directorio se lee del sistema de archivos.
+    """
+    if fuente is None:
+        return _leer_asset_android(nombre_archivo)
+    with open(os.path.join(fuente, nombre_archivo), encoding="utf-8") as f:
+        return f.read()
+
+
+def _parsear_csv_percentiles(contenido):
+    """Parsea el CSV de la OMS (separador ';' y coma decimal) a arrays de doubles por columna."""
+    lector = csv.reader(io.StringIO(contenido), delimiter=";")
+    cabecera = [nombre.strip() for nombre in next(lector)]
+    columnas = {nombre: array("d") for nombre in cabecera}
+    for fila in lector:
+        if not fila:
+            continue
+        for nombre, valor in zip(cabecera, fila):
+            columnas[nombre].append(float(valor.replace(",", ".")))
+    return columnas
+
+
+def obtener_tabla_lms(sexo, fuente=None):
+    """
+    Devuelve la TablaLMS del sexo dado, cargándola solo la primera vez.
+    Las cargas fallidas no se guardan en caché, de modo que se reintentan.
+
+    Args:
+        sexo: "Masculino" o "Femenino" (cualquier otro valor usa la tabla de niñas)
+        fuente: None para la fuente predeterminada (los assets de Android salvo que se
+                cambie con establecer_fuente_percentiles), o un directorio con los CSV
+
+    Returns:
+        TablaLMS o None si no se pudo cargar
+    """
+    if fuente is None:
+        fuente = _fuente_predeterminada
+    clave = (sexo, fuente)
+    tabla = _tablas_lms.get(clave)
+    if tabla is not None:
+        return tabla
+
+    nombre_archivo = ARCHIVOS_PERCENTILES["Masculino"] if sexo == "Masculino" else ARCHIVOS_PERCENTILES["Femenino"]
+    with _tablas_lms_lock:
+        tabla = _tablas_lms.get(clave)
+        if tabla is None:
+            try:
+                contenido = _leer_csv_percentiles(nombre_archivo, fuente)
+                tabla = TablaLMS(sexo, fuente, _parsear_csv_percentiles(contenido))
+            except Exception as e:
+                print(f"Error al cargar el archivo CSV '{nombre_archivo}': {e}")
+                return None
+            _tablas_lms[clave] = tabla
+    return tabla
+
+
+def instalar_tabla_lms(tabla, predeterminada=True):
+    """
+    Guarda en la caché una TablaLMS ya construida (p. ej. sobre memoria compartida en
+    los procesos de paralelo.py), de modo que obtener_tabla_lms no lee ningún CSV.
+    Con predeterminada, su fuente pasa a ser la usada cuando no se indica ninguna.
+    """
+    global _fuente_predeterminada
+    with _tablas_lms_lock:
+        _tablas_lms[(tabla.sexo, tabla.fuente)] = tabla
+        if predeterminada:
+            _fuente_predeterminada = tabla.fuente
+
+
+def invalidar_cache_percentiles(sexo=None, fuente=None):
+    """
+    Descarta tablas LMS cacheadas para forzar su recarga.
+    Sin argumentos vacía toda la caché; con sexo y/o fuente solo las que coinciden.
+    Las curvas de referencia derivadas de las tablas se descartan siempre.
+    """
+    with _tablas_lms_lock:
+        for clave in list(_tablas_lms):
+            if (sexo is None or clave[0] == sexo) and (fuente is None or clave[1] == fuente):
+                del _tablas_lms[clave]
+        _curvas_percentiles.clear()
+
+
+def establecer_fuente_percentiles(fuente):
+    """
+    Cambia la fuente de las tablas cuando no se indica ninguna: None para los assets
+    de Android o un directorio con los CSV (DIRECTORIO_ASSETS_LOCAL fuera del dispositivo).
+    """
+    global _fuente_predeterminada
+    with _tablas_lms_lock:
+        _fuente_predeterminada = fuente
+        _curvas_percentiles.clear()
+
+
+def precargar_percentiles(fuente=None):
+    """
+    Carga por adelantado las tablas de ambos sexos (p. ej. al arrancar la app).
+    Devuelve True si las dos tablas quedaron disponibles.
+    """
+    return all(obtener_tabla_lms(sexo, fuente) is not None for sexo in ARCHIVOS_PERCENTILES)
+
+
+def cargar_percentiles(sexo):
+    """
+    Devuelve la tabla de percentiles para el sexo dado como DataFrame.
+    Los datos salen de la caché de tablas LMS, así que el CSV solo se lee una vez.
+    pandas se importa aquí y no al cargar el módulo, para no penalizar el arranque.
+    """
+    tabla = obtener_tabla_lms(sexo)
+    if tabla is None:
+        return None
+
+    import pandas as pd
+
+    return pd.DataFrame(
+        {
+            nombre: list(tabla.meses) if nombre == "Month" else list(valores)
+            for nombre, valores in tabla.columnas.items()
+        }
+    )
+
+
+def seleccionar_motor_lms(motor):
+    """
+    Elige el motor usado por calcular_imc_menor y calcular_imc_menor_por_fecha.
+    Ambos motores leen la misma tabla cacheada y dan percentiles idénticos.
+
+    Args:
+        motor: "estandar" (predeterminado, sin pandas) o "pandas"
+    """
+    global _motor_lms
+    if motor not in MOTORES_LMS:
+        raise ValueError(f"Motor LMS desconocido: {motor}. Use uno de {MOTORES_LMS}")
+    _motor_lms = motor
+
+
+def _buscar_lms(sexo, edad_meses):
+    """
+    Devuelve (L, M, S) de la fila con el mes más cercano a edad_meses,
+    o None si la tabla de percentiles no se pudo cargar.
+    """
+    if _motor_lms == "pandas":
+        df = cargar_percentiles(sexo)
+        if df is None:
+            return None
+        fila_edad = df.iloc[abs(df["Month"] - edad_meses).idxmin()]
+        return float(fila_edad["L"]), float(fila_edad["M"]), float(fila_edad["S"])
+
+    tabla = obtener_tabla_lms(sexo)
+    if tabla is None:
         return None
+    i = tabla.indice_mas_cercano(edad_meses)
+    return tabla.L[i], tabla.M[i], tabla.S[i]
 
 
 def normal_cdf(x, mu=0, sigma=1):
@@ -47,16 +393,29 @@ def normal_cdf(x, mu=0, sigma=1):
     return 0.5 * (1 + math.erf((x - mu) / (sigma * math.sqrt(2))))
 
 
+def _z_score_y_percentil(imc, L, M, S):
+    """Aplica la fórmula LMS de la OMS y devuelve (z-score, percentil)."""
+    z_score = (((imc / M) ** L) - 1) / (L * S)
+    return z_score, normal_cdf(z_score) * 100
+
+
+def _normal_cdf_aproximada(z):
+    """
+    CDF normal vectorizada (Abramowitz y Stegun 7.1.26, error absoluto < 7.5e-8).
+    Solo se usa como primera pasada: los valores cercanos a una frontera se recalculan con normal_cdf.
+    """
+    import numpy as np
+
+    x = np.abs(z) / math.sqrt(2)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    polinomio = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - polinomio * np.exp(-x * x)
+    return 0.5 * (1.0 + np.copysign(erf, z))
+
+
 def interpretar_percentil(percentil):
     """Interpreta el percentil de IMC y devuelve una clave de recurso (no texto)."""
-    if percentil < 3:
-        return "interpretacion_bajo_peso"
-    elif percentil < 85:
-        return "interpretacion_peso_saludable"
-    elif percentil < 97:
-        return "interpretacion_sobrepeso"
-    else:
-        return "interpretacion_obesidad"
+    return CLASIFICACION_PERCENTIL.interpretacion(percentil)
 
 
 def calcular_imc_menor(sexo: str, edad_input, peso_input, altura_input) -> dict:  # noqa: C901
@@ -106,30 +465,14 @@ def calcular_imc_menor(sexo: str, edad_input, peso_input, altura_input) -> dict:
         except ValueError as e:
             return {"error": str(e)}
 
-        # Cargar percentiles
-        df = cargar_percentiles(sexo)
-        if df is None:
+        # Buscar los parámetros LMS de la fila más cercana a la edad en meses
+        lms = _buscar_lms(sexo, edad_meses)
+        if lms is None:
             return {"error": "No se pudieron cargar las tablas de percentiles"}
-
-        # Buscar la fila más cercana a la edad en meses
-        if "Month" not in df.columns:
-            return {"error": "Formato de tabla de percentiles inválido"}
-
-        fila_edad = df.iloc[abs(df["Month"] - edad_meses).idxmin()]
-
-        # Verificar que las columnas necesarias existen
-        columnas_necesarias = ["L", "M", "S"]
-        for col in columnas_necesarias:
-            if col not in df.columns:
-                return {"error": f"Columna '{col}' no encontrada en tabla de percentiles"}
-
-        L = fila_edad["L"]
-        M = fila_edad["M"]
-        S = fila_edad["S"]
+        L, M, S = lms
 
         # Calcular Z-score y percentil
-        z_score = (((imc / M) ** L) - 1) / (L * S)
-        percentil = normal_cdf(z_score) * 100
+        z_score, percentil = _z_score_y_percentil(imc, L, M, S)
         interpretacion = interpretar_percentil(percentil)
 
         return {
@@ -143,7 +486,9 @@ def calcular_imc_menor(sexo: str, edad_input, peso_input, altura_input) -> dict:
         return {"error": f"Error inesperado en cálculo: {str(e)}"}
 
 
-def calcular_imc_menor_por_fecha(sexo: str, fecha_nacimiento: str, peso_input, altura_input) -> dict:  # noqa: C901
+def calcular_imc_menor_por_fecha(  # noqa: C901
+    sexo: str, fecha_nacimiento: str, peso_input, altura_input, fecha_referencia=None
+) -> dict:
     """
     Calcula el percentil de IMC para un menor usando fecha de nacimiento.
 
@@ -152,6 +497,7 @@ def calcular_imc_menor_por_fecha(sexo: str, fecha_nacimiento: str, peso_input, a
         fecha_nacimiento: Fecha de nacimiento en formato DD/MM/YYYY o YYYY-MM-DD
         peso_input: Peso en kg (acepta formatos variados)
         altura_input: Altura en m o cm (acepta formatos variados)
+        fecha_referencia: datetime en el que se calcula la edad (por defecto, ahora)
 
     Returns:
         dict: {
@@ -166,15 +512,15 @@ def calcular_imc_menor_por_fecha(sexo: str, fecha_nacimiento: str, peso_input, a
 
         # Calcular edad exacta en meses
         try:
-            edad_meses = calcular_edad_exacta_en_meses(fecha_nacimiento)
+            edad_meses = calcular_edad_exacta_en_meses(fecha_nacimiento, fecha_referencia)
         except ValueError as e:
             return {"error": str(e)}
 
         # Validar rango de edad (5-19 años = 60-228 meses)
-        if edad_meses < 60:
+        if edad_meses < EDAD_MINIMA_MESES:
             edad_años = edad_meses / 12.0
             return {"error": f"La edad debe ser mayor a 5 años (actualmente {edad_años:.1f} años)"}
-        elif edad_meses > 228:
+        elif edad_meses > EDAD_MAXIMA_MESES:
             edad_años = edad_meses / 12.0
             return {"error": f"La edad debe ser menor a 19 años (actualmente {edad_años:.1f} años)"}
 
@@ -191,30 +537,14 @@ def calcular_imc_menor_por_fecha(sexo: str, fecha_nacimiento: str, peso_input, a
         except ValueError as e:
             return {"error": str(e)}
 
-        # Cargar percentiles
-        df = cargar_percentiles(sexo)
-        if df is None:
+        # Buscar los parámetros LMS de la fila más cercana a la edad en meses
+        lms = _buscar_lms(sexo, edad_meses)
+        if lms is None:
             return {"error": "No se pudieron cargar las tablas de percentiles"}
-
-        # Buscar la fila más cercana a la edad en meses
-        if "Month" not in df.columns:
-            return {"error": "Formato de tabla de percentiles inválido"}
-
-        fila_edad = df.iloc[abs(df["Month"] - edad_meses).idxmin()]
-
-        # Verificar que las columnas necesarias existen
-        columnas_necesarias = ["L", "M", "S"]
-        for col in columnas_necesarias:
-            if col not in df.columns:
-                return {"error": f"Columna '{col}' no encontrada en tabla de percentiles"}
-
-        L = fila_edad["L"]
-        M = fila_edad["M"]
-        S = fila_edad["S"]
+        L, M, S = lms
 
         # Calcular Z-score y percentil
-        z_score = (((imc / M) ** L) - 1) / (L * S)
-        percentil = normal_cdf(z_score) * 100
+        z_score, percentil = _z_score_y_percentil(imc, L, M, S)
         interpretacion = interpretar_percentil(percentil)
 
         edad_años = edad_meses / 12.0
@@ -231,47 +561,282 @@ def calcular_imc_menor_por_fecha(sexo: str, fecha_nacimiento: str, peso_input, a
         return {"error": f"Error inesperado en cálculo: {str(e)}"}
 
 
+def _edades_a_float(edades):
+    """Convierte una columna de edades en años como lo hace calcular_imc_menor, con un mensaje por fila inválida."""
+    import numpy as np
+
+    columna = np.asarray(edades)
+    mensajes = np.full(len(columna), None, dtype=object)
+    if columna.dtype.kind in "biuf":
+        floats = columna.astype(np.float64)
+    else:
+        floats = np.empty(len(columna), dtype=np.float64)
+        for i, valor in enumerate(columna):
+            try:
+                floats[i] = float(valor.replace(",", ".")) if isinstance(valor, str) else float(valor)
+            except (ValueError, TypeError):
+                floats[i] = np.nan
+    # int(nan * 12) falla en la versión escalar, así que NaN cuenta como formato inválido
+    for i in np.flatnonzero(np.isnan(floats)):
+        mensajes[i] = f"Formato de edad inválido: {columna[i]}"
+    return floats, mensajes
+
+
+def _evaluar_lms_array(sexos, edades_meses, imc, mensajes):
+    """
+    Aplica la fórmula LMS a todas las filas sin error usando las tablas cacheadas.
+    La CDF se calcula con _normal_cdf_aproximada; las filas cuyo percentil queda
+    a menos de 1e-4 de una frontera de redondeo o de interpretación se recalculan
+    con la fórmula escalar, así que el resultado coincide exactamente con ella.
+
+    Returns:
+        tuple: (z-scores, percentiles sin redondear, percentiles redondeados a 1 decimal)
+    """
+    import numpy as np
+
+    n = len(imc)
+    z_scores = np.full(n, np.nan)
+    percentiles = np.full(n, np.nan)
+    redondeados = np.full(n, np.nan)
+    fronteras = np.array(FRONTERAS_PERCENTIL)
+
+    for sexo in ARCHIVOS_PERCENTILES:
+        filas = np.flatnonzero((sexos == sexo) & np.equal(mensajes, None))
+        if len(filas) == 0:
+            continue
+        tabla = obtener_tabla_lms(sexo)
+        if tabla is None:
+            mensajes[filas] = "No se pudieron cargar las tablas de percentiles"
+            continue
+
+        indices = tabla.indices_mas_cercanos(edades_meses[filas])
+        L = np.frombuffer(tabla.L)[indices]
+        M = np.frombuffer(tabla.M)[indices]
+        S = np.frombuffer(tabla.S)[indices]
+        imc_filas = imc[filas]
+
+        z = (((imc_filas / M) ** L) - 1) / (L * S)
+        p = _normal_cdf_aproximada(z) * 100
+        escalado = p * 10
+        r = np.rint(escalado) / 10
+        dudosos = (np.abs(escalado - np.floor(escalado) - 0.5) < 1e-3) | (
+            np.abs(p[:, None] - fronteras).min(axis=1) < 1e-4
+        )
+        for j in np.flatnonzero(dudosos):
+            z_j, p_j = _z_score_y_percentil(float(imc_filas[j]), float(L[j]), float(M[j]), float(S[j]))
+            z[j], p[j] = z_j, p_j
+            # round() de un float de Python y no de np.float64, que redondea 12.35 a 12.4 en lugar de 12.3
+            r[j] = round(p_j, 1)
+
+        z_scores[filas] = z
+        percentiles[filas] = p
+        redondeados[filas] = r
+
+    return z_scores, percentiles, redondeados
+
+
+def calcular_imc_menor_batch(sexo, edad=None, peso=None, altura=None) -> dict:
+    """
+    Versión vectorizada de calcular_imc_menor para cohortes completas.
+    Los errores no se lanzan: cada fila inválida queda marcada en la máscara "error"
+    con el mismo mensaje que devolvería la función escalar.
+
+    Args:
+        sexo: Lista/array de "Masculino"/"Femenino", un único string para todas las filas,
+              o un DataFrame con columnas "sexo", "edad", "peso" y "altura"
+        edad: Edades en años (mismos formatos que calcular_imc_menor)
+        peso: Pesos en kg (acepta formatos variados)
+        altura: Alturas en m o cm (acepta formatos variados)
+
+    Returns:
+        dict de arrays numpy, una posición por fila: "imc", "z_score", "percentil",
+        "interpretacion", "edad_meses", "error" (bool) y "mensaje_error".
+        En las filas con error los valores son NaN, None o -1.
+    """
+    import numpy as np
+
+    if edad is None and peso is None and altura is None:
+        df = sexo
+        sexo, edad, peso, altura = df["sexo"], df["edad"], df["peso"], df["altura"]
+
+    edades, mensajes = _edades_a_float(edad)
+    n = len(edades)
+    sexos = np.full(n, sexo, dtype=object) if isinstance(sexo, str) else np.asarray(sexo, dtype=object)
+
+    # Mismo orden de validación que la versión escalar: sexo, edad, peso/altura e IMC
+    mensajes_edad = mensajes
+    mensajes = np.full(n, None, dtype=object)
+    anotar_errores(mensajes, (sexos != "Masculino") & (sexos != "Femenino"), "Sexo debe ser 'Masculino' o 'Femenino'")
+    anotar_errores(mensajes, np.not_equal(mensajes_edad, None), mensajes_edad)
+    anotar_errores(mensajes, (edades < 5) | (edades > 19), "La edad debe estar entre 5 y 19 años")
+    edad_meses = np.where(np.equal(mensajes, None), edades, 0.0)
+    edad_meses = (edad_meses * 12).astype(np.int64)
+
+    return _completar_lote_menores(sexos, edad_meses, mensajes, peso, altura)
+
+
+def _completar_lote_menores(sexos, edad_meses, mensajes, peso, altura):
+    """
+    Parte común de los cálculos por lotes de menores, una vez validados sexo y edad:
+    convierte peso y altura, calcula IMC y percentiles y arma el dict de resultados.
+    """
+    import numpy as np
+
+    pesos, mensajes_peso = convertir_pesos_a_float(peso)
+    alturas, mensajes_altura = convertir_alturas_a_metros(altura)
+    anotar_errores(mensajes, np.not_equal(mensajes_peso, None), mensajes_peso)
+    anotar_errores(mensajes, np.not_equal(mensajes_altura, None), mensajes_altura)
+    imc, mensajes_imc = calcular_imc_array(pesos, alturas)
+    anotar_errores(mensajes, np.not_equal(mensajes_imc, None), mensajes_imc)
+
+    z_scores, percentiles, redondeados = _evaluar_lms_array(sexos, edad_meses, imc, mensajes)
+
+    error = np.not_equal(mensajes, None)
+    claves = np.array(CLAVES_INTERPRETACION_PERCENTIL, dtype=object)
+    interpretacion = claves[np.searchsorted(FRONTERAS_PERCENTIL, percentiles, side="right")]
+    interpretacion[error] = None
+    imc[error] = np.nan
+    edad_meses[error] = -1
+
+    return {
+        "imc": imc,
+        "z_score": z_scores,
+        "percentil": redondeados,
+        "interpretacion": interpretacion,
+        "edad_meses": edad_meses,
+        "error": error,
+        "mensaje_error": mensajes,
+    }
+
+
+def _edades_por_fecha(fechas_nacimiento, fecha_referencia):
+    """
+    Edad en meses de cada fecha de nacimiento (-1 si no es válida) y su mensaje de error,
+    iguales a los de calcular_imc_menor_por_fecha.
+    """
+    import numpy as np
+
+    edad_meses, error, mensajes = calcular_edades_en_meses_batch(fechas_nacimiento, fecha_referencia)
+
+    # La versión escalar da los valores que no son texto como error inesperado (no tienen .strip())
+    for i in np.flatnonzero(error):
+        fecha = fechas_nacimiento[i]
+        if not isinstance(fecha, str):
+            mensajes[i] = f"Error inesperado en cálculo: '{type(fecha).__name__}' object has no attribute 'strip'"
+
+    fuera_de_rango = ~error & ((edad_meses < EDAD_MINIMA_MESES) | (edad_meses > EDAD_MAXIMA_MESES))
+    for i in np.flatnonzero(fuera_de_rango):
+        meses = int(edad_meses[i])
+        limite = "mayor a 5" if meses < EDAD_MINIMA_MESES else "menor a 19"
+        mensajes[i] = f"La edad debe ser {limite} años (actualmente {meses / 12.0:.1f} años)"
+    return edad_meses, mensajes
+
+
+def calcular_imc_menor_por_fecha_batch(sexo, fecha_nacimiento, peso, altura, fecha_referencia=None) -> dict:
+    """
+    Versión vectorizada de calcular_imc_menor_por_fecha, con los mismos mensajes de error
+    por fila que la función escalar (ver calcular_imc_menor_batch).
+
+    Args:
+        sexo: Lista/array de "Masculino"/"Femenino" o un único string para todas las filas
+        fecha_nacimiento: Fechas en los formatos de calcular_edad_exacta_en_meses
+        peso: Pesos en kg (acepta formatos variados)
+        altura: Alturas en m o cm (acepta formatos variados)
+        fecha_referencia: datetime en el que se calculan las edades (por defecto, ahora)
+
+    Returns:
+        dict de arrays numpy como calcular_imc_menor_batch, más "edad_años"
+    """
+    import numpy as np
+    from datetime import datetime
+
+    if fecha_referencia is None:
+        fecha_referencia = datetime.now()
+    edad_meses, mensajes_fecha = _edades_por_fecha(fecha_nacimiento, fecha_referencia)
+    n = len(edad_meses)
+    sexos = np.full(n, sexo, dtype=object) if isinstance(sexo, str) else np.asarray(sexo, dtype=object)
+
+    mensajes = np.full(n, None, dtype=object)
+    anotar_errores(mensajes, (sexos != "Masculino") & (sexos != "Femenino"), "Sexo debe ser 'Masculino' o 'Femenino'")
+    anotar_errores(mensajes, np.not_equal(mensajes_fecha, None), mensajes_fecha)
+    edad_meses = np.where(np.equal(mensajes, None), edad_meses, 0)
+
+    resultados = _completar_lote_menores(sexos, edad_meses, mensajes, peso, altura)
+    edad_años = np.round(resultados["edad_meses"] / 12.0, 1)
+    edad_años[resultados["error"]] = np.nan
+    resultados["edad_años"] = edad_años
+    return resultados
+
+
+def obtener_curvas_percentiles(sexo, percentiles=(3, 85, 97), resolucion="mes"):
+    """
+    Calcula el IMC correspondiente a cada percentil a lo largo de todo el rango
+    de edad (LMS inverso: IMC = M * (1 + L*S*z)^(1/L)), para dibujar bandas de
+    referencia detrás de la serie de un menor con una sola llamada.
+    El resultado se cachea por (sexo, percentiles, resolución).
+
+    Args:
+        sexo: "Masculino" o "Femenino"
+        percentiles: Percentiles a calcular (entre 0 y 100, exclusivos)
+        resolucion: "mes" (una fila de la tabla por mes, como calcular_imc_menor)
+                    o "dia" (L/M/S interpolados día a día)
+
+    Returns:
+        dict: {"edades_meses": tupla de edades, "percentiles": tupla de percentiles,
+               "imc": tupla con una tupla de IMCs por percentil} o {"error": str}
+    """
+    import numpy as np
+
+    if resolucion not in ("mes", "dia"):
+        return {"error": f"Resolución desconocida: {resolucion}. Use 'mes' o 'dia'"}
+    percentiles = tuple(float(p) for p in percentiles)
+    if any(not 0 < p < 100 for p in percentiles):
+        return {"error": "Los percentiles deben estar entre 0 y 100"}
+
+    clave = (sexo, percentiles, resolucion)
+    curvas = _curvas_percentiles.get(clave)
+    if curvas is not None:
+        return curvas
+
+    tabla = obtener_tabla_lms(sexo)
+    if tabla is None:
+        return {"error": "No se pudieron cargar las tablas de percentiles"}
+
+    if resolucion == "mes":
+        edades = np.arange(EDAD_MINIMA_MESES, EDAD_MAXIMA_MESES + 1)
+        filas = tabla.indices_mas_cercanos(edades)
+        L = np.frombuffer(tabla.L)[filas]
+        M = np.frombuffer(tabla.M)[filas]
+        S = np.frombuffer(tabla.S)[filas]
+    else:
+        dia_inicial, L_dia, M_dia, S_dia = tabla.tabla_diaria()
+        dias = np.arange(math.ceil(EDAD_MINIMA_MESES * DIAS_POR_MES), int(EDAD_MAXIMA_MESES * DIAS_POR_MES) + 1)
+        edades = dias / DIAS_POR_MES
+        L = np.frombuffer(L_dia)[dias - dia_inicial]
+        M = np.frombuffer(M_dia)[dias - dia_inicial]
+        S = np.frombuffer(S_dia)[dias - dia_inicial]
+
+    normal = NormalDist()
+    imc_por_percentil = []
+    for p in percentiles:
+        z = normal.inv_cdf(p / 100)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            imc = np.where(L == 0, M * np.exp(S * z), M * (1 + L * S * z) ** (1 / L))
+        imc_por_percentil.append(tuple(imc.tolist()))
+
+    curvas = {"edades_meses": tuple(edades.tolist()), "percentiles": percentiles, "imc": tuple(imc_por_percentil)}
+    _curvas_percentiles[clave] = curvas
+    return curvas
+
+
 def obtener_rangos_percentiles():
     """
     Devuelve los rangos de percentiles para la barra visual con sus respectivos datos.
     Basado en los estándares de la OMS para menores.
-    Retorna una lista de diccionarios con la información de cada rango.
-    Cada rango incluye ahora una clave 'key' estable para localizar el nombre en Android.
+    Retorna una lista de diccionarios (de solo lectura, compartidos entre llamadas)
+    con la información de cada rango, incluida la clave 'key' para localizar el nombre en Android.
     """
-    return [
-        {
-            "key": "bajo_peso",
-            "nombre": "Bajo peso",
-            "rango_texto": "<3",
-            "min_valor": 0.0,
-            "max_valor": 3.0,
-            "color": "#2196F3",  # Azul
-        },
-        {
-            "key": "peso_saludable",
-            "nombre": "Peso saludable",
-            "rango_texto": "3-84",
-            "min_valor": 3.0,
-            "max_valor": 85.0,
-            "color": "#4CAF50",  # Verde
-        },
-        {
-            "key": "sobrepeso",
-            "nombre": "Sobrepeso",
-            "rango_texto": "85-96",
-            "min_valor": 85.0,
-            "max_valor": 97.0,
-            "color": "#FF9800",  # Naranja
-        },
-        {
-            "key": "obesidad",
-            "nombre": "Obesidad",
-            "rango_texto": "≥97",
-            "min_valor": 97.0,
-            "max_valor": 100.0,  # Valor máximo para la barra
-            "color": "#D32F2F",  # Rojo
-        },
-    ]
+    return list(CLASIFICACION_PERCENTIL.rangos)
 
 
 def calcular_posicion_en_barra_percentil(percentil):
@@ -279,18 +844,7 @@ def calcular_posicion_en_barra_percentil(percentil):
     Calcula la posición relativa del percentil en la barra (de 0.0 a 1.0).
     Distribuye los rangos de manera proporcional en la barra.
     """
-    if percentil < 3:
-        # Rango bajo peso: 0% al 15% de la barra
-        return (percentil / 3.0) * 0.15
-    elif percentil < 85:
-        # Rango peso saludable: 15% al 70% de la barra (más espacio por ser el rango más amplio)
-        return 0.15 + ((percentil - 3.0) / (85.0 - 3.0)) * 0.55
-    elif percentil < 97:
-        # Rango sobrepeso: 70% al 90% de la barra
-        return 0.70 + ((percentil - 85.0) / (97.0 - 85.0)) * 0.20
-    else:
-        # Rango obesidad: 90% al 100% de la barra
-        return 0.90 + ((percentil - 97.0) / 3.0) * 0.10
+    return CLASIFICACION_PERCENTIL.posicion_en_barra(percentil)
 
 
 def obtener_categoria_percentil(percentil):
@@ -298,21 +852,9 @@ def obtener_categoria_percentil(percentil):
     Devuelve la categoría del percentil como un diccionario con información detallada.
     Esta es la función central que determina la categoría basada en los percentiles de la OMS.
     """
-    rangos = obtener_rangos_percentiles()
-
-    # Determinar categoría basada en el valor del percentil
-    if percentil < 3:
-        categoria = rangos[0]  # Bajo peso
-    elif percentil < 85:
-        categoria = rangos[1]  # Peso saludable
-    elif percentil < 97:
-        categoria = rangos[2]  # Sobrepeso
-    else:
-        categoria = rangos[3]  # Obesidad
-
     return {
-        "categoria": categoria,
-        "posicion": calcular_posicion_en_barra_percentil(percentil),
+        "categoria": CLASIFICACION_PERCENTIL.rango(percentil),
+        "posicion": CLASIFICACION_PERCENTIL.posicion_en_barra(percentil),
         "percentil_valor": round(percentil, 1),
     }
 
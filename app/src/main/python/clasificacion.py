@@ -0,0 +1,92 @@
+###
+# Motor de clasificación compartido por adultos (IMC) y menores (percentil)
+# Cada población declara una tabla de tramos; a partir de ella se construyen una vez,
+# al importar, las fronteras ordenadas y los rangos inmutables que se reutilizan
+# en todas las llamadas (categoría, interpretación y posición en la barra).
+###
+
+import math
+from bisect import bisect_right
+
+# Campos de cada rango devuelto a Kotlin (obtener_rangos_imc / obtener_rangos_percentiles)
+CAMPOS_RANGO = ("key", "nombre", "rango_texto", "min_valor", "max_valor", "color")
+
+
+class RangoCongelado(dict):
+    """
+    Diccionario de solo lectura con los datos de un rango de la barra. Sigue siendo
+    un dict (Kotlin lo lee con get/asMap), pero al compartirse entre llamadas
+    no se puede modificar.
+    """
+
+    __slots__ = ()
+
+    def _inmutable(self, *args, **kwargs):
+        raise TypeError("Los rangos de clasificación son de solo lectura")
+
+    __setitem__ = __delitem__ = __ior__ = _inmutable
+    clear = pop = popitem = setdefault = update = _inmutable
+
+    def __hash__(self):
+        return hash(tuple(self.items()))
+
+    def __reduce__(self):
+        return (RangoCongelado, (dict(self),))
+
+
+class TablaClasificacion:
+    """
+    Clasificador construido a partir de una tabla declarativa de tramos, ordenados
+    de menor a mayor. Cada tramo es un dict con los campos del rango de la barra
+    (CAMPOS_RANGO) y además:
+
+    - "max_incluido": la categoría cambia en max_valor; si es True, el propio
+      max_valor aún pertenece al tramo (se compara con <=).
+    - "interpretacion": clave de recurso de la interpretación.
+    - "barra": (inicio, fracción). En la barra el tramo va de su min_valor al
+      min_valor del siguiente, escala el valor entre min_valor y max_valor y ocupa
+      [inicio, inicio + fracción].
+    """
+
+    __slots__ = (
+        "rangos",
+        "claves",
+        "claves_interpretacion",
+        "fronteras_categoria",
+        "fronteras_barra",
+        "minimos",
+        "anchos",
+        "inicios_barra",
+        "fracciones_barra",
+    )
+
+    def __init__(self, tramos):
+        self.rangos = tuple(RangoCongelado((campo, tramo[campo]) for campo in CAMPOS_RANGO) for tramo in tramos)
+        self.claves = tuple(tramo["key"] for tramo in tramos)
+        self.claves_interpretacion = tuple(tramo["interpretacion"] for tramo in tramos)
+        self.fronteras_categoria = tuple(
+            math.nextafter(tramo["max_valor"], math.inf) if tramo["max_incluido"] else tramo["max_valor"]
+            for tramo in tramos[:-1]
+        )
+        self.fronteras_barra = tuple(tramo["min_valor"] for tramo in tramos[1:])
+        self.minimos = tuple(tramo["min_valor"] for tramo in tramos)
+        self.anchos = tuple(tramo["max_valor"] - tramo["min_valor"] for tramo in tramos)
+        self.inicios_barra = tuple(tramo["barra"][0] for tramo in tramos)
+        self.fracciones_barra = tuple(tramo["barra"][1] for tramo in tramos)
+
+    def indice(self, valor):
+        """Índice del tramo (categoría) al que pertenece el valor."""
+        return bisect_right(self.fronteras_categoria, valor)
+
+    def rango(self, valor):
+        return self.rangos[bisect_right(self.fronteras_categoria, valor)]
+
+    def interpretacion(self, valor):
+        return self.claves_interpretacion[bisect_right(self.fronteras_categoria, valor)]
+
+    def posicion_en_barra(self, valor):
+        """Posición relativa del valor en la barra visual (de 0.0 a 1.0)."""
+        tramo = bisect_right(self.fronteras_barra, valor)
+        return self.inicios_barra[tramo] + ((valor - self.minimos[tramo]) / self.anchos[tramo]) * (
+            self.fracciones_barra[tramo]
+        )
@@ -0,0 +1,210 @@
+###
+# Cribado de cohortes fuera del dispositivo (p. ej. todos los alumnos de un distrito)
+# Lee un CSV de (id, sexo, fecha de nacimiento, peso, altura) por bloques, calcula los
+# percentiles de cada bloque con calcular_imc_menor_por_fecha_batch y escribe los
+# resultados, con el error de cada fila inválida, en CSV o NDJSON. Solo hay un bloque
+# en memoria a la vez, así que el tamaño del fichero no está limitado por la RAM.
+#
+# Uso:
+#   python app/src/main/python/cribado_cohortes.py alumnos.csv resultados.csv --fecha-referencia 2025-09-15
+#   python app/src/main/python/cribado_cohortes.py - resultados.ndjson < alumnos.csv
+###
+
+import argparse
+import csv
+import json
+import math
+import sys
+import time
+from contextlib import ExitStack, nullcontext
+from datetime import datetime
+from itertools import islice
+
+from calculos_menores import DIRECTORIO_ASSETS_LOCAL, calcular_imc_menor_por_fecha_batch, establecer_fuente_percentiles
+from utilidades import SEXOS_GUARDADOS
+
+TAMANO_BLOQUE_CRIBADO = 50_000
+
+# Columnas de entrada: nombre canónico -> cabeceras aceptadas (sin distinguir mayúsculas)
+COLUMNAS_ENTRADA = {
+    "id": ("id", "identificador"),
+    "sexo": ("sexo", "sex"),
+    "fecha_nacimiento": ("fecha_nacimiento", "nacimiento", "date_of_birth", "dob", "birth_date"),
+    "peso": ("peso", "weight"),
+    "altura": ("altura", "height"),
+}
+COLUMNAS_SALIDA = ("id", "imc", "z_score", "percentil", "interpretacion", "edad_meses", "edad_años", "error")
+
+# Etiquetas de sexo de la interfaz y abreviaturas habituales -> valores de las tablas de la OMS
+SEXOS_ENTRADA = {
+    **{texto.casefold(): "Masculino" for texto in SEXOS_GUARDADOS[0]},
+    **{texto.casefold(): "Femenino" for texto in SEXOS_GUARDADOS[1]},
+    "m": "Masculino",
+    "h": "Masculino",
+    "f": "Femenino",
+}
+
+
+def _indices_columnas(cabecera):
+    """Posición en el CSV de cada columna de COLUMNAS_ENTRADA; ValueError si falta alguna."""
+    posiciones = {nombre.strip().casefold(): i for i, nombre in enumerate(cabecera)}
+    indices = {}
+    for columna, alias in COLUMNAS_ENTRADA.items():
+        encontrada = next((posiciones[a] for a in alias if a in posiciones), None)
+        if encontrada is None:
+            raise ValueError(f"Falta la columna '{columna}' (se acepta: {', '.join(alias)})")
+        indices[columna] = encontrada
+    return indices
+
+
+def iterar_bloques(filas, indices, tamano_bloque=TAMANO_BLOQUE_CRIBADO):
+    """Agrupa las filas del lector CSV en bloques de columnas {nombre: lista}."""
+    while True:
+        bloque = list(islice(filas, tamano_bloque))
+        if not bloque:
+            return
+        columnas = {}
+        for columna, i in indices.items():
+            columnas[columna] = [fila[i].strip() if i < len(fila) else "" for fila in bloque]
+        columnas["sexo"] = [SEXOS_ENTRADA.get(sexo.casefold(), sexo) for sexo in columnas["sexo"]]
+        yield columnas
+
+
+def cribar_bloque(columnas, fecha_referencia, calcular=calcular_imc_menor_por_fecha_batch) -> list[tuple]:
+    """
+    Evalúa un bloque y devuelve una tupla por fila en el orden de COLUMNAS_SALIDA.
+    `calcular` puede sustituirse por EjecutorParalelo.calcular_imc_menor_por_fecha_batch.
+    """
+    r = calcular(columnas["sexo"], columnas["fecha_nacimiento"], columnas["peso"], columnas["altura"], fecha_referencia)
+    # Pasar cada columna a lista una vez es mucho más rápido que indexar los arrays fila a fila
+    error = r["error"].tolist()
+    mensajes = r["mensaje_error"].tolist()
+    columnas_resultado = [r[nombre].tolist() for nombre in ("imc", "z_score", "percentil", "interpretacion")]
+    edad_meses = r["edad_meses"].tolist()
+    edad_años = r["edad_años"].tolist()
+    filas = []
+    for i, (identificador, imc, z, percentil, interpretacion) in enumerate(zip(columnas["id"], *columnas_resultado)):
+        if error[i]:
+            filas.append((identificador, None, None, None, None, None, None, mensajes[i]))
+        else:
+            filas.append(
+                (identificador, round(imc, 2), z, percentil, interpretacion, edad_meses[i], edad_años[i], None)
+            )
+    return filas
+
+
+class EscritorCsv:
+    def __init__(self, archivo):
+        self._escritor = csv.writer(archivo, lineterminator="\n")
+        self._escritor.writerow(COLUMNAS_SALIDA)
+
+    def escribir(self, filas):
+        self._escritor.writerows(filas)
+
+
+class EscritorNdjson:
+    def __init__(self, archivo):
+        self._archivo = archivo
+
+    def escribir(self, filas):
+        self._archivo.writelines(
+            json.dumps(dict(zip(COLUMNAS_SALIDA, fila)), ensure_ascii=False) + "\n" for fila in filas
+        )
+
+
+def cribar_archivo(
+    entrada,
+    salida,
+    formato="csv",
+    fecha_referencia=None,
+    tamano_bloque=TAMANO_BLOQUE_CRIBADO,
+    separador=",",
+    procesos=1,
+):
+    """
+    Criba un CSV ya abierto y escribe los resultados en `salida`. Con procesos > 1
+    cada bloque (de tamano_bloque filas por proceso) se reparte entre un grupo de
+    procesos (ver paralelo.py); el orden de salida sigue siendo el de la entrada.
+
+    Returns:
+        dict: {"filas": int, "errores": int, "segundos": float, "filas_por_segundo": float}
+    """
+    if fecha_referencia is None:
+        fecha_referencia = datetime.now()
+    lector = csv.reader(entrada, delimiter=separador)
+    cabecera = next(lector, None)
+    if cabecera is None:
+        raise ValueError("El fichero de entrada está vacío")
+    indices = _indices_columnas(cabecera)
+    escritor = EscritorCsv(salida) if formato == "csv" else EscritorNdjson(salida)
+
+    with ExitStack() as pila:
+        calcular = calcular_imc_menor_por_fecha_batch
+        if procesos > 1:
+            from paralelo import EjecutorParalelo
+
+            calcular = pila.enter_context(EjecutorParalelo(procesos)).calcular_imc_menor_por_fecha_batch
+            tamano_bloque *= procesos
+
+        filas = errores = 0
+        inicio = time.perf_counter()
+        for columnas in iterar_bloques(lector, indices, tamano_bloque):
+            resultados = cribar_bloque(columnas, fecha_referencia, calcular)
+            escritor.escribir(resultados)
+            filas += len(resultados)
+            errores += sum(1 for fila in resultados if fila[-1] is not None)
+        segundos = time.perf_counter() - inicio
+    return {
+        "filas": filas,
+        "errores": errores,
+        "segundos": segundos,
+        "filas_por_segundo": filas / segundos if segundos > 0 else math.inf,
+    }
+
+
+def _abrir(ruta, modo):
+    """Abre la ruta, o devuelve stdin/stdout para '-' (sin cerrarlos al salir del with)."""
+    if ruta == "-":
+        return nullcontext(sys.stdin if modo == "r" else sys.stdout)
+    return open(ruta, modo, encoding="utf-8", newline="")
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Cribado de IMC por percentiles de la OMS para una cohorte de menores")
+    parser.add_argument("entrada", help="CSV con id, sexo, fecha_nacimiento, peso y altura ('-' para stdin)")
+    parser.add_argument("salida", help="Fichero de resultados ('-' para stdout)")
+    parser.add_argument("--formato", choices=("csv", "ndjson"), help="Por defecto, según la extensión de la salida")
+    parser.add_argument(
+        "--fecha-referencia",
+        type=lambda texto: datetime.strptime(texto, "%Y-%m-%d"),
+        help="Fecha (YYYY-MM-DD) en la que se calculan las edades; por defecto, hoy",
+    )
+    parser.add_argument("--tamano-bloque", type=int, default=TAMANO_BLOQUE_CRIBADO, help="Filas por bloque")
+    parser.add_argument("--procesos", type=int, default=1, help="Procesos en paralelo (ver paralelo.py)")
+    parser.add_argument("--separador", default=",", help="Separador del CSV de entrada")
+    parser.add_argument("--assets", default=DIRECTORIO_ASSETS_LOCAL, help="Directorio con los CSV de la OMS")
+    args = parser.parse_args(argumentos)
+
+    formato = args.formato or ("ndjson" if args.salida.lower().endswith((".ndjson", ".jsonl")) else "csv")
+    fecha_referencia = args.fecha_referencia or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    establecer_fuente_percentiles(args.assets)
+
+    try:
+        with _abrir(args.entrada, "r") as entrada, _abrir(args.salida, "w") as salida:
+            resumen = cribar_archivo(
+                entrada, salida, formato, fecha_referencia, args.tamano_bloque, args.separador, args.procesos
+            )
+    except (OSError, ValueError, csv.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(
+        f"{resumen['filas']} filas ({resumen['errores']} con error) en {resumen['segundos']:.2f} s: "
+        f"{resumen['filas_por_segundo']:,.0f} filas/s (fecha de referencia {fecha_referencia:%Y-%m-%d})",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
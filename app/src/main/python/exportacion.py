@@ -0,0 +1,200 @@
+###
+# Exportación e importación del historial en CSV o NDJSON (un objeto JSON por línea)
+# Ambas funcionan como flujos: la exportación lee la tabla por lotes de id y escribe
+# cada lote en cuanto llega, y la importación lee el fichero línea a línea y lo pasa
+# a guardar_mediciones_lote, así que la memoria no depende del tamaño del historial.
+###
+
+import csv
+import json
+import os
+import sqlite3
+from itertools import islice
+
+from utilidades import TAMANO_LOTE_INSERCION, conexion_base_datos, guardar_mediciones_lote
+
+# Columnas del fichero exportado, en orden. El id solo sirve de referencia: al importar
+# las filas reciben ids nuevos, pero conservan el orden de inserción original.
+CAMPOS_EXPORTACION = ("id", "timestamp", "fecha", "peso", "altura", "imc", "sexo", "edad_meses", "percentil")
+FORMATOS_EXPORTACION = ("csv", "ndjson")
+
+# Filas leídas por consulta al exportar
+TAMANO_LOTE_EXPORTACION = 1000
+
+# Lotes por id (clave primaria): cada consulta es independiente, así la conexión
+# compartida no queda bloqueada durante toda la exportación
+SQL_EXPORTAR_HISTORIAL = "SELECT {columnas} FROM perfiles WHERE id > ? {filtro} ORDER BY id LIMIT ?"
+FILTROS_EXPORTACION = {
+    None: "",
+    "adultos": "AND sexo IS NULL",
+    "menores": "AND sexo IS NOT NULL",
+}
+
+
+def _formato_de(ruta, formato):
+    if formato is None:
+        formato = "ndjson" if str(ruta).lower().endswith((".ndjson", ".jsonl")) else "csv"
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato no soportado: {formato}")
+    return formato
+
+
+def iterar_filas_exportacion(tipo_historial=None, tamano_lote=TAMANO_LOTE_EXPORTACION):
+    """
+    Recorre el historial en orden de inserción y devuelve las filas una a una como
+    tuplas en el orden de CAMPOS_EXPORTACION.
+
+    Args:
+        tipo_historial: 'adultos', 'menores' o None para todo el historial
+        tamano_lote: Filas leídas por consulta
+    """
+    if tipo_historial not in FILTROS_EXPORTACION:
+        raise ValueError(f"Tipo de historial no válido: {tipo_historial}")
+    consulta = SQL_EXPORTAR_HISTORIAL.format(
+        columnas=", ".join(CAMPOS_EXPORTACION), filtro=FILTROS_EXPORTACION[tipo_historial]
+    )
+    ultimo_id = 0
+    while True:
+        with conexion_base_datos() as conexion:
+            datos = conexion.execute(consulta, (ultimo_id, tamano_lote)).fetchall()
+        yield from datos
+        if len(datos) < tamano_lote:
+            return
+        ultimo_id = datos[-1][0]
+
+
+def _escribir_csv(archivo, filas):
+    escritor = csv.writer(archivo, lineterminator="\n")
+    escritor.writerow(CAMPOS_EXPORTACION)
+    total = 0
+    for fila in filas:
+        # repr de un float es exacto, así que el valor vuelve idéntico al importarlo
+        escritor.writerow(fila)
+        total += 1
+    return total
+
+
+def _escribir_ndjson(archivo, filas):
+    total = 0
+    for fila in filas:
+        archivo.write(json.dumps(dict(zip(CAMPOS_EXPORTACION, fila)), ensure_ascii=False))
+        archivo.write("\n")
+        total += 1
+    return total
+
+
+def exportar_historial(destino, formato=None, tipo_historial=None, tamano_lote=TAMANO_LOTE_EXPORTACION) -> dict:
+    """
+    Escribe el historial en un fichero CSV (con cabecera) o NDJSON, fila a fila.
+
+    Args:
+        destino: Ruta del fichero o archivo de texto ya abierto
+        formato: 'csv', 'ndjson' o None para deducirlo de la extensión (por defecto CSV)
+        tipo_historial: 'adultos', 'menores' o None para todo el historial
+        tamano_lote: Filas leídas por consulta
+
+    Returns:
+        dict: {"exportadas": int} o {"error": str}
+    """
+    try:
+        formato = _formato_de(getattr(destino, "name", destino), formato)
+        if tipo_historial not in FILTROS_EXPORTACION:
+            raise ValueError(f"Tipo de historial no válido: {tipo_historial}")
+        filas = iterar_filas_exportacion(tipo_historial, tamano_lote)
+        escribir = _escribir_csv if formato == "csv" else _escribir_ndjson
+        if hasattr(destino, "write"):
+            return {"exportadas": escribir(destino, filas)}
+        # Se escribe en un temporal y se renombra: un fallo a medias no deja un fichero truncado
+        temporal = f"{destino}.tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8", newline="") as archivo:
+                exportadas = escribir(archivo, filas)
+            os.replace(temporal, destino)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+        return {"exportadas": exportadas}
+    except (OSError, ValueError) as e:
+        return {"error": str(e)}
+
+
+def _leer_csv(archivo):
+    lector = csv.reader(archivo)
+    cabecera = next(lector, None)
+    if cabecera is None:
+        return
+    for valores in lector:
+        # En CSV los valores nulos se exportan como campos vacíos
+        yield {campo: valor if valor != "" else None for campo, valor in zip(cabecera, valores)}
+
+
+def _leer_ndjson(archivo):
+    for linea in archivo:
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            yield json.loads(linea)
+        except json.JSONDecodeError:
+            # Fila ilegible: se pasa vacía para que guardar_mediciones_lote la rechace con su índice
+            yield {}
+
+
+def iterar_filas_importacion(archivo, formato="csv"):
+    """Lee un archivo de texto abierto y devuelve sus mediciones una a una como dicts."""
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato no soportado: {formato}")
+    return _leer_csv(archivo) if formato == "csv" else _leer_ndjson(archivo)
+
+
+def _importar_filas(filas, tamano_lote):
+    """
+    Pasa las filas a guardar_mediciones_lote de bloque en bloque y acumula el resumen,
+    de modo que si la lectura o la escritura fallan a medias se sabe qué quedó guardado.
+    """
+    resumen = {"insertadas": 0, "rechazadas": 0, "filas_rechazadas": []}
+    leidas = 0
+    try:
+        while True:
+            bloque = list(islice(filas, tamano_lote))
+            if bloque:
+                parcial = guardar_mediciones_lote(bloque, tamano_lote, conservar_fecha=True)
+                resumen["insertadas"] += parcial["insertadas"]
+                resumen["rechazadas"] += parcial["rechazadas"]
+                resumen["filas_rechazadas"] += [(leidas + i, motivo) for i, motivo in parcial["filas_rechazadas"]]
+                leidas += len(bloque)
+            if len(bloque) < tamano_lote:
+                return resumen
+    except (OSError, UnicodeDecodeError, ValueError, csv.Error, sqlite3.Error) as e:
+        resumen["error"] = str(e)
+    except Exception as e:
+        resumen["error"] = f"Error inesperado al importar: {e}"
+    return resumen
+
+
+def importar_historial(origen, formato=None, tamano_lote=TAMANO_LOTE_INSERCION) -> dict:
+    """
+    Añade al historial las mediciones de un fichero creado con exportar_historial.
+    Las filas se insertan en el orden del fichero y conservan su fecha y timestamp;
+    las inválidas se rechazan sin detener la importación.
+
+    Args:
+        origen: Ruta del fichero o archivo de texto ya abierto
+        formato: 'csv', 'ndjson' o None para deducirlo de la extensión (por defecto CSV)
+        tamano_lote: Filas por transacción
+
+    Returns:
+        dict: El resultado de guardar_mediciones_lote ({"insertadas", "rechazadas",
+              "filas_rechazadas"}; los índices empiezan en 0 en la primera fila de datos).
+              Si el fichero no se puede abrir, {"error": str}. Si falla a medias, los
+              bloques anteriores quedan guardados y se devuelven sus contadores junto con "error".
+    """
+    try:
+        formato = _formato_de(getattr(origen, "name", origen), formato)
+        if hasattr(origen, "read"):
+            return _importar_filas(iterar_filas_importacion(origen, formato), tamano_lote)
+        with open(origen, encoding="utf-8", newline="") as archivo:
+            return _importar_filas(iterar_filas_importacion(archivo, formato), tamano_lote)
+    except (OSError, ValueError) as e:
+        return {"error": str(e)}
@@ -4,37 +4,76 @@
 # Las funciones están organizadas en módulos separados para mejor mantenimiento
 ###
 
+from array import array
+
 # Importar todas las funciones de los módulos especializados usando importaciones absolutas
 from utilidades import (
     convertir_altura_a_metros,
     convertir_peso_a_float,
     calcular_imc,
+    normalizar_pesos,
+    normalizar_alturas,
     obtener_fecha,
     inicializar_base_de_datos,
     guardar_medicion,
+    guardar_mediciones_lote,
+    configurar_escritura_diferida,
+    vaciar_escrituras_pendientes,
     mostrar_historial,
     borrar_historial_adultos,
     borrar_historial_menores,
     obtener_datos_para_grafico,
+    obtener_serie_agregada,
     calcular_edad_exacta_en_meses,
+    calcular_edades_en_meses_batch,
     obtener_historial_adultos,
     obtener_historial_menores,
+    obtener_historial_columnas,
+    obtener_pagina_historial,
+    iterar_historial,
+    obtener_cambios_historial,
 )
 
-from calculos_adultos import interpretar_imc, obtener_rangos_imc, calcular_posicion_en_barra, obtener_categoria_imc
+from calculos_adultos import (
+    CLASIFICACION_IMC,
+    interpretar_imc,
+    obtener_rangos_imc,
+    calcular_posicion_en_barra,
+    obtener_categoria_imc,
+    calcular_imc_adulto_batch,
+)
 
 from calculos_menores import (
+    CLASIFICACION_PERCENTIL,
     cargar_percentiles,
+    precargar_percentiles,
+    invalidar_cache_percentiles,
+    seleccionar_motor_lms,
     normal_cdf,
     interpretar_percentil,
     calcular_imc_menor,
     calcular_imc_menor_por_fecha,
+    calcular_imc_menor_batch,
+    calcular_imc_menor_por_fecha_batch,
+    obtener_curvas_percentiles,
     obtener_rangos_percentiles,
     calcular_posicion_en_barra_percentil,
     obtener_categoria_percentil,
     interpretar_percentil_detallado,
 )
 
+from exportacion import exportar_historial, importar_historial
+
+from agregados import (
+    obtener_ultima_medicion,
+    obtener_estadisticas_historial,
+    obtener_medias_mensuales,
+    obtener_tendencia,
+    obtener_resumen_historial,
+)
+
+import instrumentacion
+
 # Re-exportar todas las funciones para mantener compatibilidad
 # Esto asegura que Kotlin pueda seguir llamando las funciones como antes
 __all__ = [
@@ -42,25 +81,39 @@ __all__ = [
     "convertir_altura_a_metros",
     "convertir_peso_a_float",
     "calcular_imc",
+    "normalizar_pesos",
+    "normalizar_alturas",
     "obtener_fecha",
     "inicializar_base_de_datos",
     "guardar_medicion",
+    "guardar_mediciones_lote",
+    "configurar_escritura_diferida",
+    "vaciar_escrituras_pendientes",
     "mostrar_historial",
     "borrar_historial_adultos",
     "borrar_historial_menores",
     "obtener_datos_para_grafico",
+    "obtener_serie_agregada",
     "calcular_edad_exacta_en_meses",
+    "calcular_edades_en_meses_batch",
     # Funciones para adultos
     "interpretar_imc",
     "obtener_rangos_imc",
     "calcular_posicion_en_barra",
     "obtener_categoria_imc",
+    "calcular_imc_adulto_batch",
     # Funciones para menores
     "cargar_percentiles",
+    "precargar_percentiles",
+    "invalidar_cache_percentiles",
+    "seleccionar_motor_lms",
     "normal_cdf",
     "interpretar_percentil",
     "calcular_imc_menor",
     "calcular_imc_menor_por_fecha",
+    "calcular_imc_menor_batch",
+    "calcular_imc_menor_por_fecha_batch",
+    "obtener_curvas_percentiles",
     # Funciones de la barra de percentiles para menores
     "obtener_rangos_percentiles",
     "calcular_posicion_en_barra_percentil",
@@ -69,4 +122,165 @@ __all__ = [
     # Funciones de historial separado
     "obtener_historial_adultos",
     "obtener_historial_menores",
+    "obtener_historial_columnas",
+    "obtener_pagina_historial",
+    "iterar_historial",
+    "obtener_cambios_historial",
+    # Exportación e importación del historial
+    "exportar_historial",
+    "importar_historial",
+    # Estadísticas del historial calculadas en SQLite
+    "obtener_ultima_medicion",
+    "obtener_estadisticas_historial",
+    "obtener_medias_mensuales",
+    "obtener_tendencia",
+    "obtener_resumen_historial",
 ]
+
+# Evaluación completa en una sola llamada desde Kotlin: en lugar de calcular, interpretar,
+# pedir los rangos (6 "get" por rango), la posición en la barra y volver a calcular para
+# guardar, cada pantalla cruza el puente una vez. Los rangos son constantes y se empaquetan
+# una sola vez: textos unidos por saltos de línea y números en array.array ("d" para
+# límites, "i" para colores ARGB, directamente convertibles a Int de Android).
+
+
+def _empaquetar_rangos(rangos):
+    def color_argb(color):
+        valor = int(color.lstrip("#"), 16) | 0xFF000000
+        return valor - (1 << 32) if valor >= 1 << 31 else valor
+
+    return {
+        "rangos_claves": "\n".join(rango["key"] for rango in rangos),
+        "rangos_nombres": "\n".join(rango["nombre"] for rango in rangos),
+        "rangos_textos": "\n".join(rango["rango_texto"] for rango in rangos),
+        "rangos_min": array("d", (rango["min_valor"] for rango in rangos)),
+        "rangos_max": array("d", (rango["max_valor"] for rango in rangos)),
+        "rangos_colores": array("i", (color_argb(rango["color"]) for rango in rangos)),
+    }
+
+
+RANGOS_EMPAQUETADOS_IMC = _empaquetar_rangos(obtener_rangos_imc())
+RANGOS_EMPAQUETADOS_PERCENTILES = _empaquetar_rangos(obtener_rangos_percentiles())
+
+# Referencias internas a las funciones originales: con la instrumentación activa los
+# nombres públicos del módulo pasan a ser envoltorios, y evaluar_* no debe contar como
+# llamadas propias de Kotlin las que hace por dentro
+_calcular_imc = calcular_imc
+_calcular_imc_menor_por_fecha = calcular_imc_menor_por_fecha
+_guardar_medicion = guardar_medicion
+
+
+def evaluar_imc_adulto(peso_input, altura_input, guardar=False, incluir_rangos=True) -> dict:
+    """
+    Calcula, clasifica y (opcionalmente) guarda una medición de adulto en una sola llamada.
+
+    Args:
+        peso_input, altura_input: Igual que en calcular_imc
+        guardar: Si es True, guarda la medición igual que guardar_medicion(peso, altura, imc)
+        incluir_rangos: Añadir los rangos de la barra (puede omitirse si ya se tienen)
+
+    Returns:
+        dict: {"imc", "categoria" (índice en obtener_rangos_imc()), "clave", "posicion",
+               "interpretacion", "guardado"} más los "rangos_*" de _empaquetar_rangos,
+               o {"error": mensaje} si los datos no son válidos
+    """
+    try:
+        imc = _calcular_imc(peso_input, altura_input)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    categoria = CLASIFICACION_IMC.indice(imc)
+    resultado = {
+        "imc": imc,
+        "categoria": categoria,
+        "clave": CLASIFICACION_IMC.claves[categoria],
+        "posicion": CLASIFICACION_IMC.posicion_en_barra(imc),
+        "interpretacion": CLASIFICACION_IMC.interpretacion(imc),
+        "guardado": False,
+    }
+    if guardar:
+        _guardar_medicion(peso_input, altura_input, imc)
+        resultado["guardado"] = True
+    if incluir_rangos:
+        resultado.update(RANGOS_EMPAQUETADOS_IMC)
+    return resultado
+
+
+def evaluar_imc_menor(
+    sexo, fecha_nacimiento, peso_input, altura_input, guardar=False, sexo_guardado=None, incluir_rangos=True
+) -> dict:
+    """
+    Equivalente de evaluar_imc_adulto para menores, a partir de la fecha de nacimiento.
+
+    Args:
+        sexo, fecha_nacimiento, peso_input, altura_input: Igual que en calcular_imc_menor_por_fecha
+        guardar: Si es True, guarda la medición con su edad en meses y percentil
+        sexo_guardado: Texto del sexo para el historial (por defecto `sexo`); Kotlin guarda el localizado
+        incluir_rangos: Añadir los rangos de la barra de percentiles
+
+    Returns:
+        dict: {"imc", "percentil", "edad_meses", "edad_años", "categoria" (índice en
+               obtener_rangos_percentiles()), "clave", "posicion", "interpretacion",
+               "guardado"} más los "rangos_*", o {"error": mensaje}
+    """
+    resultado = _calcular_imc_menor_por_fecha(sexo, fecha_nacimiento, peso_input, altura_input)
+    if "error" in resultado:
+        return resultado
+
+    percentil = resultado["percentil"]
+    categoria = CLASIFICACION_PERCENTIL.indice(percentil)
+    resultado["categoria"] = categoria
+    resultado["clave"] = CLASIFICACION_PERCENTIL.claves[categoria]
+    resultado["posicion"] = CLASIFICACION_PERCENTIL.posicion_en_barra(percentil)
+    resultado["guardado"] = False
+    if guardar:
+        _guardar_medicion(
+            peso_input,
+            altura_input,
+            resultado["imc"],
+            sexo_guardado or sexo,
+            resultado["edad_meses"],
+            percentil,
+        )
+        resultado["guardado"] = True
+    if incluir_rangos:
+        resultado.update(RANGOS_EMPAQUETADOS_PERCENTILES)
+    return resultado
+
+
+__all__ += ["evaluar_imc_adulto", "evaluar_imc_menor"]
+
+# Instrumentación opcional (ver instrumentacion.py): se envuelven las funciones públicas
+# anteriores, que son los puntos de entrada desde Kotlin, no las propias funciones de
+# control de la instrumentación. Por dentro se llaman con las referencias originales.
+FUNCIONES_INSTRUMENTADAS = tuple(__all__)
+
+
+def activar_instrumentacion():
+    """
+    Empieza a registrar llamadas, errores y latencias de las funciones públicas.
+    Mientras está desactivada Kotlin llama directamente a las funciones originales.
+    """
+    instrumentacion.activar(globals(), FUNCIONES_INSTRUMENTADAS)
+
+
+def desactivar_instrumentacion():
+    """Vuelve a las funciones originales conservando las estadísticas acumuladas."""
+    instrumentacion.desactivar(globals())
+
+
+def obtener_estadisticas(reiniciar=False) -> dict:
+    """
+    Instantánea de las estadísticas por función.
+
+    Args:
+        reiniciar: Si es True, pone los contadores a cero tras leerlos
+
+    Returns:
+        dict: {"activa": bool, "funciones": {nombre: {"llamadas", "errores", "total_ms",
+               "media_us", "max_us", "p50_us", "p90_us", "p99_us", "p999_us"}}}
+    """
+    return {"activa": instrumentacion.activa(), "funciones": instrumentacion.obtener_estadisticas(reiniciar)}
+
+
+__all__ += ["activar_instrumentacion", "desactivar_instrumentacion", "obtener_estadisticas"]
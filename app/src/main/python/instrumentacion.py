@@ -0,0 +1,226 @@
+###
+# Instrumentación opcional de las funciones públicas llamadas desde Kotlin
+# Cuenta llamadas y errores y guarda las latencias en un histograma logarítmico
+# (estilo HDR) del que se obtienen percentiles. Desactivada no cuesta nada:
+# las funciones originales solo se sustituyen por envoltorios al activarla.
+###
+
+import functools
+import inspect
+import threading
+import time
+
+# Subdivisiones por potencia de dos del histograma: error relativo máximo ~1/64 (1,6 %)
+SUBCUBETAS = 64
+BITS_SUBCUBETA = SUBCUBETAS.bit_length() - 1
+# Rango cubierto: BITS_MAXIMOS - BITS_SUBCUBETA + 1 = 35 tramos de SUBCUBETAS cubetas; la última
+# cubeta normal termina en 2^40 - 1 ns (~18,3 minutos) y lo que lo supere cuenta en ella
+BITS_MAXIMOS = 40
+PERCENTILES_INFORME = (50, 90, 99, 99.9)
+
+
+class HistogramaLatencias:
+    """
+    Histograma de latencias en nanosegundos con cubetas lineales dentro de cada
+    potencia de dos. Registrar un valor es O(1) y el tamaño no depende del número
+    de muestras (unas 64 cubetas por cada duplicación del rango).
+    """
+
+    __slots__ = ("cuentas", "total", "suma_ns", "maximo_ns")
+
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.cuentas = [0] * ((BITS_MAXIMOS - BITS_SUBCUBETA + 1) * SUBCUBETAS)
+        self.total = 0
+        self.suma_ns = 0
+        self.maximo_ns = 0
+
+    @staticmethod
+    def indice(valor_ns):
+        if valor_ns < SUBCUBETAS:
+            return valor_ns
+        desplazamiento = valor_ns.bit_length() - BITS_SUBCUBETA - 1
+        return (desplazamiento + 1) * SUBCUBETAS + (valor_ns >> desplazamiento) - SUBCUBETAS
+
+    @staticmethod
+    def limite_superior(indice):
+        """Mayor valor en nanosegundos que cae en la cubeta `indice`."""
+        if indice < SUBCUBETAS:
+            return indice
+        desplazamiento = indice // SUBCUBETAS - 1
+        return ((indice % SUBCUBETAS + SUBCUBETAS + 1) << desplazamiento) - 1
+
+    def registrar(self, valor_ns):
+        # Equivale a self.indice(valor_ns), desarrollado porque se ejecuta en cada llamada
+        if valor_ns < SUBCUBETAS:
+            indice = valor_ns
+        else:
+            desplazamiento = valor_ns.bit_length() - BITS_SUBCUBETA - 1
+            indice = desplazamiento * SUBCUBETAS + (valor_ns >> desplazamiento)
+        self.cuentas[min(indice, len(self.cuentas) - 1)] += 1
+        self.total += 1
+        self.suma_ns += valor_ns
+        if valor_ns > self.maximo_ns:
+            self.maximo_ns = valor_ns
+
+    def percentil(self, p):
+        """Latencia en nanosegundos por debajo de la cual queda el p % de las muestras."""
+        if not self.total:
+            return 0
+        objetivo = max(1, -(-self.total * p // 100))
+        acumulado = 0
+        for indice, cuenta in enumerate(self.cuentas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                if indice == len(self.cuentas) - 1:
+                    return self.maximo_ns
+                return min(self.limite_superior(indice), self.maximo_ns)
+        return self.maximo_ns
+
+
+class EstadisticasFuncion:
+    """Contadores de una función instrumentada."""
+
+    __slots__ = ("errores", "histograma")
+
+    def __init__(self):
+        self.errores = 0
+        self.histograma = HistogramaLatencias()
+
+    @property
+    def llamadas(self):
+        return self.histograma.total
+
+    def reiniciar(self):
+        self.errores = 0
+        self.histograma.reiniciar()
+
+    def resumen(self) -> dict:
+        histograma = self.histograma
+        resumen = {
+            "llamadas": histograma.total,
+            "errores": self.errores,
+            "total_ms": histograma.suma_ns / 1e6,
+            "media_us": histograma.suma_ns / histograma.total / 1e3 if histograma.total else 0.0,
+            "max_us": histograma.maximo_ns / 1e3,
+        }
+        for p in PERCENTILES_INFORME:
+            resumen[f"p{p:g}_us".replace(".", "")] = histograma.percentil(p) / 1e3
+        return resumen
+
+
+_estadisticas = {}
+_originales = {}
+_lock_estadisticas = threading.Lock()
+
+
+def _envolver(nombre, funcion):
+    reloj = time.perf_counter_ns
+    lock = _lock_estadisticas
+    # Las estadísticas se crean al envolver y se reinician en el sitio, así el
+    # envoltorio no busca nada en diccionarios en cada llamada
+    estadisticas = _estadisticas.setdefault(nombre, EstadisticasFuncion())
+    registrar = estadisticas.histograma.registrar
+
+    if inspect.isgeneratorfunction(funcion):
+        return _envolver_generador(funcion, estadisticas)
+
+    @functools.wraps(funcion)
+    def envoltorio(*args, **kwargs):
+        inicio = reloj()
+        error = True
+        try:
+            resultado = funcion(*args, **kwargs)
+            # Las funciones públicas devuelven {"error": ...} en lugar de lanzar excepciones
+            error = type(resultado) is dict and "error" in resultado
+            return resultado
+        finally:
+            duracion = reloj() - inicio
+            with lock:
+                registrar(duracion)
+                if error:
+                    estadisticas.errores += 1
+
+    return envoltorio
+
+
+def _envolver_generador(funcion, estadisticas):
+    """
+    Envoltorio de una función generadora: crearla no cuesta casi nada, así que se mide
+    el tiempo dentro del generador durante todo el recorrido (sin el del consumidor) y
+    se registra como una llamada al agotarlo o cerrarlo.
+    """
+    reloj = time.perf_counter_ns
+    lock = _lock_estadisticas
+    registrar = estadisticas.histograma.registrar
+
+    @functools.wraps(funcion)
+    def envoltorio(*args, **kwargs):
+        generador = funcion(*args, **kwargs)
+        duracion = 0
+        error = False
+        try:
+            while True:
+                inicio = reloj()
+                try:
+                    valor = next(generador)
+                except StopIteration:
+                    return
+                except Exception:
+                    error = True
+                    raise
+                finally:
+                    duracion += reloj() - inicio
+                yield valor
+        finally:
+            # Si el consumidor deja el recorrido a medias, se cierra también el original
+            generador.close()
+            with lock:
+                registrar(duracion)
+                if error:
+                    estadisticas.errores += 1
+
+    return envoltorio
+
+
+def activar(espacio_nombres, nombres):
+    """
+    Sustituye en `espacio_nombres` (p. ej. globals() de un módulo) cada función de
+    `nombres` por un envoltorio que registra sus estadísticas. Es idempotente.
+    """
+    with _lock_estadisticas:
+        for nombre in nombres:
+            if nombre in _originales:
+                continue
+            _originales[nombre] = espacio_nombres[nombre]
+            espacio_nombres[nombre] = _envolver(nombre, espacio_nombres[nombre])
+
+
+def desactivar(espacio_nombres):
+    """Restaura las funciones originales. Las estadísticas acumuladas se conservan."""
+    with _lock_estadisticas:
+        for nombre, funcion in _originales.items():
+            espacio_nombres[nombre] = funcion
+        _originales.clear()
+
+
+def activa() -> bool:
+    return bool(_originales)
+
+
+def obtener_estadisticas(reiniciar=False) -> dict:
+    """
+    Devuelve una instantánea {nombre_funcion: resumen} de las funciones llamadas
+    desde la activación (o desde el último reinicio).
+
+    Args:
+        reiniciar: Si es True, pone los contadores a cero tras tomar la instantánea
+    """
+    with _lock_estadisticas:
+        instantanea = {nombre: datos.resumen() for nombre, datos in sorted(_estadisticas.items()) if datos.llamadas}
+        if reiniciar:
+            for datos in _estadisticas.values():
+                datos.reiniciar()
+    return instantanea
@@ -0,0 +1,246 @@
+###
+# Ejecución en paralelo de los cálculos por lotes para cohortes muy grandes (fuera del dispositivo)
+# La entrada se parte en bloques que se reparten entre un grupo de procesos; los
+# resultados se devuelven en el orden de la entrada, igual que con la versión de un
+# solo proceso. Las tablas LMS se cargan una vez en el proceso principal y se copian
+# a un bloque de memoria compartida: cada proceso construye sus TablaLMS sobre esa
+# memoria en lugar de leer y parsear los CSV de nuevo.
+#
+# Los procesos se crean con "forkserver" (o "spawn"), no con "fork": el proceso
+# principal puede tener hilos activos (escritura diferida, base_datos_async).
+###
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from calculos_adultos import calcular_imc_adulto_batch
+from calculos_menores import (
+    ARCHIVOS_PERCENTILES,
+    TablaLMS,
+    calcular_imc_menor_batch,
+    calcular_imc_menor_por_fecha_batch,
+    instalar_tabla_lms,
+    obtener_tabla_lms,
+)
+
+# Filas por bloque enviado a un proceso. Por defecto se reparten unos BLOQUES_POR_PROCESO
+# bloques a cada proceso (para equilibrar la carga), sin bajar de TAMANO_BLOQUE_MINIMO
+# filas, con las que el envío entre procesos ya queda amortizado
+TAMANO_BLOQUE_PARALELO = 50_000
+TAMANO_BLOQUE_MINIMO = 5_000
+BLOQUES_POR_PROCESO = 4
+
+# Bytes por valor de las columnas de la tabla LMS (doubles)
+_BYTES_VALOR = 8
+
+# En cada proceso del grupo: memoria compartida adjuntada (se mantiene viva mientras el
+# proceso use las tablas construidas sobre ella)
+_memoria_trabajador = None
+
+
+def _compartir_tablas_lms():
+    """
+    Copia las tablas LMS de ambos sexos a un bloque de memoria compartida.
+
+    Returns:
+        tuple: (SharedMemory, descriptor picklable con su nombre y la posición de
+                cada columna: (nombre, [(sexo, fuente, [(columna, inicio, filas), ...]), ...]))
+    """
+    tablas = []
+    for sexo in ARCHIVOS_PERCENTILES:
+        tabla = obtener_tabla_lms(sexo)
+        if tabla is None:
+            raise RuntimeError("No se pudieron cargar las tablas de percentiles")
+        tablas.append(tabla)
+
+    total = sum(len(valores) for tabla in tablas for valores in tabla.columnas.values())
+    memoria = shared_memory.SharedMemory(create=True, size=max(total, 1) * _BYTES_VALOR)
+    doubles = memoria.buf.cast("d")
+    try:
+        posiciones = []
+        inicio = 0
+        for tabla in tablas:
+            columnas = []
+            for columna, valores in tabla.columnas.items():
+                doubles[inicio : inicio + len(valores)] = memoryview(valores)
+                columnas.append((columna, inicio, len(valores)))
+                inicio += len(valores)
+            posiciones.append((tabla.sexo, tabla.fuente, columnas))
+    finally:
+        doubles.release()
+    return memoria, (memoria.name, posiciones)
+
+
+def _iniciar_trabajador(descriptor):
+    """Inicializador de cada proceso: construye las TablaLMS sobre la memoria compartida."""
+    global _memoria_trabajador
+    nombre, posiciones = descriptor
+    _memoria_trabajador = shared_memory.SharedMemory(name=nombre)
+    doubles = _memoria_trabajador.buf.cast("d")
+    for sexo, fuente, columnas in posiciones:
+        valores = {columna: doubles[inicio : inicio + filas] for columna, inicio, filas in columnas}
+        instalar_tabla_lms(TablaLMS(sexo, fuente, valores))
+
+
+def _trocear(columna, inicio, fin):
+    """Bloque [inicio, fin) de una columna; los valores únicos (p. ej. un solo sexo) se repiten tal cual."""
+    if columna is None or isinstance(columna, str):
+        return columna
+    return columna[inicio:fin]
+
+
+def _unir_resultados(bloques):
+    """Concatena, en orden, los dicts de arrays devueltos por cada bloque."""
+    import numpy as np
+
+    if not bloques:
+        return {}
+    return {clave: np.concatenate([bloque[clave] for bloque in bloques]) for clave in bloques[0]}
+
+
+def _como_columna(valores):
+    """
+    Columna troceable sin perder el tipo: arrays numpy tal cual; listas y Series como array
+    numérico si todos sus valores son números, y si no (textos, mezclas, fechas) como array
+    de objetos, para que los valores sucios lleguen intactos a la función por lotes.
+    """
+    import numpy as np
+
+    if valores is None or isinstance(valores, (str, np.ndarray)):
+        return valores
+    try:
+        columna = np.asarray(valores)
+    except (ValueError, TypeError):
+        columna = None
+    if columna is not None and columna.dtype.kind in "biuf":
+        return columna
+    return np.asarray(valores, dtype=object)
+
+
+def _llamar(funcion, args, kwargs):
+    return funcion(*args, **kwargs)
+
+
+class EjecutorParalelo:
+    """
+    Grupo de procesos con las tablas LMS en memoria compartida. Se usa como gestor de
+    contexto para reutilizar los procesos en varias llamadas:
+
+        with EjecutorParalelo(procesos=16) as ejecutor:
+            resultado = ejecutor.calcular_imc_menor_batch(sexos, edades, pesos, alturas)
+
+    Cada método acepta los mismos argumentos que la función de un solo proceso y
+    devuelve el mismo dict de arrays, con las filas en el orden de la entrada.
+    """
+
+    def __init__(self, procesos=None, tamano_bloque=None, metodo_inicio=None):
+        if tamano_bloque is not None and tamano_bloque < 1:
+            raise ValueError("tamano_bloque debe ser mayor a 0")
+        self.procesos = procesos or os.cpu_count() or 1
+        self.tamano_bloque = tamano_bloque
+        if metodo_inicio is None:
+            metodo_inicio = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._metodo_inicio = metodo_inicio
+        self._memoria = None
+        self._grupo = None
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def iniciar(self):
+        if self._grupo is not None:
+            return
+        self._memoria, descriptor = _compartir_tablas_lms()
+        try:
+            self._grupo = ProcessPoolExecutor(
+                max_workers=self.procesos,
+                mp_context=multiprocessing.get_context(self._metodo_inicio),
+                initializer=_iniciar_trabajador,
+                initargs=(descriptor,),
+            )
+        except BaseException:
+            self._liberar_memoria()
+            raise
+
+    def cerrar(self):
+        if self._grupo is not None:
+            self._grupo.shutdown()
+            self._grupo = None
+        self._liberar_memoria()
+
+    def _liberar_memoria(self):
+        if self._memoria is not None:
+            self._memoria.close()
+            self._memoria.unlink()
+            self._memoria = None
+
+    def _ejecutar(self, funcion, columnas, kwargs):
+        """Reparte las columnas en bloques, ejecuta funcion en el grupo y une los resultados en orden."""
+        n = max((len(c) for c in columnas if c is not None and not isinstance(c, str)), default=0)
+        tamano_bloque = self.tamano_bloque or min(
+            TAMANO_BLOQUE_PARALELO, max(TAMANO_BLOQUE_MINIMO, -(-n // (self.procesos * BLOQUES_POR_PROCESO)))
+        )
+        if n <= tamano_bloque:
+            # Un solo bloque: no compensa enviarlo a otro proceso
+            return funcion(*columnas, **kwargs)
+        self.iniciar()
+        tareas = [
+            self._grupo.submit(
+                _llamar, funcion, [_trocear(columna, inicio, inicio + tamano_bloque) for columna in columnas], kwargs
+            )
+            for inicio in range(0, n, tamano_bloque)
+        ]
+        return _unir_resultados([tarea.result() for tarea in tareas])
+
+    def calcular_imc_menor_batch(self, sexo, edad=None, peso=None, altura=None) -> dict:
+        if edad is None and peso is None and altura is None:
+            df = sexo
+            sexo, edad, peso, altura = df["sexo"], df["edad"], df["peso"], df["altura"]
+        columnas = [_como_columna(sexo), _como_columna(edad), _como_columna(peso), _como_columna(altura)]
+        return self._ejecutar(calcular_imc_menor_batch, columnas, {})
+
+    def calcular_imc_menor_por_fecha_batch(self, sexo, fecha_nacimiento, peso, altura, fecha_referencia=None) -> dict:
+        from datetime import datetime
+
+        # La fecha de referencia se fija aquí para que todos los bloques usen la misma
+        kwargs = {"fecha_referencia": fecha_referencia or datetime.now()}
+        columnas = [_como_columna(sexo), _como_columna(fecha_nacimiento), _como_columna(peso), _como_columna(altura)]
+        return self._ejecutar(calcular_imc_menor_por_fecha_batch, columnas, kwargs)
+
+    def calcular_imc_adulto_batch(self, pesos, alturas=None) -> dict:
+        if alturas is None:
+            df = pesos
+            pesos, alturas = df["peso"], df["altura"]
+        return self._ejecutar(calcular_imc_adulto_batch, [_como_columna(pesos), _como_columna(alturas)], {})
+
+
+def calcular_imc_menor_batch_paralelo(sexo, edad=None, peso=None, altura=None, procesos=None) -> dict:
+    """calcular_imc_menor_batch repartido entre `procesos` procesos (por defecto, uno por CPU)."""
+    if procesos == 1:
+        return calcular_imc_menor_batch(sexo, edad, peso, altura)
+    with EjecutorParalelo(procesos) as ejecutor:
+        return ejecutor.calcular_imc_menor_batch(sexo, edad, peso, altura)
+
+
+def calcular_imc_menor_por_fecha_batch_paralelo(
+    sexo, fecha_nacimiento, peso, altura, fecha_referencia=None, procesos=None
+) -> dict:
+    """calcular_imc_menor_por_fecha_batch repartido entre `procesos` procesos."""
+    if procesos == 1:
+        return calcular_imc_menor_por_fecha_batch(sexo, fecha_nacimiento, peso, altura, fecha_referencia)
+    with EjecutorParalelo(procesos) as ejecutor:
+        return ejecutor.calcular_imc_menor_por_fecha_batch(sexo, fecha_nacimiento, peso, altura, fecha_referencia)
+
+
+def calcular_imc_adulto_batch_paralelo(pesos, alturas=None, procesos=None) -> dict:
+    """calcular_imc_adulto_batch repartido entre `procesos` procesos."""
+    if procesos == 1:
+        return calcular_imc_adulto_batch(pesos, alturas)
+    with EjecutorParalelo(procesos) as ejecutor:
+        return ejecutor.calcular_imc_adulto_batch(pesos, alturas)
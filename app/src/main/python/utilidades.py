@@ -3,10 +3,86 @@
 # Funciones de conversión, validación y utilidades compartidas
 ###
 
+import atexit
+import math
 import sqlite3
+import threading
+import time
+from array import array
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import islice
 import re
 
+# Conexión SQLite compartida por todo el proceso y ruta de la base de datos ya resuelta.
+# El acceso se serializa con _lock_db porque Kotlin puede llamar desde distintos hilos.
+_conexion = None
+_ruta_db = None
+_lock_db = threading.RLock()
+
+# Escritura diferida opcional de guardar_medicion (ver configurar_escritura_diferida):
+# filas ya preparadas a la espera de que un hilo escritor las inserte juntas en una
+# sola transacción. _condicion_pendientes avisa a ese hilo de que hay trabajo.
+_pendientes = []
+_inicio_pendientes = 0.0
+_lock_pendientes = threading.Lock()
+_condicion_pendientes = threading.Condition(_lock_pendientes)
+_hilo_escritor = None
+_escritura_diferida = None  # (máximo de filas pendientes, espera máxima en segundos) o None
+
+# Formato de texto de la columna 'fecha'
+FORMATO_FECHA = "%d-%m-%Y %H:%M:%S"
+
+# Sentencias SQL fijas: al reutilizar el mismo texto sobre la misma conexión,
+# sqlite3 reaprovecha la sentencia ya preparada de su caché.
+# El filtro "(sexo IS NULL) = ?" (1 = adultos, 0 = menores) coincide con el índice
+# idx_perfiles_tipo_timestamp, así que el orden por timestamp sale del índice.
+SQL_INSERTAR_MEDICION = (
+    "INSERT INTO perfiles (peso, altura, imc, fecha, sexo, edad_meses, percentil, timestamp) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_HISTORIAL_ADULTOS = (
+    "SELECT peso, altura, imc, fecha FROM perfiles WHERE (sexo IS NULL) = 1 ORDER BY timestamp DESC, id DESC"
+)
+SQL_HISTORIAL_MENORES = (
+    "SELECT peso, altura, imc, fecha, sexo, edad_meses, percentil FROM perfiles "
+    "WHERE (sexo IS NULL) = 0 ORDER BY timestamp DESC, id DESC"
+)
+SQL_PAGINA_HISTORIAL = (
+    "SELECT {columnas} FROM perfiles WHERE (sexo IS NULL) = ? {filtro} ORDER BY timestamp DESC, id DESC LIMIT ?"
+)
+SQL_DATOS_GRAFICO = (
+    "SELECT timestamp, {columna} FROM perfiles WHERE (sexo IS NULL) = ? "
+    "AND timestamp IS NOT NULL AND {columna} IS NOT NULL ORDER BY timestamp, id"
+)
+SQL_SERIE_AGREGADA = (
+    "SELECT {inicio} AS inicio, AVG({columna}), MIN({columna}), MAX({columna}), COUNT(*) FROM perfiles "
+    "WHERE (sexo IS NULL) = ? AND timestamp IS NOT NULL AND {columna} IS NOT NULL "
+    "GROUP BY inicio ORDER BY inicio DESC LIMIT ?"
+)
+# El "+" evita el índice por tipo: recorrer el rango de ids (clave primaria) cuesta O(filas nuevas)
+SQL_CAMBIOS_HISTORIAL = "SELECT {columnas} FROM perfiles WHERE +(sexo IS NULL) = ? AND id > ? ORDER BY id"
+SQL_GENERACION = "SELECT generacion FROM generaciones_historial WHERE tipo = ?"
+SQL_INCREMENTAR_GENERACION = "UPDATE generaciones_historial SET generacion = generacion + 1 WHERE tipo = ?"
+SQL_RANGO_TIMESTAMPS = (
+    "SELECT MIN(timestamp), MAX(timestamp) FROM perfiles WHERE (sexo IS NULL) = ? AND timestamp IS NOT NULL"
+)
+
+# Inicio y fin (epoch de la medianoche local) del mes natural de un timestamp
+SQL_INICIO_MES = "CAST(strftime('%s', date({ts}, 'unixepoch', 'localtime', 'start of month'), 'utc') AS INTEGER)"
+SQL_FIN_MES = (
+    "CAST(strftime('%s', date({ts}, 'unixepoch', 'localtime', 'start of month', '+1 month'), 'utc') AS INTEGER)"
+)
+
+# Inicio (epoch de la medianoche local) del periodo de cada medición, para agregar en SQL
+PERIODOS_AGREGACION = {
+    "dia": "CAST(strftime('%s', date(timestamp, 'unixepoch', 'localtime'), 'utc') AS INTEGER)",
+    "semana": (
+        "CAST(strftime('%s', date(timestamp, 'unixepoch', 'localtime', '-6 days', 'weekday 1'), 'utc') AS INTEGER)"
+    ),
+    "mes": SQL_INICIO_MES.format(ts="timestamp"),
+}
+
 
 def convertir_altura_a_metros(altura_input):
     """
@@ -74,91 +150,893 @@ def calcular_imc(peso_input, altura_input):
         raise ValueError(f"Error en cálculo de IMC: {str(e)}")
 
 
+# Motivos por fila de normalizar_pesos / normalizar_alturas (array int8; 0 = valor válido)
+MOTIVO_VALIDO = 0
+MOTIVO_VACIO = 1  # None, "" o solo espacios
+MOTIVO_FORMATO = 2  # texto que no es un número
+MOTIVO_NO_FINITO = 3  # "nan", "inf"
+MOTIVO_NO_POSITIVO = 4
+MOTIVO_FUERA_DE_RANGO = 5  # peso > 1000 kg o altura > 3 m, como en calcular_imc
+MOTIVOS_NORMALIZACION = ("valido", "vacio", "formato", "no_finito", "no_positivo", "fuera_de_rango")
+
+# Número decimal sencillo (tras cambiar la coma por punto): float() lo acepta siempre
+_NUMERO_SIMPLE = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+_TEXTOS_NO_FINITOS = ("nan", "inf", "infinity")
+
+
+def _texto_a_float(texto):
+    """
+    (valor, motivo) de un texto de peso o altura, con la misma conversión que
+    convertir_peso_a_float. Los textos habituales, válidos o no, se resuelven sin
+    lanzar excepciones; solo las formas raras con dígitos ("1_000", "70kg") prueban float().
+    """
+    limpio = texto.replace(",", ".").strip()
+    if not limpio:
+        return math.nan, MOTIVO_VACIO
+    if _NUMERO_SIMPLE.fullmatch(limpio):
+        return float(limpio), MOTIVO_VALIDO
+    if limpio.lstrip("+-").lower() in _TEXTOS_NO_FINITOS:
+        return float(limpio), MOTIVO_VALIDO
+    if not any(caracter.isdigit() for caracter in limpio):
+        return math.nan, MOTIVO_FORMATO
+    try:
+        return float(limpio), MOTIVO_VALIDO
+    except ValueError:
+        return math.nan, MOTIVO_FORMATO
+
+
+def _columna_a_floats(valores):
+    """
+    Convierte una columna de pesos o alturas (números, textos con punto o coma decimal,
+    None) a floats sin lanzar excepciones. Las columnas ya numéricas no pasan por
+    Python fila a fila, y cada texto distinto se convierte una sola vez.
+
+    Returns:
+        tuple: (columna original como array, array de floats (NaN si no es un número),
+                array int8 de motivos: MOTIVO_VALIDO, MOTIVO_VACIO o MOTIVO_FORMATO)
+    """
+    import numpy as np
+
+    columna = np.asarray(valores)
+    if columna.dtype.kind in "biuf":
+        return columna, columna.astype(np.float64), np.zeros(len(columna), dtype=np.int8)
+
+    floats = []
+    motivos = []
+    convertidos = {}
+    for valor in columna.tolist():
+        if isinstance(valor, (int, float)):
+            floats.append(float(valor))
+            motivos.append(MOTIVO_VALIDO)
+            continue
+        if valor is None:
+            floats.append(math.nan)
+            motivos.append(MOTIVO_VACIO)
+            continue
+        texto = valor if isinstance(valor, str) else str(valor)
+        resultado = convertidos.get(texto)
+        if resultado is None:
+            resultado = convertidos[texto] = _texto_a_float(texto)
+        floats.append(resultado[0])
+        motivos.append(resultado[1])
+    return columna, np.array(floats, dtype=np.float64), np.array(motivos, dtype=np.int8)
+
+
+def _validar_columna(floats, motivos, maximo):
+    """Marca los motivos de los valores no finitos, no positivos o mayores que `maximo`."""
+    import numpy as np
+
+    with np.errstate(invalid="ignore"):
+        for mascara, motivo in (
+            (~np.isfinite(floats), MOTIVO_NO_FINITO),
+            (floats <= 0, MOTIVO_NO_POSITIVO),
+            (floats > maximo, MOTIVO_FUERA_DE_RANGO),
+        ):
+            motivos[(motivos == MOTIVO_VALIDO) & mascara] = motivo
+    validos = motivos == MOTIVO_VALIDO
+    floats[~validos] = np.nan
+    return floats, validos, motivos
+
+
+def _alturas_a_metros(floats):
+    """Heurística de convertir_altura_a_metros por columnas: valores > 10 son centímetros."""
+    import numpy as np
+
+    with np.errstate(invalid="ignore"):
+        return np.where(floats > 10, floats / 100.0, floats)
+
+
+def normalizar_pesos(pesos):
+    """
+    Normaliza una columna de pesos mixta (números y textos como "70,5") a kg.
+
+    Returns:
+        tuple: (array de pesos en kg (NaN si no es válido), máscara bool de válidos,
+                array int8 de motivos MOTIVO_*; nombres en MOTIVOS_NORMALIZACION)
+    """
+    _, floats, motivos = _columna_a_floats(pesos)
+    return _validar_columna(floats, motivos, 1000)
+
+
+def normalizar_alturas(alturas):
+    """
+    Normaliza una columna de alturas mixta (m o cm, p. ej. "1,70" o 170) a metros.
+
+    Returns:
+        tuple: (array de alturas en metros (NaN si no es válida), máscara bool de válidos,
+                array int8 de motivos MOTIVO_*; nombres en MOTIVOS_NORMALIZACION)
+    """
+    _, floats, motivos = _columna_a_floats(alturas)
+    return _validar_columna(_alturas_a_metros(floats), motivos, 3.0)
+
+
+def _mensajes_formato(columna, motivos, plantilla):
+    """Mensaje de error de la versión escalar en las filas que no son un número."""
+    import numpy as np
+
+    mensajes = np.full(len(columna), None, dtype=object)
+    for i in np.flatnonzero(motivos != MOTIVO_VALIDO):
+        mensajes[i] = plantilla.format(columna[i])
+    return mensajes
+
+
+def convertir_pesos_a_float(pesos):
+    """
+    Versión por columnas de convertir_peso_a_float.
+
+    Returns:
+        tuple: (array de pesos en kg, array de mensajes de error o None por fila)
+    """
+    columna, floats, motivos = _columna_a_floats(pesos)
+    return floats, _mensajes_formato(columna, motivos, "Formato de peso inválido: {}")
+
+
+def convertir_alturas_a_metros(alturas):
+    """
+    Versión por columnas de convertir_altura_a_metros (valores > 10 se toman como centímetros).
+
+    Returns:
+        tuple: (array de alturas en metros, array de mensajes de error o None por fila)
+    """
+    columna, floats, motivos = _columna_a_floats(alturas)
+    return _alturas_a_metros(floats), _mensajes_formato(columna, motivos, "Formato de altura inválido: {}")
+
+
+def anotar_errores(mensajes, mascara, mensaje):
+    """
+    Escribe el mensaje en las filas de la máscara que aún no tienen error,
+    de modo que cada fila conserva el primer error, como en la versión escalar.
+    """
+    import numpy as np
+
+    libres = mascara & np.equal(mensajes, None)
+    if isinstance(mensaje, str):
+        mensajes[libres] = mensaje
+    else:
+        mensajes[libres] = mensaje[libres]
+
+
+def redondear_como_round(valores, decimales, recalcular):
+    """
+    Redondea un array dando el mismo resultado que round() de Python.
+    Las filas a menos de 1e-6 de una frontera de redondeo se recalculan
+    con recalcular(i), que debe devolver el valor exacto de la versión escalar.
+    """
+    import numpy as np
+
+    factor = 10.0**decimales
+    escalado = valores * factor
+    resultado = np.rint(escalado) / factor
+    dudosos = np.abs(escalado - np.floor(escalado) - 0.5) < 1e-6
+    for i in np.flatnonzero(dudosos):
+        resultado[i] = recalcular(i)
+    return resultado
+
+
+def calcular_imc_array(pesos, alturas):
+    """
+    Versión por columnas de calcular_imc, con las mismas validaciones.
+    En vez de lanzar ValueError, devuelve el mensaje de error de cada fila.
+
+    Returns:
+        tuple: (array de IMC redondeados a 2 decimales (NaN si hay error),
+                array de mensajes de error o None por fila)
+    """
+    import numpy as np
+
+    peso, mensajes = convertir_pesos_a_float(pesos)
+    altura, mensajes_altura = convertir_alturas_a_metros(alturas)
+    anotar_errores(mensajes, np.not_equal(mensajes_altura, None), mensajes_altura)
+    for mascara, texto in (
+        (peso <= 0, "El peso debe ser mayor a 0"),
+        (altura <= 0, "La altura debe ser mayor a 0"),
+        (peso > 1000, "Peso fuera de rango válido"),
+        (altura > 3.0, "Altura fuera de rango válido"),
+    ):
+        anotar_errores(mensajes, mascara, texto)
+    con_error = np.not_equal(mensajes, None)
+    mensajes[con_error] = np.array([f"Error en cálculo de IMC: {m}" for m in mensajes[con_error]], dtype=object)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        imc = redondear_como_round(
+            peso / (altura * altura),
+            2,
+            lambda i: round(float(peso[i]) / (float(altura[i]) ** 2), 2),
+        )
+    imc[con_error] = np.nan
+    return imc, mensajes
+
+
 def obtener_fecha():
     """Función para usar la fecha en la que se hacen las mediciones."""
-    return datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+    return datetime.now().strftime(FORMATO_FECHA)
 
 
-def inicializar_base_de_datos():
+def fecha_a_timestamp(fecha_str):
     """
-    Configura la tabla 'perfiles' en una conexión existente si no existe.
-    También se asegura de que las columnas para el cálculo de menores
-    estén presentes.
+    Convierte una fecha de la columna 'fecha' (hora local) a segundos desde epoch.
+    Devuelve None si el texto no tiene el formato esperado.
     """
-    # Obtener la ruta correcta para la base de datos en Android
     try:
-        from java import jclass
+        return int(datetime.strptime(fecha_str, FORMATO_FECHA).timestamp())
+    except (ValueError, TypeError):
+        return None
 
-        context = jclass("android.app.ActivityThread").currentApplication()
-        db_path = str(context.getDatabasePath("historial_imc.db"))
-    except Exception:
-        # Fallback para desarrollo/testing
-        db_path = "historial_imc.db"
 
-    with sqlite3.connect(db_path) as conexion:
-        cur = conexion.cursor()
+def obtener_ruta_base_datos():
+    """
+    Obtiene la ruta correcta para la base de datos en Android.
+    La ruta se resuelve una sola vez por proceso y queda cacheada.
+    """
+    global _ruta_db
+    if _ruta_db is None:
+        try:
+            from java import jclass
+
+            context = jclass("android.app.ActivityThread").currentApplication()
+            _ruta_db = str(context.getDatabasePath("historial_imc.db"))
+        except Exception:
+            # Fallback para desarrollo/testing
+            _ruta_db = "historial_imc.db"
+    return _ruta_db
+
+
+def establecer_ruta_base_datos(ruta):
+    """
+    Fija la ruta de la base de datos (útil fuera de Android o en pruebas).
+    Cierra la conexión abierta para que la siguiente operación use la nueva ruta.
+    """
+    global _ruta_db
+    with _lock_db:
+        vaciar_escrituras_pendientes()
+        cerrar_base_datos()
+        _ruta_db = ruta
+
+
+def _migracion_1(cur):
+    """Tabla 'perfiles' con las columnas de menores (sexo, edad_meses, percentil)."""
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS perfiles(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            peso REAL,
+            altura REAL,
+            imc REAL,
+            fecha TEXT
+        )
+    """
+    )
+
+    # Las bases de datos anteriores al versionado pueden no tener las columnas de menores
+    cur.execute("PRAGMA table_info(perfiles)")
+    columnas = [info[1] for info in cur.fetchall()]
+
+    if "sexo" not in columnas:
+        cur.execute("ALTER TABLE perfiles ADD COLUMN sexo TEXT")
+
+    if "edad_meses" not in columnas:
+        cur.execute("ALTER TABLE perfiles ADD COLUMN edad_meses INTEGER")
+
+    if "percentil" not in columnas:
+        cur.execute("ALTER TABLE perfiles ADD COLUMN percentil REAL")
+
+
+def _migracion_2(cur):
+    """
+    Columna 'timestamp' (segundos desde epoch) rellenada a partir de 'fecha',
+    que como texto DD-MM-YYYY no se puede ordenar cronológicamente, e índice
+    compuesto por tipo de historial (adultos/menores) y timestamp.
+    """
+    cur.execute("ALTER TABLE perfiles ADD COLUMN timestamp INTEGER")
+    filas = cur.execute("SELECT id, fecha FROM perfiles").fetchall()
+    cur.executemany(
+        "UPDATE perfiles SET timestamp = ? WHERE id = ?",
+        [(fecha_a_timestamp(fecha), id_fila) for id_fila, fecha in filas],
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_perfiles_tipo_timestamp ON perfiles((sexo IS NULL), timestamp)")
+
+
+def _migracion_3(cur):
+    """Contador de generación por tipo de historial, que aumenta con cada borrado."""
+    cur.execute("CREATE TABLE IF NOT EXISTS generaciones_historial(tipo TEXT PRIMARY KEY, generacion INTEGER NOT NULL)")
+    cur.executemany(
+        "INSERT OR IGNORE INTO generaciones_historial (tipo, generacion) VALUES (?, 0)",
+        [("adultos",), ("menores",)],
+    )
+
+
+# Tabla resumen_mensual: agregados por tipo, sexo y mes (hora local) que mantienen los
+# disparadores de 'perfiles', para que las estadísticas del historial cuesten O(meses)
+# y no O(mediciones). Las inserciones se suman al momento; un borrado o una modificación
+# solo marca el mes como obsoleto y se recalcula la próxima vez que se consulte (ver agregados.py).
+# Las inserciones masivas y los borrados de un historial entero quitan los disparadores
+# mientras trabajan y actualizan la tabla con una sola sentencia (_disparadores_resumen_en_pausa).
+# Códigos de sexo: -1 adultos, 0 y 1 según SEXOS_GUARDADOS, 2 cualquier otro texto.
+# Los textos de SEXOS_GUARDADOS quedan copiados en los disparadores y en los códigos ya
+# guardados en resumen_mensual: cambiarlos exige una migración nueva que vuelva a crear
+# los disparadores y rellene de nuevo la tabla.
+SQL_CODIGO_SEXO = (
+    "CASE WHEN {sexo} IS NULL THEN -1 WHEN {sexo} IN {masculinos} THEN 0 WHEN {sexo} IN {femeninos} THEN 1 ELSE 2 END"
+)
+
+
+def sql_codigo_sexo(columna):
+    """Expresión SQL con el código de sexo (-1, 0, 1 o 2) de la columna dada."""
+    return SQL_CODIGO_SEXO.format(
+        sexo=columna, masculinos=lista_sql(SEXOS_GUARDADOS[0]), femeninos=lista_sql(SEXOS_GUARDADOS[1])
+    )
+
+
+# Suma al resumen unas mediciones ya agrupadas por mes: lo usan el disparador de inserción
+# (una fila) y las inserciones masivas (un bloque entero, ver guardar_mediciones_lote)
+SQL_FUSIONAR_RESUMEN = """
+    ON CONFLICT (es_adulto, sexo, inicio) DO UPDATE SET
+        mediciones = mediciones + excluded.mediciones,
+        suma_imc = suma_imc + excluded.suma_imc,
+        min_imc = COALESCE(MIN(min_imc, excluded.min_imc), min_imc, excluded.min_imc),
+        max_imc = COALESCE(MAX(max_imc, excluded.max_imc), max_imc, excluded.max_imc),
+        con_percentil = con_percentil + excluded.con_percentil,
+        suma_percentil = suma_percentil + excluded.suma_percentil,
+        min_percentil = COALESCE(MIN(min_percentil, excluded.min_percentil), min_percentil, excluded.min_percentil),
+        max_percentil = COALESCE(MAX(max_percentil, excluded.max_percentil), max_percentil, excluded.max_percentil)
+"""
+DISPARADORES_RESUMEN = ("resumen_mensual_insertar", "resumen_mensual_delete", "resumen_mensual_update")
+
+
+def _crear_disparadores_resumen(cur):
+    """Crea los disparadores de 'perfiles' que mantienen resumen_mensual."""
+    clave_nueva = f"(NEW.sexo IS NULL), {sql_codigo_sexo('NEW.sexo')}, {SQL_INICIO_MES.format(ts='NEW.timestamp')}"
+    # Un solo UPSERT por fila: la clave del mes se calcula una vez por inserción
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS resumen_mensual_insertar AFTER INSERT ON perfiles
+        WHEN NEW.timestamp IS NOT NULL
+        BEGIN
+            INSERT INTO resumen_mensual (es_adulto, sexo, inicio, mediciones, suma_imc, min_imc, max_imc,
+                                         con_percentil, suma_percentil, min_percentil, max_percentil)
+            VALUES ({clave_nueva}, 1, COALESCE(NEW.imc, 0), NEW.imc, NEW.imc, NEW.percentil IS NOT NULL,
+                    COALESCE(NEW.percentil, 0), NEW.percentil, NEW.percentil)
+            {SQL_FUSIONAR_RESUMEN};
+        END
+    """
+    )
+    for evento, filas in (("DELETE", ("OLD",)), ("UPDATE", ("OLD", "NEW"))):
+        marcas = "".join(
+            f"""
+            UPDATE resumen_mensual SET obsoleto = 1
+            WHERE es_adulto = ({fila}.sexo IS NULL) AND sexo = {sql_codigo_sexo(f'{fila}.sexo')}
+                AND inicio = {SQL_INICIO_MES.format(ts=f'{fila}.timestamp')} AND obsoleto = 0;"""
+            for fila in filas
+        )
+        # Una modificación puede mover la medición a un mes que aún no tiene fila
+        crear = (
+            f"INSERT OR IGNORE INTO resumen_mensual (es_adulto, sexo, inicio, obsoleto) "
+            f"SELECT {clave_nueva}, 1 WHERE NEW.timestamp IS NOT NULL;"
+            if evento == "UPDATE"
+            else ""
+        )
         cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS perfiles(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                peso REAL,
-                altura REAL,
-                imc REAL,
-                fecha TEXT
-            )
+            f"""
+            CREATE TRIGGER IF NOT EXISTS resumen_mensual_{evento.lower()} AFTER {evento} ON perfiles
+            BEGIN{marcas}
+                {crear}
+            END
         """
         )
 
-        # Verificar y añadir columnas para el cálculo de menores si no existen
-        cur.execute("PRAGMA table_info(perfiles)")
-        columnas = [info[1] for info in cur.fetchall()]
 
-        if "sexo" not in columnas:
-            cur.execute("ALTER TABLE perfiles ADD COLUMN sexo TEXT")
+@contextmanager
+def _disparadores_resumen_en_pausa(conexion):
+    """
+    Quita los disparadores de resumen_mensual durante el bloque `with` y los vuelve
+    a crear al salir, dentro de la misma transacción: quien lo usa debe dejar
+    resumen_mensual al día por su cuenta con una sola sentencia en vez de pagar
+    un disparador por fila. Si la transacción se deshace, los disparadores vuelven con ella.
+    """
+    if not conexion.in_transaction:
+        # sqlite3 no abre transacción antes de DROP TRIGGER: sin ella se confirmaría al momento
+        conexion.execute("BEGIN")
+    for nombre in DISPARADORES_RESUMEN:
+        conexion.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+    yield conexion
+    _crear_disparadores_resumen(conexion)
+
+
+def _migracion_4(cur):
+    """Tabla resumen_mensual, sus disparadores y su contenido inicial a partir de 'perfiles'."""
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS resumen_mensual(
+            es_adulto INTEGER NOT NULL,
+            sexo INTEGER NOT NULL,
+            inicio INTEGER NOT NULL,
+            mediciones INTEGER NOT NULL DEFAULT 0,
+            suma_imc REAL NOT NULL DEFAULT 0,
+            min_imc REAL,
+            max_imc REAL,
+            con_percentil INTEGER NOT NULL DEFAULT 0,
+            suma_percentil REAL NOT NULL DEFAULT 0,
+            min_percentil REAL,
+            max_percentil REAL,
+            obsoleto INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (es_adulto, sexo, inicio)
+        ) WITHOUT ROWID
+    """
+    )
+    _crear_disparadores_resumen(cur)
+    cur.execute(SQL_ACUMULAR_RESUMEN, (0,))
+
+
+# Migraciones del esquema en orden; la versión aplicada se guarda en PRAGMA user_version
+MIGRACIONES = [
+    (1, _migracion_1),
+    (2, _migracion_2),
+    (3, _migracion_3),
+    (4, _migracion_4),
+]
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+
+def _migrar_esquema(conexion):
+    """Aplica, cada una en su propia transacción, las migraciones pendientes según PRAGMA user_version."""
+    cur = conexion.cursor()
+    version = cur.execute("PRAGMA user_version").fetchone()[0]
+    for numero, migracion in MIGRACIONES:
+        if numero <= version:
+            continue
+        cur.execute("BEGIN")
+        try:
+            migracion(cur)
+            cur.execute(f"PRAGMA user_version = {int(numero)}")
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+
+def inicializar_base_de_datos():
+    """
+    Abre la conexión compartida con la base de datos y migra el esquema de
+    la tabla 'perfiles' si hace falta. Solo trabaja la primera vez por proceso;
+    las llamadas posteriores devuelven la conexión ya abierta.
+    """
+    global _conexion
+    with _lock_db:
+        if _conexion is None:
+            conexion = sqlite3.connect(obtener_ruta_base_datos(), check_same_thread=False)
+            try:
+                _migrar_esquema(conexion)
+            except Exception:
+                conexion.close()
+                raise
+            _conexion = conexion
+        return _conexion
+
+
+def cerrar_base_datos():
+    """Cierra la conexión compartida; la siguiente operación la vuelve a abrir."""
+    global _conexion
+    with _lock_db:
+        if _conexion is not None:
+            _escribir_pendientes(_conexion)
+            _conexion.close()
+            _conexion = None
+
+
+@contextmanager
+def conexion_base_datos():
+    """
+    Da acceso exclusivo a la conexión compartida dentro de un bloque `with`.
+    Hace commit al salir del bloque, o rollback si se produjo una excepción.
+    """
+    with _lock_db:
+        conexion = inicializar_base_de_datos()
+        if _pendientes:
+            # Cualquier lectura o borrado ve antes las mediciones aún en el búfer
+            _escribir_pendientes(conexion)
+        with conexion:
+            yield conexion
+
+
+# Errores de una fila concreta al insertarla (valor que no se puede enlazar o que viola
+# una restricción); cualquier otro error (disco lleno, base de datos bloqueada) afecta a
+# todo el lote y las filas se conservan para reintentarlo
+ERRORES_DE_FILA = (sqlite3.InterfaceError, sqlite3.ProgrammingError, sqlite3.IntegrityError, OverflowError)
 
-        if "edad_meses" not in columnas:
-            cur.execute("ALTER TABLE perfiles ADD COLUMN edad_meses INTEGER")
 
-        if "percentil" not in columnas:
-            cur.execute("ALTER TABLE perfiles ADD COLUMN percentil REAL")
+def _devolver_al_bufer(filas):
+    """Devuelve filas al búfer, delante de las nuevas, para no perderlas."""
+    with _lock_pendientes:
+        _pendientes[:0] = filas
 
-        conexion.commit()
 
+def _insertar_una_a_una(conexion, filas):
+    """Inserta las filas en una transacción, saltándose las que fallan; devuelve {índice: motivo}."""
+    descartadas = {}
+    with conexion:
+        for indice, fila in enumerate(filas):
+            try:
+                conexion.execute(SQL_INSERTAR_MEDICION, fila)
+            except ERRORES_DE_FILA as e:
+                descartadas[indice] = str(e)
+    return descartadas
 
-def obtener_ruta_base_datos():
+
+def _escribir_pendientes(conexion):
     """
-    Obtiene la ruta correcta para la base de datos en Android.
+    Inserta en una transacción las mediciones del búfer. Requiere tener _lock_db.
+    Si alguna fila no se puede insertar, se insertan una a una y se descartan las que
+    fallan, que se devuelven como [(fila, motivo), ...] para que no bloqueen el búfer.
     """
+    global _pendientes
+    with _lock_pendientes:
+        filas, _pendientes = _pendientes, []
+    if not filas:
+        return []
     try:
-        from java import jclass
+        with conexion:
+            conexion.executemany(SQL_INSERTAR_MEDICION, filas)
+        return []
+    except ERRORES_DE_FILA:
+        pass
+    except Exception:
+        _devolver_al_bufer(filas)
+        raise
 
-        context = jclass("android.app.ActivityThread").currentApplication()
-        return str(context.getDatabasePath("historial_imc.db"))
+    try:
+        descartadas = _insertar_una_a_una(conexion, filas)
     except Exception:
-        # Fallback para desarrollo/testing
-        return "historial_imc.db"
+        # Error de todo el lote a mitad del reintento: se conservan todas las filas
+        _devolver_al_bufer(filas)
+        raise
+    for indice, motivo in descartadas.items():
+        print(f"Medición pendiente descartada ({motivo}): {filas[indice]!r}")
+    return [(filas[indice], motivo) for indice, motivo in descartadas.items()]
+
+
+def vaciar_escrituras_pendientes():
+    """
+    Escribe ya las mediciones que guardar_medicion tenga en el búfer de escritura
+    diferida. En Android conviene llamarla al pasar la app a segundo plano (onStop),
+    porque el sistema puede matar el proceso sin ejecutar los manejadores de salida.
+
+    Returns:
+        list: Filas descartadas por no poder insertarse, [(fila, motivo), ...]
+    """
+    if not _pendientes:
+        return []
+    with _lock_db:
+        return _escribir_pendientes(inicializar_base_de_datos())
+
+
+def configurar_escritura_diferida(activa=True, max_pendientes=100, max_espera_s=0.5):
+    """
+    Activa o desactiva la escritura diferida de guardar_medicion. Activa, cada
+    medición se añade a un búfer en memoria y un hilo escritor la inserta, junto con
+    las demás pendientes, en una sola transacción al llegar a max_pendientes filas o
+    al pasar max_espera_s segundos desde la primera pendiente. El búfer también se
+    escribe antes de cualquier otra operación sobre la base de datos, al llamar a
+    vaciar_escrituras_pendientes() y al terminar el proceso. Desactivarla vacía el búfer.
+    """
+    global _escritura_diferida, _hilo_escritor
+    if not activa:
+        _escritura_diferida = None
+        vaciar_escrituras_pendientes()
+        return
+    if max_pendientes < 1 or max_espera_s <= 0:
+        raise ValueError("max_pendientes debe ser al menos 1 y max_espera_s mayor que 0")
+    with _condicion_pendientes:
+        _escritura_diferida = (int(max_pendientes), float(max_espera_s))
+        if _hilo_escritor is None:
+            _hilo_escritor = threading.Thread(target=_bucle_escritor, name="imc-escritura-diferida", daemon=True)
+            _hilo_escritor.start()
+        _condicion_pendientes.notify()
+
+
+def _bucle_escritor():
+    """Hilo escritor: espera a que el búfer se llene o caduque y lo escribe."""
+    while True:
+        with _condicion_pendientes:
+            while True:
+                if _pendientes:
+                    if _escritura_diferida is None:
+                        break
+                    max_pendientes, max_espera_s = _escritura_diferida
+                    restante = _inicio_pendientes + max_espera_s - time.monotonic()
+                    if len(_pendientes) >= max_pendientes or restante <= 0:
+                        break
+                    _condicion_pendientes.wait(restante)
+                else:
+                    _condicion_pendientes.wait()
+        try:
+            vaciar_escrituras_pendientes()
+        except Exception as e:
+            # Las filas siguen en el búfer: se reintenta pasado un momento
+            print(f"Error escribiendo mediciones pendientes: {e}")
+            time.sleep(1.0)
+
+
+def _encolar_medicion(fila, max_pendientes):
+    global _inicio_pendientes
+    with _condicion_pendientes:
+        _pendientes.append(fila)
+        if len(_pendientes) == 1:
+            _inicio_pendientes = time.monotonic()
+            _condicion_pendientes.notify()
+        elif len(_pendientes) >= max_pendientes:
+            _condicion_pendientes.notify()
+
+
+atexit.register(vaciar_escrituras_pendientes)
 
 
 def guardar_medicion(peso, altura, imc, sexo=None, edad_meses=None, percentil=None):
     """
     Aquí guardamos la medición del usuario.
     Incluye campos opcionales para sexo, edad y percentil para menores.
+    Con la escritura diferida activa solo se añade al búfer (ver configurar_escritura_diferida).
+    Lanza ValueError si algún valor no es válido (ver guardar_mediciones_lote).
+    """
+    # Se valida antes de encolar: un valor inválido falla aquí y no al escribir el búfer
+    fila = _preparar_fila_medicion((peso, altura, imc, sexo, edad_meses, percentil), datetime.now())
+    escritura_diferida = _escritura_diferida
+    if escritura_diferida is not None:
+        _encolar_medicion(fila, escritura_diferida[0])
+        return
+    with conexion_base_datos() as conexion:
+        conexion.execute(SQL_INSERTAR_MEDICION, fila)
+
+
+# Columnas devueltas por página de historial; 'id' y 'timestamp' forman la clave del cursor
+COLUMNAS_HISTORIAL = {
+    "adultos": ("id", "timestamp", "peso", "altura", "imc", "fecha"),
+    "menores": ("id", "timestamp", "peso", "altura", "imc", "fecha", "sexo", "edad_meses", "percentil"),
+}
+
+
+def lista_sql(textos):
+    """Lista SQL de literales de texto, p. ej. "('Male', 'O''Brien')", con las comillas escapadas."""
+    return "({})".format(", ".join("'" + texto.replace("'", "''") + "'" for texto in textos))
+
+
+# Historial por columnas: una secuencia empaquetada por campo para que Kotlin cruce
+# el puente una vez por columna (toJava sobre el buffer) en lugar de una vez por celda.
+# Tipos de array.array: "d" double (NULL -> NaN), "q" int64, "b" int8; None indica
+# texto, que se une con SEPARADOR_TEXTOS en un único str. Los enteros van en int64 como
+# en SQLite, para que ningún valor guardado desborde la columna.
+# Los enteros desconocidos valen -1; sexo: 0 = masculino, 1 = femenino, 2 = otro valor.
+# Kotlin guarda el sexo con el texto localizado (R.string.sexo_masculino / sexo_femenino).
+SEXOS_GUARDADOS = {
+    0: ("Masculino", "Male", "Männlich", "Masculin"),
+    1: ("Femenino", "Female", "Weiblich", "Féminin"),
+}
+TIPOS_COLUMNAS_HISTORIAL = {
+    "id": "q",
+    "timestamp": "q",
+    "peso": "d",
+    "altura": "d",
+    "imc": "d",
+    "fecha": None,
+    "sexo": "b",
+    "edad_meses": "q",
+    "percentil": "d",
+}
+# Separador de las columnas de texto: el carácter de control "unit separator", que no
+# aparece en las fechas (un salto de línea sí podía llegar en una fecha importada)
+SEPARADOR_TEXTOS = "\x1f"
+EXPRESIONES_COLUMNAS_HISTORIAL = {
+    "timestamp": "COALESCE(timestamp, -1)",
+    "fecha": "COALESCE(fecha, '')",
+    "sexo": "CASE {} ELSE 2 END".format(
+        " ".join(f"WHEN sexo IN {lista_sql(textos)} THEN {codigo}" for codigo, textos in SEXOS_GUARDADOS.items())
+    ),
+    "edad_meses": "CAST(COALESCE(edad_meses, -1) AS INTEGER)",
+}
+SQL_HISTORIAL_COLUMNAS = (
+    "SELECT {columnas} FROM perfiles WHERE (sexo IS NULL) = ? ORDER BY perfiles.timestamp DESC, perfiles.id DESC"
+)
+
+# Orden de los campos de una medición pasada como tupla (igual que los argumentos de guardar_medicion)
+CAMPOS_MEDICION = ("peso", "altura", "imc", "sexo", "edad_meses", "percentil")
+
+# Filas por transacción en guardar_mediciones_lote
+TAMANO_LOTE_INSERCION = 5000
+# Quitar y volver a crear los disparadores cuesta lo mismo que unos cientos de inserciones
+# con ellos: los bloques más pequeños se insertan con los disparadores activos
+FILAS_MINIMAS_SIN_DISPARADORES = 1000
+
+# Clave de resumen_mensual (tipo, código de sexo, inicio del mes) de cada fila de 'perfiles'
+CLAVE_RESUMEN = f"(sexo IS NULL), {sql_codigo_sexo('sexo')}, {SQL_INICIO_MES.format(ts='timestamp')}"
+# Acumula en resumen_mensual las mediciones con id mayor que el dado, agrupadas por mes
+SQL_ACUMULAR_RESUMEN = f"""
+    INSERT INTO resumen_mensual (es_adulto, sexo, inicio, mediciones, suma_imc, min_imc, max_imc,
+                                 con_percentil, suma_percentil, min_percentil, max_percentil)
+    SELECT {CLAVE_RESUMEN}, COUNT(*), TOTAL(imc), MIN(imc), MAX(imc),
+           COUNT(percentil), TOTAL(percentil), MIN(percentil), MAX(percentil)
+    FROM perfiles WHERE id > ? AND timestamp IS NOT NULL
+    GROUP BY {CLAVE_RESUMEN}
+    {SQL_FUSIONAR_RESUMEN}
+"""
+
+# Rango de los enteros de SQLite y de los timestamps admitidos (desde epoch hasta el
+# último día que datetime puede representar en hora local)
+ENTERO_SQLITE_MAXIMO = 2**63 - 1
+TIMESTAMP_MAXIMO = int(datetime(9999, 12, 30).timestamp())
+
+# Rangos admitidos en los campos de menores: la app calcula de 5 a 19 años (60 a 228 meses),
+# con margen para las edades que se redondean hacia arriba
+EDAD_MESES_MAXIMA = 240
+PERCENTIL_MAXIMO = 100
+
+
+def _a_numero(valor, campo, convertir=float):
+    """Convierte un campo numérico de una medición (acepta coma decimal) o lanza ValueError."""
+    if isinstance(valor, str):
+        valor = valor.replace(",", ".").strip()
+    try:
+        # int(inf) y math.isfinite de un entero enorme lanzan OverflowError
+        numero = convertir(valor)
+        valido = math.isfinite(numero) and (convertir is not int or abs(numero) <= ENTERO_SQLITE_MAXIMO)
+    except (ValueError, TypeError, OverflowError):
+        valido = False
+    if not valido:
+        raise ValueError(f"Valor inválido en '{campo}': {valor}")
+    return numero
+
+
+def _campo_opcional_en_rango(datos, campo, maximo, convertir=float):
+    """Campo numérico opcional entre 0 y `maximo` (None si no viene) o ValueError."""
+    valor = datos.get(campo)
+    if valor is None:
+        return None
+    numero = _a_numero(valor, campo, convertir)
+    if not 0 <= numero <= maximo:
+        raise ValueError(f"'{campo}' fuera de rango (0 a {maximo}): {valor}")
+    return numero
+
+
+def _a_timestamp(valor):
+    """Convierte el timestamp de una medición o lanza ValueError si no es válido o está fuera de rango."""
+    timestamp = _a_numero(valor, "timestamp", int)
+    if not 0 <= timestamp <= TIMESTAMP_MAXIMO:
+        raise ValueError(f"Timestamp fuera de rango: {valor}")
+    return timestamp
+
+
+def _fecha_de_medicion(datos, ahora, conservar_fecha=False):
+    """Devuelve (fecha, timestamp) de una medición; lanza ValueError si la fecha no es válida."""
+    # La fecha de la medición puede venir como texto 'fecha' o como 'timestamp'; si no, es ahora
+    timestamp = datos.get("timestamp")
+    fecha = datos.get("fecha")
+    if fecha is not None and not isinstance(fecha, str):
+        raise ValueError(f"Fecha inválida: {fecha}")
+    if conservar_fecha and fecha is not None:
+        timestamp_fecha = fecha_a_timestamp(fecha)
+        if timestamp_fecha is None:
+            raise ValueError(f"Fecha inválida: {fecha}")
+        # Si vienen ambos se respetan tal cual; sin timestamp se deduce de la fecha
+        if timestamp is not None:
+            return fecha, _a_timestamp(timestamp)
+        return fecha, timestamp_fecha
+    if timestamp is not None:
+        timestamp = _a_timestamp(timestamp)
+        try:
+            return datetime.fromtimestamp(timestamp).strftime(FORMATO_FECHA), timestamp
+        except (OverflowError, OSError, ValueError):
+            # Límites de la plataforma (p. ej. localtime) más estrechos que TIMESTAMP_MAXIMO
+            raise ValueError(f"Timestamp fuera de rango: {timestamp}")
+    if fecha is not None:
+        timestamp = fecha_a_timestamp(fecha)
+        if timestamp is None:
+            raise ValueError(f"Fecha inválida: {fecha}")
+        return fecha, timestamp
+    return ahora.strftime(FORMATO_FECHA), int(ahora.timestamp())
+
+
+def _preparar_fila_medicion(medicion, ahora, conservar_fecha=False):
     """
-    inicializar_base_de_datos()
-    fecha = obtener_fecha()
-    db_path = obtener_ruta_base_datos()
+    Valida una medición (dict o tupla en el orden de CAMPOS_MEDICION) y devuelve
+    la tupla de parámetros de SQL_INSERTAR_MEDICION. Lanza ValueError si no es válida.
+    Con conservar_fecha, 'fecha' (con el formato FORMATO_FECHA) y 'timestamp' se guardan
+    tal cual vienen (importación).
+    """
+    if isinstance(medicion, dict):
+        datos = medicion
+    elif isinstance(medicion, (tuple, list)):
+        datos = dict(zip(CAMPOS_MEDICION, medicion))
+    else:
+        raise ValueError(f"Medición no válida: {medicion!r}")
+
+    valores = []
+    for campo in ("peso", "altura", "imc"):
+        if datos.get(campo) is None:
+            raise ValueError(f"Falta el campo '{campo}'")
+        numero = _a_numero(datos[campo], campo)
+        if numero <= 0:
+            raise ValueError(f"'{campo}' debe ser mayor a 0")
+        valores.append(numero)
+
+    sexo = datos.get("sexo")
+    if sexo is not None and not isinstance(sexo, str):
+        raise ValueError(f"Valor inválido en 'sexo': {sexo}")
+    edad_meses = _campo_opcional_en_rango(datos, "edad_meses", EDAD_MESES_MAXIMA, int)
+    percentil = _campo_opcional_en_rango(datos, "percentil", PERCENTIL_MAXIMO)
+
+    fecha, timestamp = _fecha_de_medicion(datos, ahora, conservar_fecha)
+    return (*valores, fecha, sexo, edad_meses, percentil, timestamp)
+
+
+def _insertar_bloque(conexion, bloque):
+    """Inserta un bloque de filas; si es grande, con los disparadores de resumen_mensual en pausa."""
+    if len(bloque) < FILAS_MINIMAS_SIN_DISPARADORES:
+        conexion.executemany(SQL_INSERTAR_MEDICION, bloque)
+        return
+    with _disparadores_resumen_en_pausa(conexion):
+        # Un solo UPSERT agrupado por mes para todo el bloque en lugar de uno por fila
+        ultimo_id = conexion.execute("SELECT COALESCE(MAX(id), 0) FROM perfiles").fetchone()[0]
+        conexion.executemany(SQL_INSERTAR_MEDICION, bloque)
+        conexion.execute(SQL_ACUMULAR_RESUMEN, (ultimo_id,))
+
+
+def guardar_mediciones_lote(mediciones, tamano_lote=TAMANO_LOTE_INSERCION, conservar_fecha=False) -> dict:
+    """
+    Guarda muchas mediciones de una vez (p. ej. al importar una cohorte).
+    Las mediciones se consumen como un flujo y se insertan con executemany,
+    con una transacción por cada bloque de `tamano_lote` filas válidas.
 
-    with sqlite3.connect(db_path) as conexion:
-        cur = conexion.cursor()
-        cur.execute(
-            """
-                INSERT INTO perfiles (peso, altura, imc, fecha, sexo, edad_meses, percentil)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-            (peso, altura, imc, fecha, sexo, edad_meses, percentil),
-        )
+    Args:
+        mediciones: Iterable de dicts (claves de CAMPOS_MEDICION y opcionalmente
+                    'fecha' o 'timestamp') o de tuplas en el orden de guardar_medicion
+        tamano_lote: Filas por transacción
+        conservar_fecha: Guardar 'fecha' y 'timestamp' tal cual cuando vienen ambos
+                         (en lugar de recalcular la fecha a partir del timestamp)
 
-        conexion.commit()
+    Returns:
+        dict: {"insertadas": int, "rechazadas": int,
+               "filas_rechazadas": [(índice, motivo), ...]}
+    """
+    ahora = datetime.now()
+    insertadas = 0
+    filas_rechazadas = []
+    iterador = enumerate(mediciones)
+
+    while True:
+        bloque = []
+        leidas = 0
+        for indice, medicion in islice(iterador, tamano_lote):
+            leidas += 1
+            try:
+                bloque.append(_preparar_fila_medicion(medicion, ahora, conservar_fecha))
+            except ValueError as e:
+                filas_rechazadas.append((indice, str(e)))
+        if bloque:
+            with conexion_base_datos() as conexion:
+                _insertar_bloque(conexion, bloque)
+            insertadas += len(bloque)
+        if leidas < tamano_lote:
+            break
+
+    return {"insertadas": insertadas, "rechazadas": len(filas_rechazadas), "filas_rechazadas": filas_rechazadas}
 
 
 def mostrar_historial(tipo_historial: str) -> list[dict]:
@@ -169,18 +1047,9 @@ def mostrar_historial(tipo_historial: str) -> list[dict]:
     Args:
         tipo_historial (str): 'adultos' o 'menores'.
     """
-    inicializar_base_de_datos()
-    db_path = obtener_ruta_base_datos()
-    with sqlite3.connect(db_path) as conexion:
-        cur = conexion.cursor()
-        if tipo_historial == "adultos":
-            cur.execute("SELECT peso, altura, imc, fecha FROM perfiles " "WHERE sexo IS NULL ORDER BY fecha DESC")
-        else:
-            cur.execute(
-                "SELECT peso, altura, imc, fecha, sexo, edad_meses, percentil "
-                "FROM perfiles WHERE sexo IS NOT NULL ORDER BY fecha DESC"
-            )
-        datos = cur.fetchall()
+    consulta = SQL_HISTORIAL_ADULTOS if tipo_historial == "adultos" else SQL_HISTORIAL_MENORES
+    with conexion_base_datos() as conexion:
+        datos = conexion.execute(consulta).fetchall()
 
     historial_list = []
     for d in datos:
@@ -193,119 +1062,274 @@ def mostrar_historial(tipo_historial: str) -> list[dict]:
     return historial_list
 
 
+def obtener_pagina_historial(tipo_historial, limite=50, antes_de=None) -> dict:
+    """
+    Devuelve una página del historial, de la medición más reciente a la más antigua,
+    con paginación por clave (timestamp, id): el coste no depende de cuántas
+    páginas se hayan leído antes ni del tamaño total de la tabla.
+
+    Args:
+        tipo_historial (str): 'adultos' o 'menores'.
+        limite (int): Número máximo de filas de la página.
+        antes_de: Cursor [timestamp, id] devuelto como "siguiente" por la página
+                  anterior, o None para la primera página.
+
+    Returns:
+        dict: {"filas": lista de diccionarios (con "id" y "timestamp" además de
+               los campos de obtener_historial_*), "siguiente": cursor o None si no hay más}
+    """
+    tipo = "adultos" if tipo_historial == "adultos" else "menores"
+    columnas = COLUMNAS_HISTORIAL[tipo]
+    es_adulto = int(tipo == "adultos")
+
+    def consultar(conexion, filtro, parametros, cantidad):
+        consulta = SQL_PAGINA_HISTORIAL.format(columnas=", ".join(columnas), filtro=filtro)
+        return conexion.execute(consulta, (es_adulto, *parametros, cantidad)).fetchall()
+
+    # Las filas sin timestamp (fechas antiguas no parseables) van al final, ordenadas por id
+    with conexion_base_datos() as conexion:
+        if antes_de is None:
+            datos = consultar(conexion, "", (), limite)
+        elif antes_de[0] is None:
+            datos = consultar(conexion, "AND timestamp IS NULL AND id < ?", (antes_de[1],), limite)
+        else:
+            datos = consultar(conexion, "AND (timestamp, id) < (?, ?)", tuple(antes_de), limite)
+            if len(datos) < limite:
+                datos += consultar(conexion, "AND timestamp IS NULL", (), limite - len(datos))
+
+    filas = [dict(zip(columnas, d)) for d in datos]
+    siguiente = [filas[-1]["timestamp"], filas[-1]["id"]] if len(filas) == limite and filas else None
+    return {"filas": filas, "siguiente": siguiente}
+
+
+def iterar_historial(tipo_historial, tamano_lote=500):
+    """
+    Recorre todo el historial por lotes (listas de diccionarios), del más reciente
+    al más antiguo. Cada lote es una consulta paginada independiente, así que la
+    memoria no crece con el tamaño de la tabla y la conexión no queda bloqueada
+    entre lotes.
+    """
+    cursor = None
+    while True:
+        pagina = obtener_pagina_historial(tipo_historial, tamano_lote, cursor)
+        if pagina["filas"]:
+            yield pagina["filas"]
+        cursor = pagina["siguiente"]
+        if cursor is None:
+            return
+
+
+def obtener_cambios_historial(tipo_historial, marca=None) -> dict:
+    """
+    Devuelve solo las mediciones añadidas desde una marca de agua anterior,
+    para que la pantalla actualice su copia en O(filas nuevas).
+    Los ids son AUTOINCREMENT (nunca se reutilizan) y cada borrado de historial
+    aumenta la generación del tipo, así que un cambio de generación indica que
+    hay que descartar la copia local.
+
+    Args:
+        tipo_historial (str): 'adultos' o 'menores'.
+        marca: [último id, generación] devuelta por la llamada anterior, o None la primera vez.
+
+    Returns:
+        dict: {"filas": filas nuevas en orden de inserción (mismas claves que
+               obtener_pagina_historial), "reiniciar": True si la copia local debe
+               sustituirse por "filas", "marca": nueva marca [id, generación]}
+    """
+    tipo = "adultos" if tipo_historial == "adultos" else "menores"
+    columnas = COLUMNAS_HISTORIAL[tipo]
+    consulta = SQL_CAMBIOS_HISTORIAL.format(columnas=", ".join(columnas))
+
+    with conexion_base_datos() as conexion:
+        generacion = conexion.execute(SQL_GENERACION, (tipo,)).fetchone()[0]
+        reiniciar = marca is None or marca[1] != generacion
+        ultimo_id = 0 if reiniciar else marca[0]
+        datos = conexion.execute(consulta, (int(tipo == "adultos"), ultimo_id)).fetchall()
+
+    filas = [dict(zip(columnas, d)) for d in datos]
+    if filas:
+        ultimo_id = filas[-1]["id"]
+    return {"filas": filas, "reiniciar": reiniciar, "marca": [ultimo_id, generacion]}
+
+
 def borrar_historial_adultos():
     """
     Borra todos los registros de IMC de adultos (donde sexo es NULL) de la base de datos.
     """
-    inicializar_base_de_datos()
-    db_path = obtener_ruta_base_datos()
-    with sqlite3.connect(db_path) as conexion:
-        cur = conexion.cursor()
-        cur.execute("DELETE FROM perfiles WHERE sexo IS NULL")
-        conexion.commit()
+    with conexion_base_datos() as conexion, _disparadores_resumen_en_pausa(conexion):
+        conexion.execute("DELETE FROM perfiles WHERE sexo IS NULL")
+        conexion.execute("DELETE FROM resumen_mensual WHERE es_adulto = 1")
+        conexion.execute(SQL_INCREMENTAR_GENERACION, ("adultos",))
 
 
 def borrar_historial_menores():
     """
     Borra todos los registros de IMC de menores (donde sexo NO es NULL) de la base de datos.
     """
-    inicializar_base_de_datos()
-    db_path = obtener_ruta_base_datos()
-    with sqlite3.connect(db_path) as conexion:
-        cur = conexion.cursor()
-        cur.execute("DELETE FROM perfiles WHERE sexo IS NOT NULL")
-        conexion.commit()
+    with conexion_base_datos() as conexion, _disparadores_resumen_en_pausa(conexion):
+        conexion.execute("DELETE FROM perfiles WHERE sexo IS NOT NULL")
+        conexion.execute("DELETE FROM resumen_mensual WHERE es_adulto = 0")
+        conexion.execute(SQL_INCREMENTAR_GENERACION, ("menores",))
 
 
 def borrar_todos_historiales():
     """
     Borra todos los registros de la base de datos (tanto adultos como menores).
     """
-    inicializar_base_de_datos()
-    db_path = obtener_ruta_base_datos()
-    with sqlite3.connect(db_path) as conexion:
-        cur = conexion.cursor()
-        cur.execute("DELETE FROM perfiles")
-        conexion.commit()
+    with conexion_base_datos() as conexion, _disparadores_resumen_en_pausa(conexion):
+        conexion.execute("DELETE FROM perfiles")
+        conexion.execute("DELETE FROM resumen_mensual")
+        conexion.executemany(SQL_INCREMENTAR_GENERACION, [("adultos",), ("menores",)])
 
 
-def obtener_datos_para_grafico(tipo_historial):
+def reducir_serie_lttb(xs, ys, max_puntos):
+    """
+    Elige como mucho max_puntos puntos de una serie conservando su forma
+    (Largest-Triangle-Three-Buckets). Siempre conserva el primer y el último punto.
+
+    Returns:
+        list: Índices de los puntos elegidos, en orden.
+    """
+    n = len(xs)
+    if n <= max_puntos:
+        return list(range(n))
+    if max_puntos < 3:
+        return [0, n - 1][: max(max_puntos, 0)]
+
+    ancho = (n - 2) / (max_puntos - 2)
+    elegidos = [0]
+    a = 0
+    for i in range(max_puntos - 2):
+        # Punto medio del siguiente cubo, que hace de tercer vértice del triángulo
+        inicio_siguiente = int((i + 1) * ancho) + 1
+        fin_siguiente = min(int((i + 2) * ancho) + 1, n)
+        cantidad = fin_siguiente - inicio_siguiente
+        x_medio = sum(xs[inicio_siguiente:fin_siguiente]) / cantidad
+        y_medio = sum(ys[inicio_siguiente:fin_siguiente]) / cantidad
+
+        # Del cubo actual nos quedamos con el punto que forma el triángulo de mayor área
+        xa, ya = xs[a], ys[a]
+        area_maxima = -1.0
+        for j in range(int(i * ancho) + 1, int((i + 1) * ancho) + 1):
+            area = abs((xa - x_medio) * (ys[j] - ya) - (xa - xs[j]) * (y_medio - ya))
+            if area > area_maxima:
+                area_maxima = area
+                a = j
+        elegidos.append(a)
+    elegidos.append(n - 1)
+    return elegidos
+
+
+def obtener_datos_para_grafico(tipo_historial, max_puntos=None):
     """
     Obtiene fechas e IMCs de la base de datos para un tipo de historial.
+    El orden cronológico lo da el índice sobre 'timestamp', sin parsear ni ordenar en Python.
 
     Args:
         tipo_historial (str): 'adultos' o 'menores'.
+        max_puntos (int, opcional): Si la serie tiene más puntos, se reduce con LTTB
+            conservando su forma (picos incluidos).
 
     Returns:
         tuple: Dos listas, una de fechas (datetime) y otra de IMCs (float).
     """
-    inicializar_base_de_datos()
-    db_path = obtener_ruta_base_datos()
-    with sqlite3.connect(db_path) as conexion:
-        cur = conexion.cursor()
-        if tipo_historial == "adultos":
-            query = "SELECT fecha, imc FROM perfiles WHERE sexo IS NULL ORDER BY fecha ASC"
-        else:  # 'menores'
-            query = "SELECT fecha, percentil FROM perfiles WHERE sexo IS NOT NULL ORDER BY fecha ASC"
-        cur.execute(query)
-        datos = cur.fetchall()
-
-    if not datos:
-        return [], []
-
-    datos_desempaquetados = []
-    for fecha_str, valor in datos:
-        try:
-            # Aseguramos que la fecha se pueda parsear
-            fecha_dt = datetime.strptime(fecha_str, "%d-%m-%Y %H:%M:%S")
-            # Ignoramos valores nulos que podrían estar en la BD
-            if valor is not None:
-                datos_desempaquetados.append((fecha_dt, valor))
-        except (ValueError, TypeError):
-            # Ignoramos registros con fecha inválida para el gráfico
-            continue
-
-    if not datos_desempaquetados:
-        return [], []
-
-    # Ordenamos por fecha por si la base de datos no lo hizo
-    datos_ordenados = sorted(datos_desempaquetados, key=lambda x: x[0])
+    es_adulto = tipo_historial == "adultos"
+    consulta = SQL_DATOS_GRAFICO.format(columna="imc" if es_adulto else "percentil")
+    with conexion_base_datos() as conexion:
+        datos = conexion.execute(consulta, (int(es_adulto),)).fetchall()
+
+    timestamps = [d[0] for d in datos]
+    valores = [d[1] for d in datos]
+    if max_puntos is not None and len(datos) > max_puntos:
+        indices = reducir_serie_lttb(timestamps, valores, max_puntos)
+        timestamps = [timestamps[i] for i in indices]
+        valores = [valores[i] for i in indices]
+
+    fechas = [datetime.fromtimestamp(ts) for ts in timestamps]
+    return fechas, valores
 
-    fechas = [d[0] for d in datos_ordenados]
-    valores = [d[1] for d in datos_ordenados]
 
-    return fechas, valores
+def obtener_serie_agregada(tipo_historial, periodo=None, max_puntos=100) -> dict:
+    """
+    Agrupa la serie del gráfico en intervalos de tiempo dentro de SQLite
+    (media, mínimo y máximo por intervalo), de modo que el resultado tiene
+    como mucho max_puntos puntos por largo que sea el historial.
 
+    Args:
+        tipo_historial (str): 'adultos' (IMC) o 'menores' (percentil).
+        periodo (str, opcional): 'dia', 'semana' o 'mes' (hora local). Sin periodo se
+            usan intervalos de igual duración calculados para no pasar de max_puntos.
+        max_puntos (int): Número máximo de intervalos; con un periodo fijo se
+            devuelven los más recientes. Con menos de 1 no se devuelve ninguno.
 
-def calcular_edad_exacta_en_meses(fecha_nacimiento_str):
+    Returns:
+        dict: {"fechas": [datetime de inicio], "media": [...], "minimo": [...],
+               "maximo": [...], "mediciones": [cantidad por intervalo]}
+    """
+    es_adulto = int(tipo_historial == "adultos")
+    columna = "imc" if es_adulto else "percentil"
+    resultado = {"fechas": [], "media": [], "minimo": [], "maximo": [], "mediciones": []}
+    if periodo is not None and periodo not in PERIODOS_AGREGACION:
+        raise ValueError(f"Periodo desconocido: {periodo}. Use uno de {tuple(PERIODOS_AGREGACION)}")
+    # Como en reducir_serie_lttb, un máximo menor que 1 no deja ningún punto (y en SQLite
+    # un LIMIT negativo no limitaría nada)
+    if max_puntos < 1:
+        return resultado
+
+    with conexion_base_datos() as conexion:
+        if periodo is not None:
+            inicio = PERIODOS_AGREGACION[periodo]
+        else:
+            primero, ultimo = conexion.execute(SQL_RANGO_TIMESTAMPS, (es_adulto,)).fetchone()
+            if primero is None:
+                return resultado
+            # Ancho entero en segundos para que (ultimo - primero) / ancho < max_puntos
+            ancho = (ultimo - primero) // max_puntos + 1
+            inicio = f"{int(primero)} + (timestamp - {int(primero)}) / {int(ancho)} * {int(ancho)}"
+        consulta = SQL_SERIE_AGREGADA.format(inicio=inicio, columna=columna)
+        datos = conexion.execute(consulta, (es_adulto, max_puntos)).fetchall()
+
+    for inicio_ts, media, minimo, maximo, mediciones in reversed(datos):
+        resultado["fechas"].append(datetime.fromtimestamp(inicio_ts))
+        resultado["media"].append(media)
+        resultado["minimo"].append(minimo)
+        resultado["maximo"].append(maximo)
+        resultado["mediciones"].append(mediciones)
+    return resultado
+
+
+def _leer_fecha_nacimiento(fecha_str):
+    """Convierte a datetime una fecha "YYYY-MM-DD", "DD/MM/YYYY" o "DD-MM-YYYY"; ValueError si no lo es."""
+    # Formato ISO: YYYY-MM-DD
+    if re.match(r"^\d{4}-\d{2}-\d{2}$", fecha_str):
+        return datetime.strptime(fecha_str, "%Y-%m-%d")
+    # Formato DD/MM/YYYY
+    if re.match(r"^\d{1,2}/\d{1,2}/\d{4}$", fecha_str):
+        return datetime.strptime(fecha_str, "%d/%m/%Y")
+    # Formato DD-MM-YYYY
+    if re.match(r"^\d{1,2}-\d{1,2}-\d{4}$", fecha_str):
+        return datetime.strptime(fecha_str, "%d-%m-%Y")
+    raise ValueError("Formato de fecha no válido. Use DD/MM/YYYY o YYYY-MM-DD")
+
+
+def calcular_edad_exacta_en_meses(fecha_nacimiento_str, fecha_referencia=None):
     """
     Calcula la edad exacta en meses desde la fecha de nacimiento hasta hoy.
 
     Args:
         fecha_nacimiento_str: Fecha en formato "YYYY-MM-DD" o "DD/MM/YYYY"
+        fecha_referencia: datetime con el que calcular la edad en lugar de ahora
+                          (para que un cribado dé el mismo resultado cualquier día)
 
     Returns:
         int: Edad en meses completos
     """
 
     try:
-        # Intentar diferentes formatos de fecha
-        fecha_str = fecha_nacimiento_str.strip()
-
-        # Formato ISO: YYYY-MM-DD
-        if re.match(r"^\d{4}-\d{2}-\d{2}$", fecha_str):
-            fecha_nacimiento = datetime.strptime(fecha_str, "%Y-%m-%d")
-        # Formato DD/MM/YYYY
-        elif re.match(r"^\d{1,2}/\d{1,2}/\d{4}$", fecha_str):
-            fecha_nacimiento = datetime.strptime(fecha_str, "%d/%m/%Y")
-        # Formato DD-MM-YYYY
-        elif re.match(r"^\d{1,2}-\d{1,2}-\d{4}$", fecha_str):
-            fecha_nacimiento = datetime.strptime(fecha_str, "%d-%m-%Y")
-        else:
-            raise ValueError("Formato de fecha no válido. Use DD/MM/YYYY o YYYY-MM-DD")
+        fecha_nacimiento = _leer_fecha_nacimiento(fecha_nacimiento_str.strip())
 
         # Calcular edad exacta
-        fecha_actual = datetime.now()
+        fecha_actual = datetime.now() if fecha_referencia is None else fecha_referencia
 
         # Verificar que la fecha de nacimiento no sea futura
         if fecha_nacimiento > fecha_actual:
@@ -326,17 +1350,118 @@ def calcular_edad_exacta_en_meses(fecha_nacimiento_str):
         raise ValueError(f"Error procesando fecha de nacimiento: {str(e)}")
 
 
+# Fechas de nacimiento ya interpretadas (texto -> (año, mes, día, mensaje de error o None));
+# en una cohorte se repiten mucho, y el resultado no depende de la fecha de referencia
+_fechas_nacimiento = {}
+MAX_FECHAS_NACIMIENTO_CACHE = 100_000
+
+
+def _es_numero_ascii(texto):
+    return texto.isascii() and texto.isdigit()
+
+
+def _parsear_fecha_nacimiento(texto):
+    """
+    Interpreta una fecha de nacimiento como lo hace calcular_edad_exacta_en_meses.
+    La forma habitual (YYYY-MM-DD, DD/MM/YYYY o DD-MM-YYYY con dígitos ASCII) se
+    reconoce por la posición de los separadores, sin regex ni strptime; cualquier
+    otro caso, o una fecha imposible, pasa por la función escalar para obtener
+    exactamente su mensaje de error.
+
+    Returns:
+        tuple: (año, mes, día, None) o (0, 0, 0, mensaje de error)
+    """
+    fecha = texto.strip()
+    partes = None
+    if len(fecha) == 10 and fecha[4] == "-" and fecha[7] == "-":
+        partes = (fecha[:4], fecha[5:7], fecha[8:])
+    else:
+        for separador in "/-":
+            trozos = fecha.split(separador)
+            if len(trozos) == 3 and len(trozos[2]) == 4 and 1 <= len(trozos[0]) <= 2 and 1 <= len(trozos[1]) <= 2:
+                partes = (trozos[2], trozos[1], trozos[0])
+                break
+    if partes is not None and all(_es_numero_ascii(parte) for parte in partes):
+        try:
+            nacimiento = datetime(int(partes[0]), int(partes[1]), int(partes[2]))
+        except ValueError:
+            pass
+        else:
+            return nacimiento.year, nacimiento.month, nacimiento.day, None
+    # Caso raro (formato no reconocido, fecha imposible, dígitos no ASCII): vía escalar
+    try:
+        nacimiento = _leer_fecha_nacimiento(fecha)
+    except ValueError as e:
+        return 0, 0, 0, f"Error procesando fecha de nacimiento: {str(e)}"
+    return nacimiento.year, nacimiento.month, nacimiento.day, None
+
+
+def calcular_edades_en_meses_batch(fechas_nacimiento, fecha_referencia=None):
+    """
+    Versión por columnas de calcular_edad_exacta_en_meses: mismos formatos, mismo
+    cálculo de meses completos y mismos mensajes de error, contra una única fecha
+    de referencia (por defecto, ahora) para que el resultado sea reproducible.
+
+    Args:
+        fechas_nacimiento: Lista/array de textos "YYYY-MM-DD", "DD/MM/YYYY" o "DD-MM-YYYY"
+        fecha_referencia: datetime (o date) en el que se calculan las edades
+
+    Returns:
+        tuple: (array int64 de edades en meses, -1 en las filas con error,
+                máscara bool de error, array de mensajes de error o None por fila)
+    """
+    import numpy as np
+
+    if fecha_referencia is None:
+        fecha_referencia = datetime.now()
+    elif not isinstance(fecha_referencia, datetime):
+        fecha_referencia = datetime(fecha_referencia.year, fecha_referencia.month, fecha_referencia.day)
+
+    # Cada texto distinto se interpreta una sola vez; el resto del cálculo es sobre arrays
+    codigos = {}
+    indices = np.empty(len(fechas_nacimiento), dtype=np.intp)
+    for i, fecha in enumerate(fechas_nacimiento):
+        indices[i] = codigos.setdefault(fecha, len(codigos))
+
+    if len(_fechas_nacimiento) > MAX_FECHAS_NACIMIENTO_CACHE:
+        _fechas_nacimiento.clear()
+    anios = np.zeros(len(codigos), dtype=np.int64)
+    meses = np.zeros(len(codigos), dtype=np.int64)
+    dias = np.zeros(len(codigos), dtype=np.int64)
+    mensajes_unicos = np.full(len(codigos), None, dtype=object)
+    for j, fecha in enumerate(codigos):
+        if not isinstance(fecha, str):
+            mensajes_unicos[j] = f"Error procesando fecha de nacimiento: Formato de fecha no válido: {fecha!r}"
+            continue
+        resultado = _fechas_nacimiento.get(fecha)
+        if resultado is None:
+            resultado = _fechas_nacimiento[fecha] = _parsear_fecha_nacimiento(fecha)
+        anios[j], meses[j], dias[j], mensajes_unicos[j] = resultado
+
+    # Nacimiento en el futuro: como la fecha de nacimiento es a medianoche, basta comparar días
+    validas = np.equal(mensajes_unicos, None)
+    referencia = (fecha_referencia.year, fecha_referencia.month, fecha_referencia.day)
+    futuras = validas & (
+        (anios > referencia[0])
+        | ((anios == referencia[0]) & (meses > referencia[1]))
+        | ((anios == referencia[0]) & (meses == referencia[1]) & (dias > referencia[2]))
+    )
+    mensajes_unicos[futuras] = "Error procesando fecha de nacimiento: La fecha de nacimiento no puede ser en el futuro"
+
+    edades_unicas = (referencia[0] - anios) * 12 + (referencia[1] - meses) - (referencia[2] < dias)
+    error_unico = np.not_equal(mensajes_unicos, None)
+    edades_unicas[error_unico] = -1
+
+    return edades_unicas[indices], error_unico[indices], mensajes_unicos[indices]
+
+
 def obtener_historial_adultos():
     """
     Devuelve el historial de mediciones de adultos (donde sexo es NULL).
     Retorna una lista de diccionarios con los campos relevantes.
     """
-    inicializar_base_de_datos()
-    db_path = obtener_ruta_base_datos()
-    with sqlite3.connect(db_path) as conexion:
-        cur = conexion.cursor()
-        cur.execute("SELECT peso, altura, imc, fecha FROM perfiles " "WHERE sexo IS NULL ORDER BY fecha DESC")
-        datos = cur.fetchall()
+    with conexion_base_datos() as conexion:
+        datos = conexion.execute(SQL_HISTORIAL_ADULTOS).fetchall()
     historial = []
     for d in datos:
         historial.append({"peso": d[0], "altura": d[1], "imc": d[2], "fecha": d[3]})
@@ -349,15 +1474,8 @@ def obtener_historial_menores():
     Retorna una lista de diccionarios con los campos relevantes,
     ordenados por fecha descendente (más recientes primero).
     """
-    inicializar_base_de_datos()
-    db_path = obtener_ruta_base_datos()
-    with sqlite3.connect(db_path) as conexion:
-        cur = conexion.cursor()
-        cur.execute(
-            "SELECT peso, altura, imc, fecha, sexo, edad_meses, percentil "
-            "FROM perfiles WHERE sexo IS NOT NULL ORDER BY fecha ASC"
-        )
-        datos = cur.fetchall()
+    with conexion_base_datos() as conexion:
+        datos = conexion.execute(SQL_HISTORIAL_MENORES).fetchall()
     historial = []
     for d in datos:
         historial.append(
@@ -371,5 +1489,56 @@ def obtener_historial_menores():
                 "percentil": d[6],
             }
         )
-    # Invertir la lista para que los registros más recientes aparezcan primero
-    return list(reversed(historial))
+    return historial
+
+
+def _empaquetar_columna(tipo_array, valores):
+    if tipo_array is None:
+        texto = SEPARADOR_TEXTOS.join(valores)
+        if texto.count(SEPARADOR_TEXTOS) != max(len(valores) - 1, 0):
+            # Algún valor escrito a mano trae el separador: se quita para no descuadrar las filas
+            texto = SEPARADOR_TEXTOS.join(v.replace(SEPARADOR_TEXTOS, "") for v in valores)
+        return texto
+    try:
+        return array(tipo_array, valores)
+    except (TypeError, OverflowError):
+        # NULL en columnas REAL; un valor no numérico o fuera de rango se trata como
+        # desconocido (NaN o -1) en lugar de dejar sin historial toda la pantalla
+        desconocido = math.nan if tipo_array == "d" else -1
+        return array(tipo_array, [_valor_empaquetable(tipo_array, v, desconocido) for v in valores])
+
+
+def _valor_empaquetable(tipo_array, valor, desconocido):
+    try:
+        array(tipo_array, [valor])
+    except (TypeError, OverflowError):
+        return desconocido
+    return valor
+
+
+def obtener_historial_columnas(tipo_historial) -> dict:
+    """
+    Devuelve el historial completo (mismo orden que obtener_historial_*) en formato
+    por columnas: un array.array por campo numérico y las fechas en un único texto
+    separado por SEPARADOR_TEXTOS.
+
+    Args:
+        tipo_historial (str): 'adultos' o 'menores'.
+
+    Returns:
+        dict: {"filas": número de filas, y por cada campo de COLUMNAS_HISTORIAL su
+               columna empaquetada según TIPOS_COLUMNAS_HISTORIAL}
+    """
+    tipo = "adultos" if tipo_historial == "adultos" else "menores"
+    columnas = COLUMNAS_HISTORIAL[tipo]
+    expresiones = ", ".join(EXPRESIONES_COLUMNAS_HISTORIAL.get(columna, columna) for columna in columnas)
+    with conexion_base_datos() as conexion:
+        datos = conexion.execute(
+            SQL_HISTORIAL_COLUMNAS.format(columnas=expresiones), (int(tipo == "adultos"),)
+        ).fetchall()
+
+    valores_por_columna = zip(*datos) if datos else [()] * len(columnas)
+    historial = {"filas": len(datos)}
+    for columna, valores in zip(columnas, valores_por_columna):
+        historial[columna] = _empaquetar_columna(TIPOS_COLUMNAS_HISTORIAL[columna], valores)
+    return historial
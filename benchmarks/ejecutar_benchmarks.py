@@ -0,0 +1,666 @@
+###
+# Benchmarks de la capa Python (cálculos de IMC, percentiles e historial SQLite)
+# Se ejecutan en CPython de escritorio con el módulo `java` de Chaquopy sustituido
+# por benchmarks/stubs/java.py. Guardan los resultados en JSON y pueden compararse
+# contra una ejecución anterior para detectar regresiones.
+#
+# Uso:
+#   python benchmarks/ejecutar_benchmarks.py --salida base.json
+#   python benchmarks/ejecutar_benchmarks.py --comparar base.json --umbral 0.25
+###
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+DIRECTORIO_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIO_STUBS = os.path.join(DIRECTORIO_BENCHMARKS, "stubs")
+DIRECTORIO_PYTHON = os.path.normpath(os.path.join(DIRECTORIO_BENCHMARKS, "..", "app", "src", "main", "python"))
+sys.path[:0] = [DIRECTORIO_STUBS, DIRECTORIO_PYTHON]
+
+import base_datos_async  # noqa: E402
+import funciones_imc_android as imc  # noqa: E402
+import paralelo  # noqa: E402
+import utilidades  # noqa: E402
+
+TAMANOS_POR_DEFECTO = (1_000, 100_000, 1_000_000)
+UMBRAL_POR_DEFECTO = 0.25
+SEMILLA = 20240601
+
+# Registro de benchmarks: (nombre, función, usa_tamano). Cada función recibe el tamaño
+# y devuelve (operaciones, segundos) de la mejor repetición y, opcionalmente, un dict
+# de métricas adicionales (p. ej. cruces del puente Kotlin-Python que supondría).
+BENCHMARKS = []
+
+
+def benchmark(nombre, usa_tamano=True):
+    """Registra una función de benchmark con el nombre dado."""
+
+    def registrar(funcion):
+        BENCHMARKS.append((nombre, funcion, usa_tamano))
+        return funcion
+
+    return registrar
+
+
+def medir(funcion, operaciones, repeticiones=3, preparar=None):
+    """
+    Ejecuta `funcion` varias veces y devuelve (operaciones, mejor tiempo en segundos).
+    `preparar` se llama antes de cada repetición sin contar en el tiempo.
+    """
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return operaciones, mejor
+
+
+###
+# Datos de entrada deterministas
+###
+
+
+def entradas_adultos(n):
+    rng = random.Random(SEMILLA)
+    return [(f"{rng.uniform(40, 130):.1f}", f"{rng.uniform(145, 205):.0f}") for _ in range(n)]
+
+
+def entradas_menores(n):
+    rng = random.Random(SEMILLA)
+    return [
+        (
+            rng.choice(("Masculino", "Femenino")),
+            round(rng.uniform(5, 18.9), 1),
+            f"{rng.uniform(15, 80):.1f}",
+            f"{rng.uniform(105, 185):.0f}",
+        )
+        for _ in range(n)
+    ]
+
+
+def fechas_nacimiento(n):
+    rng = random.Random(SEMILLA)
+    hoy = datetime.now()
+    return [(hoy - timedelta(days=rng.randint(1830, 6900))).strftime("%d/%m/%Y") for _ in range(n)]
+
+
+def entradas_sucias(n, proporcion_invalidas=0.15):
+    """Pesos y alturas como texto (coma o punto decimal, cm o m) con un 15 % de filas inválidas."""
+    rng = random.Random(SEMILLA)
+    invalidos = ("", "abc", "N/A", "70kg", "-", "0")
+    pesos, alturas = [], []
+    for _ in range(n):
+        if rng.random() < proporcion_invalidas:
+            pesos.append(rng.choice(invalidos))
+            alturas.append(rng.choice(invalidos))
+        else:
+            pesos.append(f"{rng.uniform(20, 120):.1f}".replace(".", rng.choice(".,")))
+            alturas.append(str(rng.randint(100, 200)) if rng.random() < 0.5 else f"{rng.uniform(1.0, 2.0):.2f}")
+    return pesos, alturas
+
+
+def mediciones_historial(n):
+    """Mediciones para poblar la base de datos: mitad adultos y mitad menores."""
+    rng = random.Random(SEMILLA)
+    inicio = int(datetime(2020, 1, 1).timestamp())
+    for i in range(n):
+        timestamp = inicio + i * 600
+        if i % 2:
+            yield {
+                "peso": rng.uniform(40, 130),
+                "altura": rng.uniform(1.45, 2.05),
+                "imc": rng.uniform(16, 40),
+                "timestamp": timestamp,
+            }
+        else:
+            yield {
+                "peso": rng.uniform(15, 80),
+                "altura": rng.uniform(1.05, 1.85),
+                "imc": rng.uniform(13, 30),
+                "sexo": rng.choice(("Masculino", "Femenino")),
+                "edad_meses": round(rng.uniform(5, 18.9), 1),
+                "percentil": rng.uniform(1, 99),
+                "timestamp": timestamp,
+            }
+
+
+###
+# Cálculos
+###
+
+
+@benchmark("calcular_imc")
+def bench_calcular_imc(n):
+    entradas = entradas_adultos(n)
+    calcular_imc = imc.calcular_imc
+    return medir(lambda: [calcular_imc(peso, altura) for peso, altura in entradas], n)
+
+
+@benchmark("obtener_categoria_imc")
+def bench_obtener_categoria_imc(n):
+    rng = random.Random(SEMILLA)
+    valores = [round(rng.uniform(12, 50), 2) for _ in range(n)]
+    obtener_categoria_imc = imc.obtener_categoria_imc
+    return medir(lambda: [obtener_categoria_imc(valor) for valor in valores], n)
+
+
+@benchmark("calcular_imc_menor")
+def bench_calcular_imc_menor(n):
+    entradas = entradas_menores(n)
+    calcular_imc_menor = imc.calcular_imc_menor
+    imc.precargar_percentiles()
+    return medir(lambda: [calcular_imc_menor(*entrada) for entrada in entradas], n)
+
+
+@benchmark("calcular_imc_menor_por_fecha")
+def bench_calcular_imc_menor_por_fecha(n):
+    entradas = entradas_menores(n)
+    fechas = fechas_nacimiento(n)
+    calcular = imc.calcular_imc_menor_por_fecha
+    imc.precargar_percentiles()
+
+    def ejecutar():
+        for (sexo, _, peso, altura), fecha in zip(entradas, fechas):
+            calcular(sexo, fecha, peso, altura)
+
+    return medir(ejecutar, n)
+
+
+@benchmark("calcular_edad_exacta_en_meses")
+def bench_calcular_edad_exacta_en_meses(n):
+    fechas = fechas_nacimiento(n)
+    referencia = datetime(2025, 1, 1)
+    return medir(lambda: [utilidades.calcular_edad_exacta_en_meses(fecha, referencia) for fecha in fechas], n)
+
+
+@benchmark("calcular_edades_en_meses_batch")
+def bench_calcular_edades_en_meses_batch(n):
+    fechas = fechas_nacimiento(n)
+    referencia = datetime(2025, 1, 1)
+    # Caché de fechas vacía antes de cada repetición: se mide el caso de una cohorte nueva
+    return medir(
+        lambda: utilidades.calcular_edades_en_meses_batch(fechas, referencia),
+        n,
+        preparar=utilidades._fechas_nacimiento.clear,
+    )
+
+
+@benchmark("calcular_imc_menor_por_fecha_batch")
+def bench_calcular_imc_menor_por_fecha_batch(n):
+    sexos, _, pesos, alturas = zip(*entradas_menores(n))
+    fechas = fechas_nacimiento(n)
+    imc.precargar_percentiles()
+    return medir(lambda: imc.calcular_imc_menor_por_fecha_batch(sexos, fechas, pesos, alturas), n)
+
+
+@benchmark("normalizar_pesos_alturas")
+def bench_normalizar_pesos_alturas(n):
+    pesos, alturas = entradas_sucias(n)
+
+    def ejecutar():
+        imc.normalizar_pesos(pesos)
+        imc.normalizar_alturas(alturas)
+
+    return medir(ejecutar, n)
+
+
+@benchmark("calcular_imc_menor_batch")
+def bench_calcular_imc_menor_batch(n):
+    sexos, edades, pesos, alturas = zip(*entradas_menores(n))
+    imc.precargar_percentiles()
+    return medir(lambda: imc.calcular_imc_menor_batch(sexos, edades, pesos, alturas), n)
+
+
+@benchmark("calcular_imc_adulto_batch")
+def bench_calcular_imc_adulto_batch(n):
+    pesos, alturas = zip(*entradas_adultos(n))
+    return medir(lambda: imc.calcular_imc_adulto_batch(pesos, alturas), n)
+
+
+# Escalado del modo paralelo (paralelo.EjecutorParalelo). El arranque del grupo de procesos
+# queda fuera de la medida; con 1 proceso se mide el coste de enviar los bloques a otro proceso.
+PROCESOS_PARALELO = (1, 4, 16, 32)
+
+
+def medir_paralelo(procesos, calcular):
+    def bench(n):
+        with paralelo.EjecutorParalelo(procesos) as ejecutor:
+            # Una primera llamada arranca todos los procesos antes de medir
+            calcular(ejecutor, n)
+            return (*medir(lambda: calcular(ejecutor, n), n), {"procesos": procesos, "cpus": os.cpu_count()})
+
+    return bench
+
+
+# Entradas del último tamaño medido, compartidas por todas las configuraciones de procesos
+_entradas_paralelo = {}
+
+
+def entradas_paralelo(generar, n):
+    clave = (generar.__name__, n)
+    if clave not in _entradas_paralelo:
+        _entradas_paralelo.clear()
+        _entradas_paralelo[clave] = list(zip(*generar(n)))
+    return _entradas_paralelo[clave]
+
+
+def calcular_menores_paralelo(ejecutor, n):
+    return ejecutor.calcular_imc_menor_batch(*entradas_paralelo(entradas_menores, n))
+
+
+def calcular_adultos_paralelo(ejecutor, n):
+    return ejecutor.calcular_imc_adulto_batch(*entradas_paralelo(entradas_adultos, n))
+
+
+for _procesos in PROCESOS_PARALELO:
+    benchmark(f"calcular_imc_menor_batch_paralelo_{_procesos}p")(medir_paralelo(_procesos, calcular_menores_paralelo))
+    benchmark(f"calcular_imc_adulto_batch_paralelo_{_procesos}p")(medir_paralelo(_procesos, calcular_adultos_paralelo))
+
+
+def llamar_por_fachada(entradas):
+    """Llama a calcular_imc buscándola en el módulo en cada llamada, como hace Kotlin con callAttr."""
+    for peso, altura in entradas:
+        imc.calcular_imc(peso, altura)
+
+
+@benchmark("fachada_calcular_imc")
+def bench_fachada_calcular_imc(n):
+    entradas = entradas_adultos(n)
+    return medir(lambda: llamar_por_fachada(entradas), n)
+
+
+@benchmark("fachada_calcular_imc_instrumentada")
+def bench_fachada_calcular_imc_instrumentada(n):
+    entradas = entradas_adultos(n)
+    imc.activar_instrumentacion()
+    try:
+        return medir(lambda: llamar_por_fachada(entradas), n)
+    finally:
+        imc.desactivar_instrumentacion()
+        imc.obtener_estadisticas(reiniciar=True)
+
+
+# Cruces del puente de la pantalla de adultos con llamadas separadas: calcular_imc e
+# interpretar_imc (llamada + conversión), obtener_rangos_imc + asList y 6 get con
+# conversión por cada uno de los 6 rangos, y calcular_posicion_en_barra
+CRUCES_PANTALLA_ADULTOS_SEPARADA = 2 + 2 + 2 + 6 * 6 * 2 + 2
+# Con evaluar_imc_adulto: la llamada y get + conversión de 4 campos y 6 columnas de rangos
+CRUCES_PANTALLA_ADULTOS_FUSIONADA = 1 + (4 + 6) * 2
+
+
+@benchmark("pantalla_adultos_separada")
+def bench_pantalla_adultos_separada(n):
+    entradas = entradas_adultos(n)
+
+    def ejecutar():
+        for peso, altura in entradas:
+            valor = imc.calcular_imc(peso, altura)
+            imc.interpretar_imc(valor)
+            for rango in imc.obtener_rangos_imc():
+                for clave in ("key", "nombre", "rango_texto", "min_valor", "max_valor", "color"):
+                    rango.get(clave)
+            imc.calcular_posicion_en_barra(valor)
+
+    return (*medir(ejecutar, n), {"cruces_puente": CRUCES_PANTALLA_ADULTOS_SEPARADA * n})
+
+
+@benchmark("pantalla_adultos_fusionada")
+def bench_pantalla_adultos_fusionada(n):
+    entradas = entradas_adultos(n)
+    return (
+        *medir(lambda: [imc.evaluar_imc_adulto(peso, altura) for peso, altura in entradas], n),
+        {"cruces_puente": CRUCES_PANTALLA_ADULTOS_FUSIONADA * n},
+    )
+
+
+@benchmark("cargar_percentiles", usa_tamano=False)
+def bench_cargar_percentiles(_):
+    def ejecutar():
+        imc.invalidar_cache_percentiles()
+        imc.cargar_percentiles("Masculino")
+        imc.cargar_percentiles("Femenino")
+
+    return medir(ejecutar, 2)
+
+
+###
+# Historial SQLite: cada tamaño es el número de filas de la tabla
+###
+
+
+def preparar_base_datos(n):
+    """Crea una base de datos temporal con n mediciones y devuelve su ruta."""
+    descriptor, ruta = tempfile.mkstemp(prefix="historial_bench_", suffix=".db")
+    os.close(descriptor)
+    os.remove(ruta)
+    utilidades.establecer_ruta_base_datos(ruta)
+    utilidades.inicializar_base_de_datos()
+    return ruta
+
+
+def eliminar_base_datos(ruta):
+    utilidades.cerrar_base_datos()
+    for sufijo in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+
+
+def consumir_historial_filas():
+    """
+    Reproduce lo que hace HistorialFragment con obtener_historial_menores y cuenta los
+    cruces del puente Kotlin-Python: la llamada, asList() y, por fila, asMap() más
+    fromJava(clave), get y toString() de cada campo.
+    """
+    cruces = 2
+    filas = imc.obtener_historial_menores()
+    for fila in filas:
+        cruces += 1
+        for clave in fila:
+            str(fila[clave])
+            cruces += 3
+    return len(filas), cruces
+
+
+def consumir_historial_columnas():
+    """Igual con obtener_historial_columnas: la llamada y, por columna, get y toJava()."""
+    cruces = 1
+    historial = imc.obtener_historial_columnas("menores")
+    for clave, columna in historial.items():
+        columna.tobytes() if hasattr(columna, "tobytes") else str(columna)
+        cruces += 2
+    return historial["filas"], cruces
+
+
+def medir_latencia_llamante():
+    """
+    Mide el máximo tiempo que un bucle asyncio deja de responder mientras
+    obtener_historial_menores se ejecuta en el hilo de base de datos.
+    """
+
+    async def medir():
+        consulta = asyncio.ensure_future(base_datos_async.obtener_historial_menores_async())
+        retraso_maximo = 0.0
+        while not consulta.done():
+            inicio = time.perf_counter()
+            await asyncio.sleep(0.001)
+            retraso_maximo = max(retraso_maximo, time.perf_counter() - inicio - 0.001)
+        await consulta
+        return retraso_maximo
+
+    return 1, asyncio.run(medir())
+
+
+def medir_guardados(cantidad):
+    """
+    Llama a guardar_medicion `cantidad` veces midiendo cada llamada; el total incluye
+    vaciar el búfer de escritura diferida, si lo hay. Devuelve las latencias p50/p99.
+    """
+    latencias = []
+    inicio = time.perf_counter()
+    for _ in range(cantidad):
+        inicio_llamada = time.perf_counter_ns()
+        imc.guardar_medicion(70.0, 1.75, 22.86)
+        latencias.append(time.perf_counter_ns() - inicio_llamada)
+    imc.vaciar_escrituras_pendientes()
+    segundos = time.perf_counter() - inicio
+    latencias.sort()
+    return (
+        cantidad,
+        segundos,
+        {"p50_us": latencias[len(latencias) // 2] / 1e3, "p99_us": latencias[int(len(latencias) * 0.99)] / 1e3},
+    )
+
+
+def medir_exportacion_importacion(n):
+    """
+    Exporta la tabla actual a CSV y NDJSON y reimporta el CSV en otra base de datos
+    temporal. Devuelve las mediciones con el pico de memoria Python (tracemalloc) de
+    cada una, que no debe crecer con n.
+    """
+    resultados = {}
+    ruta_actual = utilidades.obtener_ruta_base_datos()
+    directorio = tempfile.mkdtemp(prefix="exportacion_bench_")
+    try:
+        for formato in ("csv", "ndjson"):
+            destino = os.path.join(directorio, f"historial.{formato}")
+            resultados[f"exportar_historial_{formato}"] = medir_con_pico(lambda: imc.exportar_historial(destino), n)
+        ruta_importacion = preparar_base_datos(n)
+        try:
+            origen = os.path.join(directorio, "historial.csv")
+            resultados["importar_historial_csv"] = medir_con_pico(lambda: imc.importar_historial(origen), n)
+        finally:
+            eliminar_base_datos(ruta_importacion)
+            utilidades.establecer_ruta_base_datos(ruta_actual)
+    finally:
+        for nombre in os.listdir(directorio):
+            os.remove(os.path.join(directorio, nombre))
+        os.rmdir(directorio)
+    return resultados
+
+
+def medir_con_pico(funcion, operaciones):
+    """Una sola ejecución de funcion: (operaciones, segundos, {"pico_kb": ...})."""
+    tracemalloc.start()
+    try:
+        inicio = time.perf_counter()
+        funcion()
+        segundos = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return operaciones, segundos, {"pico_kb": pico // 1024}
+
+
+def medir_consumo(consumir, repeticiones=3):
+    """Devuelve (filas, mejor tiempo, cruces del puente) de una forma de leer el historial."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        filas, cruces = consumir()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return max(filas, 1), mejor, {"cruces_puente": cruces}
+
+
+def bench_historial(n):
+    """Ejecuta todas las mediciones del historial sobre una misma tabla de n filas."""
+    resultados = {}
+    ruta = preparar_base_datos(n)
+    try:
+        inicio = time.perf_counter()
+        imc.guardar_mediciones_lote(mediciones_historial(n))
+        resultados["guardar_mediciones_lote"] = (n, time.perf_counter() - inicio)
+
+        resultados["mostrar_historial"] = medir(lambda: imc.mostrar_historial("adultos"), 1)
+        resultados["obtener_historial_menores"] = medir(imc.obtener_historial_menores, 1)
+        resultados["obtener_datos_para_grafico"] = medir(lambda: imc.obtener_datos_para_grafico("adultos"), 1)
+        resultados["obtener_datos_para_grafico_lttb"] = medir(
+            lambda: imc.obtener_datos_para_grafico("adultos", max_puntos=500), 1
+        )
+        resultados["obtener_serie_agregada"] = medir(lambda: imc.obtener_serie_agregada("adultos"), 1)
+        # Con resumen_mensual el coste depende del número de meses, no del de mediciones
+        resultados["obtener_estadisticas_historial"] = medir(lambda: imc.obtener_estadisticas_historial("adultos"), 1)
+        resultados["obtener_medias_mensuales"] = medir(lambda: imc.obtener_medias_mensuales("menores"), 1)
+        resultados["obtener_tendencia"] = medir(lambda: imc.obtener_tendencia("adultos", 30), 1)
+        resultados["obtener_resumen_historial"] = medir(lambda: imc.obtener_resumen_historial("menores"), 1)
+        resultados["obtener_pagina_historial"] = medir(lambda: imc.obtener_pagina_historial("adultos"), 1)
+
+        resultados["consumo_historial_filas"] = medir_consumo(consumir_historial_filas)
+        resultados["consumo_historial_columnas"] = medir_consumo(consumir_historial_columnas)
+
+        # Tiempo que queda bloqueado quien llama: la consulta entera en modo síncrono,
+        # frente al mayor retraso de un bucle asyncio con la versión en segundo plano
+        resultados["latencia_llamante_sincrona"] = medir(imc.obtener_historial_menores, 1, repeticiones=1)
+        resultados["latencia_llamante_async"] = medir_latencia_llamante()
+
+        marca = imc.obtener_cambios_historial("adultos")["marca"]
+        resultados["obtener_cambios_historial"] = medir(lambda: imc.obtener_cambios_historial("adultos", marca), 1)
+
+        resultados.update(medir_exportacion_importacion(n))
+
+        guardados = min(n, 1000)
+        resultados["guardar_medicion"] = medir_guardados(guardados)
+        imc.configurar_escritura_diferida(max_pendientes=100, max_espera_s=0.5)
+        try:
+            resultados["guardar_medicion_diferida"] = medir_guardados(guardados)
+        finally:
+            imc.configurar_escritura_diferida(False)
+        resultados["borrar_historial_adultos"] = medir(imc.borrar_historial_adultos, 1, repeticiones=1)
+    finally:
+        eliminar_base_datos(ruta)
+    return resultados
+
+
+###
+# Coste de importación: motor estándar frente a pandas
+###
+
+CODIGO_IMPORTACION = """
+import resource, sys, time
+sys.path[:0] = {rutas!r}
+inicio = time.perf_counter()
+import funciones_imc_android as imc
+{carga}
+segundos = time.perf_counter() - inicio
+# VmHWM es el pico de este proceso; ru_maxrss puede heredar el del proceso padre tras exec
+try:
+    with open("/proc/self/status") as status:
+        pico_kb = next(int(linea.split()[1]) for linea in status if linea.startswith("VmHWM:"))
+except OSError:
+    pico_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(segundos, pico_kb)
+"""
+
+CARGAS_IMPORTACION = {
+    "importar_estandar": "imc.precargar_percentiles()",
+    "importar_pandas": "imc.cargar_percentiles('Masculino'); imc.cargar_percentiles('Femenino')",
+}
+
+
+def bench_importacion():
+    """Mide en un proceso nuevo el tiempo de importación y el pico de memoria (RSS)."""
+    resultados = {}
+    for nombre, carga in CARGAS_IMPORTACION.items():
+        codigo = CODIGO_IMPORTACION.format(rutas=[DIRECTORIO_STUBS, DIRECTORIO_PYTHON], carga=carga)
+        try:
+            salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            print(f"  {nombre}: error ({e.stderr.strip().splitlines()[-1:]})")
+            continue
+        segundos, rss_kb = salida.stdout.split()
+        resultados[nombre] = {"segundos": float(segundos), "rss_mb": int(rss_kb) / 1024}
+    return resultados
+
+
+###
+# Ejecución, informe y comparación
+###
+
+
+def registrar_resultado(resultados, nombre, tamano, operaciones, segundos, extra=None):
+    clave = nombre if tamano is None else f"{nombre}[{tamano}]"
+    resultados[clave] = {
+        "tamano": tamano,
+        "operaciones": operaciones,
+        "segundos": segundos,
+        "us_por_operacion": segundos / operaciones * 1e6,
+        "operaciones_por_segundo": operaciones / segundos if segundos > 0 else None,
+    }
+    linea = f"  {clave:<50} {segundos:10.4f} s {segundos / operaciones * 1e6:12.2f} µs/op"
+    for metrica, valor in (extra or {}).items():
+        resultados[clave][metrica] = valor
+        linea += f"  {metrica}={valor:g}"
+    print(linea)
+
+
+def ejecutar(tamanos, filtro=None):
+    resultados = {}
+    for nombre, funcion, usa_tamano in BENCHMARKS:
+        if filtro and filtro not in nombre:
+            continue
+        for tamano in tamanos if usa_tamano else (None,):
+            registrar_resultado(resultados, nombre, tamano, *funcion(tamano))
+
+    # Los grupos "historial" e "importacion" se seleccionan por su nombre (o un prefijo)
+    if not filtro or filtro in "historial":
+        for tamano in tamanos:
+            for nombre, medida in bench_historial(tamano).items():
+                registrar_resultado(resultados, nombre, tamano, *medida)
+
+    importacion = {} if filtro and filtro not in "importacion" else bench_importacion()
+    for nombre, datos in importacion.items():
+        print(f"  {nombre:<50} {datos['segundos']:10.4f} s {datos['rss_mb']:10.1f} MB RSS")
+
+    return {
+        "metadatos": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "tamanos": list(tamanos),
+        },
+        "resultados": resultados,
+        "importacion": importacion,
+    }
+
+
+def comparar(actual, base, umbral):
+    """
+    Compara µs/operación con una ejecución anterior.
+    Devuelve la lista de regresiones (cociente mayor que 1 + umbral).
+    """
+    regresiones = []
+    print(f"\nComparación con la base ({base['metadatos']['fecha']}), umbral {umbral:.0%}:")
+    for clave, datos in actual["resultados"].items():
+        anterior = base["resultados"].get(clave)
+        if anterior is None:
+            continue
+        cociente = datos["us_por_operacion"] / anterior["us_por_operacion"]
+        marca = "REGRESIÓN" if cociente > 1 + umbral else ""
+        print(f"  {clave:<50} {cociente:8.2f}x {marca}")
+        if marca:
+            regresiones.append((clave, cociente))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de la capa Python de la calculadora IMC")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS_POR_DEFECTO, help="Tamaños a medir")
+    parser.add_argument(
+        "--filtro",
+        help="Ejecutar solo los benchmarks cuyo nombre contenga este texto (o los grupos historial/importacion)",
+    )
+    parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior para detectar regresiones")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_POR_DEFECTO, help="Empeoramiento tolerado (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    actual = ejecutar(args.tamanos, args.filtro)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(actual, archivo, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        regresiones = comparar(actual, base, args.umbral)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresión(es) por encima del {args.umbral:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
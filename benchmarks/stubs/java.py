@@ -0,0 +1,69 @@
+###
+# Sustituto mínimo del módulo `java` de Chaquopy para ejecutar la capa Python
+# en CPython de escritorio. Solo emula lo que usan utilidades y calculos_menores:
+# ActivityThread.currentApplication() con getAssets()/getDatabasePath(),
+# y los BufferedReader/InputStreamReader usados para leer los CSV.
+###
+
+import os
+import tempfile
+
+DIRECTORIO_ASSETS = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "app", "src", "main", "assets")
+)
+DIRECTORIO_BASES_DATOS = tempfile.mkdtemp(prefix="imc_bench_")
+
+
+class _InputStream:
+    def __init__(self, ruta):
+        self.archivo = open(ruta, encoding="utf-8")
+
+    def close(self):
+        self.archivo.close()
+
+
+class _AssetManager:
+    def open(self, nombre):
+        return _InputStream(os.path.join(DIRECTORIO_ASSETS, nombre))
+
+
+class _Context:
+    def getAssets(self):
+        return _AssetManager()
+
+    def getDatabasePath(self, nombre):
+        return os.path.join(DIRECTORIO_BASES_DATOS, nombre)
+
+
+class _ActivityThread:
+    @staticmethod
+    def currentApplication():
+        return _Context()
+
+
+class _InputStreamReader:
+    def __init__(self, input_stream, codificacion):
+        self.archivo = input_stream.archivo
+
+
+class _BufferedReader:
+    def __init__(self, reader):
+        self.archivo = reader.archivo
+
+    def readLine(self):
+        linea = self.archivo.readline()
+        return None if linea == "" else linea.rstrip("\n")
+
+    def close(self):
+        pass
+
+
+_CLASES = {
+    "android.app.ActivityThread": _ActivityThread,
+    "java.io.BufferedReader": _BufferedReader,
+    "java.io.InputStreamReader": _InputStreamReader,
+}
+
+
+def jclass(nombre):
+    return _CLASES[nombre]
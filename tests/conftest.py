@@ -0,0 +1,30 @@
+###
+# Configuración común de los tests de la capa Python
+# Los módulos de app/src/main/python se importan como lo hace Chaquopy (como módulos
+# de nivel superior) y las tablas de la OMS se leen del directorio de assets del
+# proyecto en lugar de los assets de Android.
+###
+
+import os
+import sys
+
+import pytest
+
+DIRECTORIO_PYTHON = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "app", "src", "main", "python"))
+sys.path.insert(0, DIRECTORIO_PYTHON)
+
+import calculos_menores  # noqa: E402
+import utilidades  # noqa: E402
+
+calculos_menores.establecer_fuente_percentiles(calculos_menores.DIRECTORIO_ASSETS_LOCAL)
+
+
+@pytest.fixture
+def base_datos(tmp_path):
+    """Base de datos vacía en un directorio temporal; devuelve su ruta."""
+    ruta = str(tmp_path / "historial_imc.db")
+    utilidades.establecer_ruta_base_datos(ruta)
+    utilidades.inicializar_base_de_datos()
+    yield ruta
+    utilidades.configurar_escritura_diferida(False)
+    utilidades.cerrar_base_datos()
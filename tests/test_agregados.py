@@ -0,0 +1,138 @@
+###
+# Estadísticas a partir de resumen_mensual: mismas cifras que recorriendo 'perfiles',
+# también por sexo (con los textos localizados) y tras modificar o borrar filas.
+###
+
+import math
+import random
+
+import pytest
+
+import agregados
+import utilidades
+
+AHORA = 1_700_000_000
+SEXOS = [texto for textos in utilidades.SEXOS_GUARDADOS.values() for texto in textos] + ["Otro"]
+
+
+@pytest.fixture
+def historial(base_datos):
+    azar = random.Random(2)
+    mediciones = []
+    for i in range(600):
+        timestamp = AHORA - azar.randint(0, 400) * 86400 - azar.randint(0, 86399)
+        if i % 2:
+            mediciones.append({"peso": 70, "altura": 1.7, "imc": azar.uniform(18, 35), "timestamp": timestamp})
+        else:
+            menor = {"peso": 30, "altura": 1.3, "imc": azar.uniform(12, 25), "sexo": azar.choice(SEXOS)}
+            menor.update(edad_meses=100, percentil=azar.choice([None, azar.uniform(0, 100)]), timestamp=timestamp)
+            mediciones.append(menor)
+    utilidades.guardar_mediciones_lote(mediciones)
+
+
+def _recorrido(tipo, sexo):
+    """Estadísticas calculadas en Python sobre todas las filas de 'perfiles'."""
+    with utilidades.conexion_base_datos() as conexion:
+        filas = conexion.execute("SELECT sexo, imc, percentil FROM perfiles WHERE timestamp IS NOT NULL").fetchall()
+    if tipo == "adultos":
+        filas = [fila for fila in filas if fila[0] is None]
+    else:
+        textos = [t for textos in utilidades.SEXOS_GUARDADOS.values() if sexo in textos for t in textos]
+        filas = [fila for fila in filas if fila[0] is not None and (sexo is None or fila[0] in textos)]
+    imc = [fila[1] for fila in filas]
+    percentiles = [fila[2] for fila in filas if fila[2] is not None]
+    return len(imc), sum(imc) / len(imc), min(imc), max(imc), percentiles
+
+
+def _comprobar(tipo, sexo):
+    estadisticas = agregados.obtener_estadisticas_historial(tipo, sexo)
+    mediciones, media, minimo, maximo, percentiles = _recorrido(tipo, sexo)
+    assert estadisticas["mediciones"] == mediciones
+    assert math.isclose(estadisticas["imc"]["media"], media, rel_tol=1e-12)
+    assert (estadisticas["imc"]["minimo"], estadisticas["imc"]["maximo"]) == (minimo, maximo)
+    if tipo == "menores":
+        assert math.isclose(estadisticas["percentil"]["media"], sum(percentiles) / len(percentiles), rel_tol=1e-12)
+        assert estadisticas["percentil"]["maximo"] == max(percentiles)
+    assert sum(agregados.obtener_medias_mensuales(tipo, sexo, meses=100)["mediciones"]) == mediciones
+
+
+CONSULTAS = [("adultos", None), ("menores", None), ("menores", "Masculino"), ("menores", "Féminin")]
+
+
+@pytest.mark.parametrize("tipo, sexo", CONSULTAS)
+def test_resumen_igual_que_recorrido(historial, tipo, sexo):
+    _comprobar(tipo, sexo)
+
+
+def test_resumen_tras_modificar_y_borrar(historial):
+    with utilidades.conexion_base_datos() as conexion:
+        conexion.execute("UPDATE perfiles SET imc = 99.5 WHERE id = 2")
+        conexion.execute(
+            "UPDATE perfiles SET sexo = 'Female' WHERE id IN (SELECT id FROM perfiles WHERE sexo = 'Male')"
+        )
+        conexion.execute("DELETE FROM perfiles WHERE id % 7 = 0")
+    for tipo, sexo in CONSULTAS:
+        _comprobar(tipo, sexo)
+
+
+def test_sexo_desconocido(historial):
+    with pytest.raises(ValueError, match="Sexo desconocido"):
+        agregados.obtener_estadisticas_historial("menores", "Otro")
+
+
+def _disparadores():
+    with utilidades.conexion_base_datos() as conexion:
+        return {fila[0] for fila in conexion.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+
+
+def test_lote_sobre_meses_existentes(historial, monkeypatch):
+    # El UPSERT agrupado del lote se suma a los meses que ya tenían mediciones
+    monkeypatch.setattr(utilidades, "FILAS_MINIMAS_SIN_DISPARADORES", 50)
+    azar = random.Random(3)
+    utilidades.guardar_mediciones_lote(
+        [{"peso": 70, "altura": 1.7, "imc": azar.uniform(10, 50), "timestamp": AHORA - i * 3600} for i in range(300)],
+        tamano_lote=64,
+    )
+    utilidades.guardar_medicion(60, 1.6, 23.4)
+    assert _disparadores() == set(utilidades.DISPARADORES_RESUMEN)
+    for tipo, sexo in CONSULTAS:
+        _comprobar(tipo, sexo)
+
+
+def test_resumen_tras_borrar_un_historial(historial):
+    utilidades.borrar_historial_adultos()
+    assert agregados.obtener_estadisticas_historial("adultos")["mediciones"] == 0
+    _comprobar("menores", None)
+    # Los disparadores vuelven a mantener el resumen después del borrado
+    assert _disparadores() == set(utilidades.DISPARADORES_RESUMEN)
+    utilidades.guardar_medicion(70, 1.75, 22.9)
+    _comprobar("adultos", None)
+    utilidades.borrar_todos_historiales()
+    with utilidades.conexion_base_datos() as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM resumen_mensual").fetchone()[0] == 0
+
+
+def test_lote_fallido_deja_los_disparadores(historial, monkeypatch):
+    with utilidades.conexion_base_datos() as conexion:
+        antes = conexion.execute("SELECT COUNT(*) FROM perfiles").fetchone()[0]
+    monkeypatch.setattr(utilidades, "FILAS_MINIMAS_SIN_DISPARADORES", 1)
+    monkeypatch.setattr(utilidades, "SQL_ACUMULAR_RESUMEN", "SELECT * FROM tabla_inexistente WHERE ? > 0")
+    with pytest.raises(utilidades.sqlite3.OperationalError):
+        utilidades.guardar_mediciones_lote([{"peso": 70, "altura": 1.7, "imc": 24.2, "timestamp": AHORA}])
+    with utilidades.conexion_base_datos() as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM perfiles").fetchone()[0] == antes
+    assert _disparadores() == set(utilidades.DISPARADORES_RESUMEN)
+
+
+def test_tendencia_exige_un_dia_de_separacion(base_datos):
+    utilidades.guardar_mediciones_lote(
+        [{"peso": 70, "altura": 1.7, "imc": 20 + i, "timestamp": AHORA - 60 + i * 10} for i in range(5)]
+    )
+    tendencia = agregados.obtener_tendencia("adultos", dias=30, ahora=AHORA)
+    assert tendencia["mediciones"] == 5
+    assert tendencia["pendiente_por_dia"] is None and tendencia["variacion"] is None
+
+    utilidades.guardar_mediciones_lote([{"peso": 70, "altura": 1.7, "imc": 30, "timestamp": AHORA - 2 * 86400}])
+    tendencia = agregados.obtener_tendencia("adultos", dias=30, ahora=AHORA)
+    assert tendencia["pendiente_por_dia"] is not None
+    assert math.isclose(tendencia["variacion"], tendencia["pendiente_por_dia"] * 30)
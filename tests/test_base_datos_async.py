@@ -0,0 +1,110 @@
+###
+# Acceso asíncrono: quien llama no espera aunque la base de datos esté ocupada,
+# y los resultados y las excepciones llegan por el Future o la corrutina.
+###
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+import base_datos_async
+import utilidades
+
+# Margen para considerar que una llamada "vuelve enseguida" (la base de datos queda bloqueada 0,5 s)
+ESPERA_MAXIMA_S = 0.1
+BLOQUEO_S = 0.5
+
+
+@pytest.fixture
+def trabajador(base_datos):
+    yield base_datos_async.obtener_trabajador()
+    base_datos_async.cerrar_trabajador(timeout=5)
+
+
+@contextmanager
+def base_datos_ocupada():
+    """Otro hilo retiene la conexión compartida (como un commit lento) hasta salir del bloque."""
+    tomada = threading.Event()
+    soltar = threading.Event()
+
+    def retener():
+        with utilidades.conexion_base_datos():
+            tomada.set()
+            soltar.wait(10)
+
+    hilo = threading.Thread(target=retener)
+    hilo.start()
+    tomada.wait(5)
+    try:
+        yield
+    finally:
+        soltar.set()
+        hilo.join(5)
+
+
+def test_enviar_vuelve_enseguida_con_la_base_de_datos_ocupada(trabajador):
+    with base_datos_ocupada():
+        inicio = time.perf_counter()
+        futures = [base_datos_async.enviar_operacion(utilidades.guardar_medicion, 70, 1.7, 24.2) for _ in range(20)]
+        consulta = base_datos_async.enviar_operacion(utilidades.obtener_historial_adultos)
+        assert time.perf_counter() - inicio < ESPERA_MAXIMA_S
+        time.sleep(BLOQUEO_S / 5)
+        assert not consulta.done()
+    assert all(future.result(5) is None for future in futures)
+    assert len(consulta.result(5)) == 20
+
+
+def test_el_bucle_asyncio_no_se_bloquea(trabajador):
+    async def principal():
+        with base_datos_ocupada():
+            tareas = [
+                asyncio.ensure_future(base_datos_async.guardar_medicion_async(70, 1.7, 24.2)),
+                asyncio.ensure_future(base_datos_async.obtener_historial_adultos_async()),
+            ]
+            # Latido: el mayor retraso respecto a lo esperado mide cuánto se bloqueó el bucle
+            retraso_maximo = 0.0
+            fin = time.perf_counter() + BLOQUEO_S
+            while time.perf_counter() < fin:
+                antes = time.perf_counter()
+                await asyncio.sleep(0.005)
+                retraso_maximo = max(retraso_maximo, time.perf_counter() - antes - 0.005)
+            assert not any(tarea.done() for tarea in tareas)
+        resultados = await asyncio.wait_for(asyncio.gather(*tareas), 5)
+        return retraso_maximo, resultados
+
+    retraso_maximo, (guardado, historial) = asyncio.run(principal())
+    assert retraso_maximo < ESPERA_MAXIMA_S
+    assert guardado is None
+    assert [fila["imc"] for fila in historial] == [24.2]
+
+
+def test_las_excepciones_llegan_al_llamante(trabajador):
+    future = base_datos_async.enviar_operacion(lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        future.result(5)
+
+    with pytest.raises(ValueError, match="Tipo de historial"):
+        asyncio.run(base_datos_async.obtener_estadisticas_historial_async("otro"))
+
+    # El trabajador sigue atendiendo peticiones después de un error
+    assert base_datos_async.enviar_operacion(lambda: 42).result(5) == 42
+
+
+def test_cancelar_una_peticion_pendiente(trabajador):
+    with base_datos_ocupada():
+        en_curso = base_datos_async.enviar_operacion(utilidades.guardar_medicion, 70, 1.7, 24.2)
+        pendiente = base_datos_async.enviar_operacion(utilidades.guardar_medicion, 80, 1.8, 24.7)
+        time.sleep(0.05)
+        assert pendiente.cancel()
+    en_curso.result(5)
+    trabajador.vaciar(5)
+    assert [fila["peso"] for fila in utilidades.obtener_historial_adultos()] == [70]
+
+
+def test_cerrado_rechaza_peticiones(trabajador):
+    trabajador.cerrar(timeout=5)
+    with pytest.raises(RuntimeError):
+        trabajador.enviar(lambda: None)
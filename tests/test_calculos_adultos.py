@@ -0,0 +1,83 @@
+###
+# Paridad de calcular_imc_adulto_batch con la ruta escalar
+# (calcular_imc + obtener_categoria_imc + interpretar_imc + calcular_posicion_en_barra),
+# en las fronteras de cada categoría y con entradas sucias.
+###
+
+import math
+
+import numpy as np
+
+import calculos_adultos as ca
+from utilidades import calcular_imc
+
+RANGOS = ca.obtener_rangos_imc()
+
+
+def _comparar(pesos, alturas):
+    resultado = ca.calcular_imc_adulto_batch(pesos, alturas)
+    for i, (peso, altura) in enumerate(zip(pesos, alturas)):
+        try:
+            imc = calcular_imc(peso, altura)
+        except ValueError as e:
+            assert resultado["error"][i], (peso, altura)
+            assert resultado["mensaje_error"][i] == str(e)
+            assert resultado["categoria"][i] == -1
+            assert resultado["clave"][i] is None and resultado["interpretacion"][i] is None
+            assert math.isnan(resultado["imc"][i]) and math.isnan(resultado["posicion"][i])
+            continue
+        categoria = ca.obtener_categoria_imc(imc)
+        assert not resultado["error"][i], (peso, altura)
+        assert resultado["mensaje_error"][i] is None
+        np.testing.assert_equal(resultado["imc"][i], imc)
+        assert RANGOS[resultado["categoria"][i]] == categoria["categoria"], (peso, altura)
+        assert resultado["clave"][i] == categoria["categoria"]["key"]
+        assert resultado["interpretacion"][i] == ca.interpretar_imc(imc)
+        np.testing.assert_equal(resultado["posicion"][i], ca.calcular_posicion_en_barra(imc))
+    return resultado
+
+
+def test_fronteras_documentadas():
+    # Con altura 1 m el IMC es el peso redondeado a dos decimales
+    pesos = [18.49, 18.5, 24.9, 24.91, 25.0, 29.9, 29.91, 30.0, 34.9, 34.91, 35.0, 39.9, 39.91, 40.0]
+    resultado = _comparar(pesos, [1.0] * len(pesos))
+    assert list(resultado["clave"][:5]) == ["bajo_peso", "peso_normal", "peso_normal", "sobrepeso", "sobrepeso"]
+    assert list(resultado["clave"][-3:]) == ["obesidad_2", "obesidad_3", "obesidad_3"]
+
+
+def test_fronteras_mas_menos_ulp():
+    fronteras = sorted({rango["min_valor"] for rango in RANGOS} | {rango["max_valor"] for rango in RANGOS})
+    pesos = [
+        valor
+        for frontera in fronteras
+        for valor in (math.nextafter(frontera, -math.inf), frontera, math.nextafter(frontera, math.inf))
+        if valor > 0
+    ]
+    _comparar(pesos, [1.0] * len(pesos))
+    # Misma frontera alcanzada con una altura en cm, donde el cociente no es exacto
+    _comparar([24.9 * 1.7**2, 25.0 * 1.7**2, 18.5 * 1.7**2], ["170", "170", "170"])
+
+
+def test_nan_igual_que_escalar():
+    # calcular_imc no rechaza NaN: la versión escalar lo clasifica en el último tramo
+    # (bisect_right con NaN) y el lote debe hacer exactamente lo mismo
+    resultado = _comparar([float("nan"), 70, "nan"], [1.7, float("nan"), 1.7])
+    assert not resultado["error"].any()
+    assert np.isnan(resultado["imc"]).all()
+
+
+def test_entradas_sucias():
+    pesos = ["70,5", " 80.2 ", "abc", "", None, 0, -5, 1001, float("inf"), 65, 65, 65, "65", 72]
+    alturas = ["1,75", "180", 1.8, 1.7, 1.7, 1.7, 1.7, 1.7, 1.7, 0, -1.6, 3.5, "x", float("inf")]
+    resultado = _comparar(pesos, alturas)
+    assert resultado["error"].tolist() == [False, False] + [True] * 12
+
+
+def test_dataframe_igual_que_columnas():
+    import pandas as pd
+
+    pesos, alturas = [55, "70,5", "x"], [1.6, "175", 1.7]
+    por_columnas = ca.calcular_imc_adulto_batch(pesos, alturas)
+    por_dataframe = ca.calcular_imc_adulto_batch(pd.DataFrame({"peso": pesos, "altura": alturas}))
+    for clave, valores in por_columnas.items():
+        np.testing.assert_array_equal(por_dataframe[clave], valores)
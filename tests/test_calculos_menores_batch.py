@@ -0,0 +1,130 @@
+###
+# Paridad de calcular_imc_menor_batch con calcular_imc_menor
+# El lote usa una CDF aproximada y recalcula con la fórmula escalar los percentiles a
+# menos de 1e-4 de una frontera; estas pruebas fijan que el resultado es idéntico,
+# también en los casos límite de redondeo y de interpretación.
+###
+
+import random
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+import calculos_menores as cm
+
+# calcular_imc redondea el IMC a dos decimales, así que las entradas posibles de la fórmula
+# LMS son finitas: cada fila de la tabla (mes) por cada IMC de la rejilla de 0,01
+IMC_REJILLA = [k / 100 for k in range(1000, 4001)]
+
+
+def _filas_cerca_de_fronteras(sexo, margen=1e-3):
+    """
+    Filas (sexo, edad, peso, altura) de toda la rejilla cuyo percentil exacto queda a
+    menos de `margen` de una frontera de interpretación o de redondeo a un decimal.
+    Con altura 1 m el IMC coincide con el peso.
+    """
+    tabla = cm.obtener_tabla_lms(sexo)
+    fronteras = np.array(cm.FRONTERAS_PERCENTIL)
+    filas = []
+    for mes in range(cm.EDAD_MINIMA_MESES, cm.EDAD_MAXIMA_MESES + 1):
+        i = tabla.indice_mas_cercano(mes)
+        L, M, S = tabla.L[i], tabla.M[i], tabla.S[i]
+        percentiles = np.array([cm._z_score_y_percentil(imc, L, M, S)[1] for imc in IMC_REJILLA])
+        cerca_interpretacion = np.abs(percentiles[:, None] - fronteras).min(axis=1) < margen
+        cerca_redondeo = np.abs(percentiles * 10 - np.floor(percentiles * 10) - 0.5) < margen * 10
+        edad = min((mes + 0.5) / 12, 19)
+        filas += [(sexo, edad, IMC_REJILLA[j], 1.0) for j in np.flatnonzero(cerca_interpretacion | cerca_redondeo)]
+    return filas
+
+
+def _comparar(sexos, edades, pesos, alturas):
+    resultado = cm.calcular_imc_menor_batch(sexos, edades, pesos, alturas)
+    for i, fila in enumerate(zip(sexos, edades, pesos, alturas)):
+        escalar = cm.calcular_imc_menor(*fila)
+        if "error" in escalar:
+            assert resultado["error"][i], fila
+            assert resultado["mensaje_error"][i] == escalar["error"], fila
+        else:
+            assert not resultado["error"][i], fila
+            assert resultado["mensaje_error"][i] is None
+            assert resultado["imc"][i] == escalar["imc"], fila
+            assert resultado["percentil"][i] == escalar["percentil"], fila
+            assert resultado["interpretacion"][i] == escalar["interpretacion"], fila
+            assert resultado["edad_meses"][i] == escalar["edad_meses"], fila
+    return resultado
+
+
+def test_paridad_aleatoria():
+    aleatorio = random.Random(20240601)
+    n = 20_000
+    sexos = [aleatorio.choice(("Masculino", "Femenino")) for _ in range(n)]
+    edades = [aleatorio.uniform(5, 19) for _ in range(n)]
+    pesos = [aleatorio.uniform(12, 110) for _ in range(n)]
+    alturas = [aleatorio.uniform(95, 200) for _ in range(n)]
+    resultado = _comparar(sexos, edades, pesos, alturas)
+    assert not resultado["error"].any()
+
+
+@pytest.mark.parametrize("sexo", ["Masculino", "Femenino"])
+def test_paridad_en_fronteras(sexo):
+    filas = _filas_cerca_de_fronteras(sexo)
+    resultado = _comparar(*map(list, zip(*filas)))
+    assert not resultado["error"].any()
+    # Las filas caen a los dos lados de cada frontera
+    assert {"interpretacion_bajo_peso", "interpretacion_peso_saludable"} <= set(resultado["interpretacion"])
+    assert {"interpretacion_sobrepeso", "interpretacion_obesidad"} <= set(resultado["interpretacion"])
+
+
+@pytest.mark.parametrize("sexo", ["Masculino", "Femenino"])
+def test_banda_de_recalculo(sexo):
+    # Con el IMC redondeado casi ningún percentil real cae a menos del error de la CDF
+    # aproximada (~7e-6) de una frontera, así que la banda se prueba con IMC sin redondear
+    # obtenidos invirtiendo la fórmula LMS
+    tabla = cm.obtener_tabla_lms(sexo)
+    objetivos = [3.0, 85.0, 97.0, 12.35, 50.05, 96.95]
+    desplazamientos = [0.0, 1e-9, -1e-9, 1e-6, -1e-6, 5e-6, -5e-6, 5e-5, -5e-5]
+    meses, imc = [], []
+    for mes in range(cm.EDAD_MINIMA_MESES, cm.EDAD_MAXIMA_MESES + 1, 12):
+        i = tabla.indice_mas_cercano(mes)
+        L, M, S = tabla.L[i], tabla.M[i], tabla.S[i]
+        for objetivo in objetivos:
+            for delta in desplazamientos:
+                z = NormalDist().inv_cdf((objetivo + delta) / 100)
+                meses.append(mes)
+                imc.append(M * (1 + L * S * z) ** (1 / L))
+    n = len(imc)
+    mensajes = np.full(n, None, dtype=object)
+    _, percentiles, redondeados = cm._evaluar_lms_array(
+        np.full(n, sexo, dtype=object), np.array(meses), np.array(imc), mensajes
+    )
+    for j in range(n):
+        i = tabla.indice_mas_cercano(meses[j])
+        _, exacto = cm._z_score_y_percentil(imc[j], tabla.L[i], tabla.M[i], tabla.S[i])
+        assert redondeados[j] == round(exacto, 1)
+        assert cm.interpretar_percentil(percentiles[j]) == cm.interpretar_percentil(exacto)
+
+
+def test_paridad_filas_invalidas():
+    filas = [
+        ("X", 10, 30, 1.4),
+        ("Masculino", "abc", 30, 1.4),
+        ("Masculino", None, 30, 1.4),
+        ("Femenino", float("nan"), 30, 1.4),
+        ("Femenino", 4.99, 30, 1.4),
+        ("Femenino", 19.01, 30, 1.4),
+        ("Masculino", "7,5", "x", 1.4),
+        ("Masculino", 7, 0, 1.4),
+        ("Masculino", 7, -3, 1.4),
+        ("Femenino", 7, 30, ""),
+        ("Femenino", 7, 30, -1),
+        ("Femenino", 7, 1500, "1,50"),
+        ("Masculino", 5, "45,5", "400"),
+        ("Masculino", 19, 45.5, 150),
+    ]
+    resultado = _comparar(*map(list, zip(*filas)))
+    assert resultado["error"].sum() >= 10
+    errores = resultado["error"]
+    assert np.isnan(resultado["imc"][errores]).all()
+    assert (resultado["edad_meses"][errores] == -1).all()
+    assert all(valor is None for valor in resultado["interpretacion"][errores])
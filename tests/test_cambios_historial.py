@@ -0,0 +1,69 @@
+###
+# Cambios del historial desde una marca [último id, generación]
+###
+
+import utilidades
+
+
+def _guardar(n, sexo=None):
+    medicion = {"peso": 30, "altura": 1.3, "imc": 17.75, "sexo": sexo, "edad_meses": 120 if sexo else None}
+    utilidades.guardar_mediciones_lote([medicion] * n)
+
+
+def test_sin_marca_devuelve_todo_y_reinicia(base_datos):
+    assert utilidades.obtener_cambios_historial("adultos") == {"filas": [], "reiniciar": True, "marca": [0, 0]}
+    _guardar(3)
+    _guardar(2, "Femenino")
+    cambios = utilidades.obtener_cambios_historial("adultos")
+    assert cambios["reiniciar"] is True
+    assert [fila["id"] for fila in cambios["filas"]] == [1, 2, 3]
+    assert cambios["marca"] == [3, 0]
+
+
+def test_solo_las_filas_nuevas(base_datos):
+    _guardar(3)
+    marca = utilidades.obtener_cambios_historial("adultos")["marca"]
+    assert utilidades.obtener_cambios_historial("adultos", marca) == {"filas": [], "reiniciar": False, "marca": marca}
+
+    _guardar(2, "Male")
+    _guardar(2)
+    cambios = utilidades.obtener_cambios_historial("adultos", marca)
+    assert cambios["reiniciar"] is False
+    assert [fila["id"] for fila in cambios["filas"]] == [6, 7]
+    assert cambios["marca"] == [7, 0]
+    menores = utilidades.obtener_cambios_historial("menores", [3, 0])
+    assert [(fila["id"], fila["sexo"]) for fila in menores["filas"]] == [(4, "Male"), (5, "Male")]
+
+
+def test_borrar_el_otro_historial_no_reinicia(base_datos):
+    _guardar(2)
+    _guardar(2, "Femenino")
+    marca = utilidades.obtener_cambios_historial("adultos")["marca"]
+    utilidades.borrar_historial_menores()
+    _guardar(1)
+    cambios = utilidades.obtener_cambios_historial("adultos", marca)
+    assert cambios["reiniciar"] is False
+    assert [fila["id"] for fila in cambios["filas"]] == [5]
+
+
+def test_borrar_este_historial_reinicia(base_datos):
+    _guardar(4)
+    marca = utilidades.obtener_cambios_historial("adultos")["marca"]
+    utilidades.borrar_historial_adultos()
+    _guardar(1)
+    cambios = utilidades.obtener_cambios_historial("adultos", marca)
+    # Los ids no se reutilizan, pero la copia local tiene filas borradas: se sustituye entera
+    assert cambios["reiniciar"] is True
+    assert [fila["id"] for fila in cambios["filas"]] == [5]
+    assert cambios["marca"] == [5, 1]
+    assert utilidades.obtener_cambios_historial("adultos", cambios["marca"])["reiniciar"] is False
+
+
+def test_borrar_todo_reinicia_ambos(base_datos):
+    _guardar(1)
+    _guardar(1, "Femenino")
+    marcas = {tipo: utilidades.obtener_cambios_historial(tipo)["marca"] for tipo in ("adultos", "menores")}
+    utilidades.borrar_todos_historiales()
+    for tipo, marca in marcas.items():
+        cambios = utilidades.obtener_cambios_historial(tipo, marca)
+        assert cambios == {"filas": [], "reiniciar": True, "marca": [0, 1]}
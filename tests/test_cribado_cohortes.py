@@ -0,0 +1,120 @@
+###
+# Línea de comandos del cribado de cohortes: resultados columna a columna frente a
+# calcular_imc_menor_por_fecha, en CSV y NDJSON, con uno o varios procesos.
+###
+
+import csv
+import json
+from datetime import datetime
+
+import pytest
+
+import calculos_menores
+import cribado_cohortes
+
+FECHA_REFERENCIA = "2025-09-15"
+
+# (id, sexo, fecha de nacimiento, peso, altura) con alias de sexo, formatos de fecha y
+# números variados, y filas con errores
+ALUMNOS = [
+    ("a1", "Femenino", "2014-03-15", "31,5", "135"),
+    ("a2", "M", "15/03/2012", "40", "1.52"),
+    ("a3", "male", "2010-09-15", "55.2", "165"),
+    ("a4", "F", "2008-01-31", "60", "1,68"),
+    ("a5", "Weiblich", "2019-02-28", "20", "1.12"),
+    ("a6", "Masculin", "2016-02-29", "26", "124"),
+    ("e1", "X", "2014-03-15", "31,5", "135"),
+    ("e2", "Femenino", "2014-02-30", "31,5", "135"),
+    ("e3", "Femenino", "ayer", "31,5", "135"),
+    ("e4", "Masculino", "2014-03-15", "treinta", "135"),
+    ("e5", "Masculino", "2014-03-15", "31,5", ""),
+    ("e6", "Masculino", "2022-01-01", "15", "95"),
+    ("e7", "Masculino", "2030-01-01", "31,5", "135"),
+    ("e8", "Femenino", "2014-03-15", "-3", "135"),
+]
+SEXOS = {"Femenino": "Femenino", "M": "Masculino", "male": "Masculino", "F": "Femenino", "Weiblich": "Femenino"}
+SEXOS.update({"Masculin": "Masculino", "Masculino": "Masculino"})
+
+
+def _esperado(alumno):
+    identificador, sexo, fecha, peso, altura = alumno
+    referencia = datetime.strptime(FECHA_REFERENCIA, "%Y-%m-%d")
+    return identificador, calculos_menores.calcular_imc_menor_por_fecha(
+        SEXOS.get(sexo, sexo), fecha, peso, altura, referencia
+    )
+
+
+@pytest.fixture(scope="module")
+def entrada(tmp_path_factory):
+    ruta = tmp_path_factory.mktemp("cribado") / "alumnos.csv"
+    with open(ruta, "w", encoding="utf-8", newline="") as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(["ID", "sex", "dob", "weight", "height"])
+        escritor.writerows(ALUMNOS)
+    return str(ruta)
+
+
+def _leer_csv(ruta):
+    with open(ruta, encoding="utf-8", newline="") as archivo:
+        filas = list(csv.DictReader(archivo))
+    numeros = ("imc", "z_score", "percentil", "edad_años")
+    return [
+        {
+            **fila,
+            **{campo: float(fila[campo]) if fila[campo] else None for campo in numeros},
+            "edad_meses": int(fila["edad_meses"]) if fila["edad_meses"] else None,
+            "interpretacion": fila["interpretacion"] or None,
+            "error": fila["error"] or None,
+        }
+        for fila in filas
+    ]
+
+
+def _leer_ndjson(ruta):
+    with open(ruta, encoding="utf-8") as archivo:
+        return [json.loads(linea) for linea in archivo]
+
+
+@pytest.mark.parametrize("procesos", [None, 2])
+@pytest.mark.parametrize("formato", ["csv", "ndjson"])
+def test_resultados_columna_a_columna(entrada, tmp_path, capsys, formato, procesos):
+    salida = str(tmp_path / f"resultados.{formato}")
+    argumentos = [entrada, salida, "--fecha-referencia", FECHA_REFERENCIA, "--tamano-bloque", "4"]
+    if procesos:
+        argumentos += ["--procesos", str(procesos)]
+
+    assert cribado_cohortes.main(argumentos) == 0
+    assert "14 filas (8 con error)" in capsys.readouterr().err
+
+    filas = _leer_csv(salida) if formato == "csv" else _leer_ndjson(salida)
+    assert [list(fila) for fila in filas] == [list(cribado_cohortes.COLUMNAS_SALIDA)] * len(ALUMNOS)
+    for fila, (identificador, esperado) in zip(filas, map(_esperado, ALUMNOS)):
+        assert fila["id"] == identificador
+        if "error" in esperado:
+            assert fila["error"], identificador
+            assert all(fila[campo] is None for campo in cribado_cohortes.COLUMNAS_SALIDA[1:-1])
+            continue
+        assert fila["error"] is None
+        assert fila["imc"] == esperado["imc"]
+        assert fila["percentil"] == esperado["percentil"]
+        assert fila["interpretacion"] == esperado["interpretacion"]
+        assert fila["edad_meses"] == esperado["edad_meses"]
+        assert fila["edad_años"] == pytest.approx(esperado["edad_años"])
+        # El percentil sale del z-score
+        assert round(calculos_menores.normal_cdf(fila["z_score"]) * 100, 1) == esperado["percentil"]
+
+
+def test_mensajes_de_error(entrada, tmp_path):
+    salida = str(tmp_path / "resultados.ndjson")
+    assert cribado_cohortes.main([entrada, salida, "--fecha-referencia", FECHA_REFERENCIA]) == 0
+    errores = {fila["id"]: fila["error"] for fila in _leer_ndjson(salida) if fila["error"]}
+    assert set(errores) == {"e1", "e2", "e3", "e4", "e5", "e6", "e7", "e8"}
+    assert "Sexo" in errores["e1"]
+    assert "peso" in errores["e4"].lower()
+
+
+def test_cabecera_incompleta(tmp_path, capsys):
+    entrada = tmp_path / "alumnos.csv"
+    entrada.write_text("id,sexo,peso,altura\n1,F,30,130\n", encoding="utf-8")
+    assert cribado_cohortes.main([str(entrada), str(tmp_path / "r.csv"), "--fecha-referencia", FECHA_REFERENCIA]) == 1
+    assert "fecha_nacimiento" in capsys.readouterr().err
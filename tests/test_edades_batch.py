@@ -0,0 +1,137 @@
+###
+# calcular_edades_en_meses_batch: mismas edades y mismos mensajes de error que
+# calcular_edad_exacta_en_meses, también con la caché de fechas ya interpretadas.
+###
+
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import utilidades
+
+REFERENCIAS = [
+    datetime(2025, 9, 15, 10, 30),
+    datetime(2024, 2, 29),
+    datetime(2023, 2, 28, 23, 59, 59),
+    datetime(2025, 3, 31),
+    datetime(2025, 12, 31, 12),
+    datetime(2024, 3, 1),
+]
+
+
+def _escalar(fecha, referencia):
+    try:
+        return utilidades.calcular_edad_exacta_en_meses(fecha, referencia), None
+    except ValueError as e:
+        return -1, str(e)
+
+
+def _comparar(fechas, referencia):
+    edades, error, mensajes = utilidades.calcular_edades_en_meses_batch(fechas, referencia)
+    esperados = [_escalar(fecha, referencia) for fecha in fechas]
+    assert edades.tolist() == [edad for edad, _ in esperados]
+    assert mensajes.tolist() == [mensaje for _, mensaje in esperados]
+    assert error.tolist() == [mensaje is not None for _, mensaje in esperados]
+
+
+def _formatos(dia):
+    return [
+        dia.strftime("%Y-%m-%d"),
+        dia.strftime("%d/%m/%Y"),
+        dia.strftime("%d-%m-%Y"),
+        f"{dia.day}/{dia.month}/{dia.year}",
+        f"{dia.day}-{dia.month}-{dia.year}",
+        f"  {dia:%Y-%m-%d} ",
+    ]
+
+
+def _fechas_aleatorias(n, semilla):
+    azar = random.Random(semilla)
+    inicio = date(2000, 1, 1)
+    return [azar.choice(_formatos(inicio + timedelta(days=azar.randint(0, 365 * 27)))) for _ in range(n)]
+
+
+# Nacimientos a fin de mes y en 29 de febrero, frente a referencias a fin de mes y en años bisiestos
+FINES_DE_MES = [
+    f"{dia:%Y-%m-%d}"
+    for anio in (2012, 2015, 2016, 2019, 2020, 2023, 2024)
+    for mes in range(1, 13)
+    for dia in [date(anio, mes % 12 + 1, 1) - timedelta(days=1) if mes < 12 else date(anio, 12, 31)]
+] + ["29/02/2016", "29-02-2020", "2024-02-29", "28/02/2019", "01/03/2019", "2025-09-15", "2025-09-16"]
+
+INVALIDAS = [
+    "",
+    "   ",
+    "ayer",
+    "2014-02-30",
+    "31/04/2014",
+    "29/02/2019",
+    "2014-13-01",
+    "00/01/2014",
+    "2014/03/15",
+    "15.03.2014",
+    "2014-3-15",
+    "15/03/14",
+    "115/03/2014",
+    "15/003/2014",
+    "１５/03/2014",
+    "2014-03-15T00:00",
+    "2014-03-15\n2014-03-16",
+    "15//2014",
+    "+5/03/2014",
+    " 5/ 3/2014",
+    "2099-01-01",
+    "01/01/3000",
+]
+
+
+@pytest.mark.parametrize("referencia", REFERENCIAS)
+def test_paridad_fechas_aleatorias(referencia):
+    _comparar(_fechas_aleatorias(3000, referencia.toordinal()), referencia)
+
+
+@pytest.mark.parametrize("referencia", REFERENCIAS)
+def test_paridad_fin_de_mes_y_bisiestos(referencia):
+    _comparar(FINES_DE_MES, referencia)
+
+
+@pytest.mark.parametrize("referencia", REFERENCIAS)
+def test_paridad_fechas_invalidas_y_futuras(referencia):
+    futuras = _formatos(referencia.date() + timedelta(days=1)) + _formatos(referencia.date())
+    _comparar(INVALIDAS + futuras, referencia)
+
+
+def test_cache_no_depende_de_la_referencia():
+    fechas = _fechas_aleatorias(500, 7) * 4 + FINES_DE_MES * 3 + INVALIDAS * 2
+    utilidades._fechas_nacimiento.clear()
+    for referencia in REFERENCIAS:
+        # La primera vuelta llena la caché; las siguientes la reutilizan con otra referencia
+        _comparar(fechas, referencia)
+    assert set(utilidades._fechas_nacimiento) >= set(INVALIDAS)
+
+
+def test_cache_se_vacia_al_llenarse(monkeypatch):
+    monkeypatch.setattr(utilidades, "MAX_FECHAS_NACIMIENTO_CACHE", 10)
+    utilidades._fechas_nacimiento.clear()
+    fechas = _fechas_aleatorias(50, 11)
+    _comparar(fechas, REFERENCIAS[0])
+    _comparar(fechas[::-1], REFERENCIAS[1])
+    assert len(utilidades._fechas_nacimiento) <= 50
+
+
+def test_referencia_como_date_y_valores_que_no_son_texto():
+    fechas = ["2014-03-15", "15/03/2014"]
+    como_date = utilidades.calcular_edades_en_meses_batch(fechas, date(2025, 9, 15))
+    como_datetime = utilidades.calcular_edades_en_meses_batch(fechas, datetime(2025, 9, 15))
+    assert como_date[0].tolist() == como_datetime[0].tolist() == [138, 138]
+
+    edades, error, mensajes = utilidades.calcular_edades_en_meses_batch([None, 20140315, "2014-03-15"], REFERENCIAS[0])
+    assert edades.tolist() == [-1, -1, 138]
+    assert error.tolist() == [True, True, False]
+    assert mensajes[0].startswith("Error procesando fecha de nacimiento")
+
+
+def test_columna_vacia():
+    edades, error, mensajes = utilidades.calcular_edades_en_meses_batch([], REFERENCIAS[0])
+    assert len(edades) == len(error) == len(mensajes) == 0
@@ -0,0 +1,115 @@
+###
+# Escritura diferida de guardar_medicion: el búfer se escribe antes de leer, al vaciarlo
+# y al terminar el proceso, y una fila que no se puede insertar no lo bloquea.
+###
+
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+import utilidades
+from conftest import DIRECTORIO_PYTHON
+
+
+@pytest.fixture
+def diferida(base_datos):
+    # Espera larga: en los tests el búfer solo se escribe cuando se pide
+    utilidades.configurar_escritura_diferida(True, max_pendientes=1000, max_espera_s=60)
+    return base_datos
+
+
+def _filas_en_disco(ruta):
+    """Filas visibles desde otra conexión, es decir, ya confirmadas."""
+    conexion = sqlite3.connect(ruta)
+    try:
+        return conexion.execute("SELECT peso, sexo, edad_meses FROM perfiles ORDER BY id").fetchall()
+    finally:
+        conexion.close()
+
+
+def test_se_escribe_antes_de_leer(diferida):
+    for peso in (70, 71, 72):
+        utilidades.guardar_medicion(peso, 1.7, 24.2)
+    assert _filas_en_disco(diferida) == []
+    assert sorted(fila["peso"] for fila in utilidades.obtener_historial_adultos()) == [70, 71, 72]
+    assert len(_filas_en_disco(diferida)) == 3
+
+
+def test_vaciar_escribe_el_bufer(diferida):
+    utilidades.guardar_medicion("70,5", "1,7", 24.39)
+    utilidades.guardar_medicion(30, 1.3, 17.75, "Femenino", 120, 45.5)
+    assert utilidades.vaciar_escrituras_pendientes() == []
+    assert _filas_en_disco(diferida) == [(70.5, None, None), (30.0, "Femenino", 120)]
+    assert utilidades.vaciar_escrituras_pendientes() == []
+
+
+def test_borrar_ve_las_pendientes(diferida):
+    utilidades.guardar_medicion(70, 1.7, 24.2)
+    utilidades.borrar_historial_adultos()
+    assert _filas_en_disco(diferida) == []
+
+
+@pytest.mark.parametrize(
+    "argumentos",
+    [([1], 1.7, 24.2), (70, None, 24.2), (70, 1.7, "x"), (30, 1.3, 17.75, ["Femenino"]), (30, 1.3, 17.75, "F", 10**20)],
+)
+def test_fila_invalida_falla_en_el_llamante(diferida, argumentos):
+    with pytest.raises(ValueError):
+        utilidades.guardar_medicion(*argumentos)
+    utilidades.guardar_medicion(70, 1.7, 24.2)
+    assert len(utilidades.obtener_historial_adultos()) == 1
+
+
+def test_fila_que_no_se_inserta_se_descarta(diferida, capsys):
+    utilidades.guardar_medicion(70, 1.7, 24.2)
+    # Una fila que llegue al búfer sin pasar por la validación (no se puede enlazar)
+    mala = ([1], 1.7, 24.2, "01-01-2024 10:00:00", None, None, None, 1_704_099_600)
+    utilidades._encolar_medicion(mala, 1000)
+    utilidades.guardar_medicion(71, 1.7, 24.5)
+
+    descartadas = utilidades.vaciar_escrituras_pendientes()
+
+    assert [fila for fila, _ in descartadas] == [mala]
+    assert "descartada" in capsys.readouterr().out
+    assert [fila[0] for fila in _filas_en_disco(diferida)] == [70, 71]
+    # La capa sigue funcionando: ni lecturas ni borrados tropiezan con la fila descartada
+    assert len(utilidades.obtener_historial_adultos()) == 2
+    utilidades.borrar_historial_adultos()
+    assert utilidades.obtener_historial_adultos() == []
+
+
+def test_fila_descartada_por_el_hilo_escritor(diferida):
+    utilidades._encolar_medicion((70, 1.7, 24.2, "x", None, None, None, 10**20), 1000)
+    utilidades.guardar_medicion(71, 1.7, 24.5)
+    utilidades.configurar_escritura_diferida(True, max_pendientes=1, max_espera_s=0.01)
+    for _ in range(200):
+        if not utilidades._pendientes:
+            break
+        utilidades.time.sleep(0.01)
+    assert [fila[0] for fila in _filas_en_disco(diferida)] == [71]
+
+
+CODIGO_SALIDA = """
+import sys
+sys.path.insert(0, {ruta_python!r})
+import utilidades
+utilidades.establecer_ruta_base_datos({ruta_db!r})
+utilidades.configurar_escritura_diferida(True, max_pendientes=1000, max_espera_s=60)
+for peso in range(60, 65):
+    utilidades.guardar_medicion(peso, 1.7, 24.2)
+try:
+    utilidades.guardar_medicion([1], 1.7, 24.2)
+except ValueError:
+    pass
+"""
+
+
+def test_las_pendientes_se_escriben_al_terminar(tmp_path):
+    ruta = str(tmp_path / "historial_imc.db")
+    codigo = CODIGO_SALIDA.format(ruta_python=DIRECTORIO_PYTHON, ruta_db=ruta)
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True)
+    assert salida.returncode == 0, salida.stderr
+    assert salida.stderr == ""
+    assert [fila[0] for fila in _filas_en_disco(ruta)] == [60, 61, 62, 63, 64]
@@ -0,0 +1,87 @@
+###
+# Exportar e importar el historial: ida y vuelta en CSV y NDJSON, y filas
+# inválidas o lecturas fallidas a mitad de un fichero grande.
+###
+
+import json
+
+import pytest
+
+import exportacion
+import utilidades
+
+COLUMNAS = "timestamp, fecha, peso, altura, imc, sexo, edad_meses, percentil"
+
+
+def _filas_guardadas():
+    with utilidades.conexion_base_datos() as conexion:
+        return conexion.execute(f"SELECT {COLUMNAS} FROM perfiles ORDER BY id").fetchall()
+
+
+@pytest.mark.parametrize("formato", exportacion.FORMATOS_EXPORTACION)
+def test_ida_y_vuelta(base_datos, tmp_path, formato):
+    mediciones = [
+        {"peso": 70.25, "altura": 1.7, "imc": 24.31, "timestamp": 1_700_000_000},
+        {"peso": 30, "altura": 1.3, "imc": 17.75, "sexo": "Femenino", "edad_meses": 120, "percentil": 45.5},
+        {"peso": 28, "altura": 1.25, "imc": 17.92, "sexo": "Male", "edad_meses": 100, "timestamp": 0},
+    ]
+    utilidades.guardar_mediciones_lote(mediciones)
+    with utilidades.conexion_base_datos() as conexion:
+        # Fila antigua sin timestamp, con una fecha que no sigue el formato: se exporta
+        # pero al importarla se rechaza, porque la fecha se guardaría sin poder leerse
+        conexion.execute(
+            "INSERT INTO perfiles (peso, altura, imc, fecha, sexo, edad_meses, percentil, timestamp) "
+            "VALUES (80, 1.8, 24.69, 'fecha rara', NULL, NULL, NULL, NULL)"
+        )
+    originales = _filas_guardadas()
+
+    ruta = str(tmp_path / f"historial.{formato}")
+    assert exportacion.exportar_historial(ruta, tamano_lote=2) == {"exportadas": 4}
+    utilidades.establecer_ruta_base_datos(str(tmp_path / "importada.db"))
+    resultado = exportacion.importar_historial(ruta, tamano_lote=3)
+
+    assert resultado == {"insertadas": 3, "rechazadas": 1, "filas_rechazadas": [(3, "Fecha inválida: fecha rara")]}
+    assert _filas_guardadas() == originales[:3]
+    assert originales[0][5] is None and originales[1][7] == 45.5 and originales[2][7] is None
+
+
+def _ndjson_con_filas_invalidas(ruta, validas):
+    valida = {"peso": 70, "altura": 1.7, "imc": 24.2, "fecha": "01-01-2024 10:00:00", "timestamp": 1_704_099_600}
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        for _ in range(validas):
+            archivo.write(json.dumps(valida) + "\n")
+        # json.dumps escribe Infinity, que json.loads vuelve a leer como float("inf")
+        archivo.write(json.dumps({**valida, "sexo": "Masculino", "edad_meses": float("inf")}) + "\n")
+        archivo.write(json.dumps({**valida, "timestamp": 10**20}) + "\n")
+        archivo.write(json.dumps({**valida, "timestamp": 1e30}) + "\n")
+        archivo.write(json.dumps(valida) + "\n")
+
+
+def test_filas_no_finitas_tras_el_primer_bloque(base_datos, tmp_path):
+    ruta = str(tmp_path / "historial.ndjson")
+    _ndjson_con_filas_invalidas(ruta, 6000)
+
+    resultado = exportacion.importar_historial(ruta)
+
+    assert "error" not in resultado
+    assert resultado["insertadas"] == 6001
+    assert [indice for indice, _ in resultado["filas_rechazadas"]] == [6000, 6001, 6002]
+    assert len(_filas_guardadas()) == 6001
+
+
+def test_lectura_fallida_a_medias_devuelve_lo_guardado(base_datos, tmp_path):
+    ruta = tmp_path / "historial.ndjson"
+    _ndjson_con_filas_invalidas(str(ruta), 6000)
+    with open(ruta, "ab") as archivo:
+        archivo.write(b"\xff\xfe no es UTF-8\n")
+
+    resultado = exportacion.importar_historial(str(ruta), tamano_lote=5000)
+
+    # El primer bloque ya se guardó; el segundo se pierde porque la lectura falla antes de escribirlo
+    assert "error" in resultado
+    assert resultado["insertadas"] == 5000
+    assert len(_filas_guardadas()) == 5000
+
+
+def test_fichero_inexistente(base_datos, tmp_path):
+    assert "error" in exportacion.importar_historial(str(tmp_path / "no_existe.csv"))
@@ -0,0 +1,87 @@
+###
+# guardar_mediciones_lote: las filas inválidas se rechazan con su índice y motivo
+# sin abortar el lote, también con valores no finitos o fuera de rango.
+###
+
+import pytest
+
+import utilidades
+
+
+def _filas_guardadas():
+    with utilidades.conexion_base_datos() as conexion:
+        return conexion.execute("SELECT peso, edad_meses, timestamp, fecha FROM perfiles ORDER BY id").fetchall()
+
+
+INVALIDAS = [
+    {"peso": float("inf"), "altura": 1.7, "imc": 24.2},
+    {"peso": float("nan"), "altura": 1.7, "imc": 24.2},
+    {"peso": "1e400", "altura": 1.7, "imc": 24.2},
+    {"peso": 30, "altura": 1.3, "imc": 17.8, "sexo": "Masculino", "edad_meses": float("inf")},
+    {"peso": 30, "altura": 1.3, "imc": 17.8, "sexo": "Masculino", "edad_meses": float("nan")},
+    {"peso": 30, "altura": 1.3, "imc": 17.8, "sexo": "Masculino", "edad_meses": 10**20},
+    {"peso": 30, "altura": 1.3, "imc": 17.8, "sexo": "Masculino", "edad_meses": -1},
+    {"peso": 30, "altura": 1.3, "imc": 17.8, "sexo": "Masculino", "edad_meses": utilidades.EDAD_MESES_MAXIMA + 1},
+    {"peso": 30, "altura": 1.3, "imc": 17.8, "sexo": "Masculino", "percentil": float("-inf")},
+    {"peso": 30, "altura": 1.3, "imc": 17.8, "sexo": "Masculino", "percentil": -0.5},
+    {"peso": 30, "altura": 1.3, "imc": 17.8, "sexo": "Masculino", "percentil": "100,1"},
+    {"peso": 30, "altura": 1.3, "imc": 17.8, "sexo": ["Masculino"]},
+    {"peso": 70, "altura": 1.7, "imc": 24.2, "timestamp": 1e30},
+    {"peso": 70, "altura": 1.7, "imc": 24.2, "timestamp": 10**20},
+    {"peso": 70, "altura": 1.7, "imc": 24.2, "timestamp": float("inf")},
+    {"peso": 70, "altura": 1.7, "imc": 24.2, "timestamp": -1},
+    {"peso": 70, "altura": 1.7, "imc": 24.2, "fecha": 12345},
+    {"peso": 70, "altura": 1.7, "imc": 24.2, "fecha": "2024-01-01 10:00:00"},
+    42,
+]
+
+
+@pytest.mark.parametrize("conservar_fecha", [False, True])
+def test_filas_invalidas_se_rechazan_sin_abortar(base_datos, conservar_fecha):
+    valida = {"peso": 70, "altura": 1.7, "imc": 24.2, "timestamp": 1_700_000_000, "fecha": "14-11-2023 22:13:20"}
+    mediciones = [valida, *INVALIDAS, valida]
+    resultado = utilidades.guardar_mediciones_lote(mediciones, tamano_lote=4, conservar_fecha=conservar_fecha)
+    assert resultado["insertadas"] == 2
+    assert resultado["rechazadas"] == len(INVALIDAS)
+    assert [indice for indice, _ in resultado["filas_rechazadas"]] == list(range(1, len(INVALIDAS) + 1))
+    assert all(motivo for _, motivo in resultado["filas_rechazadas"])
+    assert len(_filas_guardadas()) == 2
+
+
+@pytest.mark.parametrize("conservar_fecha", [False, True])
+def test_timestamp_enorme_con_fecha(base_datos, conservar_fecha):
+    # Con conservar_fecha el timestamp no pasa por datetime.fromtimestamp, pero tampoco debe llegar a SQLite
+    medicion = {"peso": 70, "altura": 1.7, "imc": 24.2, "fecha": "01-01-2024 10:00:00", "timestamp": 10**20}
+    resultado = utilidades.guardar_mediciones_lote([medicion] * 3, conservar_fecha=conservar_fecha)
+    assert resultado["insertadas"] == 0
+    assert resultado["rechazadas"] == 3
+    assert "timestamp" in resultado["filas_rechazadas"][0][1].lower()
+
+
+@pytest.mark.parametrize(
+    "fecha", ["2024-01-01 10:00:00", "01-01-2024", "01-01-2024 10:00:00\n02-01-2024", "fecha rara"]
+)
+def test_conservar_fecha_exige_el_formato_de_la_app(base_datos, fecha):
+    # Aunque venga con timestamp, la fecha se guarda tal cual y tiene que poder leerse
+    medicion = {"peso": 70, "altura": 1.7, "imc": 24.2, "fecha": fecha, "timestamp": 1_700_000_000}
+    resultado = utilidades.guardar_mediciones_lote([medicion], conservar_fecha=True)
+    assert resultado["rechazadas"] == 1
+    assert "fecha" in resultado["filas_rechazadas"][0][1].lower()
+
+
+def test_valores_validos_se_conservan(base_datos):
+    mediciones = [
+        {"peso": "70,5", "altura": 1.7, "imc": 24.39, "timestamp": 0},
+        ("30", "1,3", 17.75, "Femenino", "120", "45,5"),
+        {"peso": 30, "altura": 1.3, "imc": 17.75, "sexo": "Male", "edad_meses": 0, "percentil": 100},
+        {"peso": 70, "altura": 1.7, "imc": 24.2, "fecha": "14-11-2023 22:13:20"},
+        {"peso": 70, "altura": 1.7, "imc": 24.2, "timestamp": utilidades.TIMESTAMP_MAXIMO},
+    ]
+    resultado = utilidades.guardar_mediciones_lote(mediciones)
+    assert resultado == {"insertadas": 5, "rechazadas": 0, "filas_rechazadas": []}
+    filas = _filas_guardadas()
+    assert filas[0][:3] == (70.5, None, 0)
+    assert filas[1][:2] == (30.0, 120)
+    assert filas[2][1] == 0
+    assert filas[3][2:] == (utilidades.fecha_a_timestamp("14-11-2023 22:13:20"), "14-11-2023 22:13:20")
+    assert filas[4][2] == utilidades.TIMESTAMP_MAXIMO
@@ -0,0 +1,56 @@
+###
+# Historial por columnas: códigos de sexo a partir de los textos localizados
+###
+
+import math
+import sqlite3
+
+import utilidades
+
+
+def test_lista_sql_escapa_comillas_y_admite_un_elemento():
+    conexion = sqlite3.connect(":memory:")
+    for textos in [("Male",), ("O'Brien", "Féminin"), ("a'', 'b",)]:
+        consulta = f"SELECT ? IN {utilidades.lista_sql(textos)}"
+        assert all(conexion.execute(consulta, (texto,)).fetchone()[0] for texto in textos)
+        assert not conexion.execute(consulta, ("otro",)).fetchone()[0]
+
+
+def test_codigos_de_sexo_localizados(base_datos):
+    sexos = [texto for textos in utilidades.SEXOS_GUARDADOS.values() for texto in textos] + ["Otro"]
+    utilidades.guardar_mediciones_lote(
+        {"peso": 30, "altura": 1.3, "imc": 17.75, "sexo": sexo, "edad_meses": 120, "timestamp": 1_700_000_000 + i}
+        for i, sexo in enumerate(sexos)
+    )
+    historial = utilidades.obtener_historial_columnas("menores")
+    assert historial["filas"] == len(sexos)
+    # Orden del historial: del más reciente al más antiguo
+    esperados = [codigo for codigo, textos in utilidades.SEXOS_GUARDADOS.items() for _ in textos] + [2]
+    assert list(historial["sexo"]) == esperados[::-1]
+
+
+def test_valores_raros_no_rompen_las_columnas(base_datos):
+    filas = [
+        (30, 1.3, 17.75, "01-01-2024 10:00:00", "Male", 3_000_000_000, 50.0, 1_700_000_003),
+        (30, 1.3, 17.75, "una\nfecha\nen varias líneas", "Male", 120, None, 1_700_000_002),
+        ("treinta", 1.3, 17.75, "con\x1fseparador", "Male", None, 50.0, 1_700_000_001),
+        (30, 1.3, 17.75, "", "Male", 60, 50.0, 1_700_000_000),
+    ]
+    with utilidades.conexion_base_datos() as conexion:
+        conexion.executemany(utilidades.SQL_INSERTAR_MEDICION, filas)
+
+    historial = utilidades.obtener_historial_columnas("menores")
+    assert historial["filas"] == 4
+    assert list(historial["edad_meses"]) == [3_000_000_000, 120, -1, 60]
+    assert list(historial["timestamp"]) == [fila[-1] for fila in filas]
+    # Una fecha por fila aunque traiga saltos de línea o el propio separador
+    fechas = historial["fecha"].split(utilidades.SEPARADOR_TEXTOS)
+    assert fechas == ["01-01-2024 10:00:00", "una\nfecha\nen varias líneas", "conseparador", ""]
+    assert math.isnan(historial["peso"][2]) and historial["peso"][3] == 30
+    assert math.isnan(historial["percentil"][1])
+
+
+def test_historial_vacio(base_datos):
+    historial = utilidades.obtener_historial_columnas("adultos")
+    assert historial["filas"] == 0
+    assert historial["fecha"] == "" and len(historial["peso"]) == 0
@@ -0,0 +1,68 @@
+###
+# Paginación por clave (timestamp, id): recorrer todas las páginas da las mismas filas,
+# en el mismo orden, que una lectura completa, también con timestamps repetidos o NULL.
+###
+
+import random
+
+import pytest
+
+import utilidades
+
+TIPOS = ["adultos", "menores"]
+
+
+@pytest.fixture
+def historial(base_datos):
+    azar = random.Random(8)
+    # Pocos timestamps distintos para que haya muchos empates, y filas antiguas sin timestamp
+    timestamps = [1_700_000_000 + 3600 * azar.randint(0, 5) for _ in range(60)] + [None] * 9
+    azar.shuffle(timestamps)
+    filas = []
+    for i, timestamp in enumerate(timestamps):
+        sexo = "Femenino" if i % 3 == 0 else None
+        fecha = "fecha rara" if timestamp is None else "01-01-2024 10:00:00"
+        filas.append((60 + i, 1.7, 20 + i / 10, fecha, sexo, 120 if sexo else None, None, timestamp))
+    with utilidades.conexion_base_datos() as conexion:
+        conexion.executemany(utilidades.SQL_INSERTAR_MEDICION, filas)
+
+
+def _lectura_completa(tipo):
+    columnas = utilidades.COLUMNAS_HISTORIAL[tipo]
+    consulta = utilidades.SQL_PAGINA_HISTORIAL.format(columnas=", ".join(columnas), filtro="")
+    with utilidades.conexion_base_datos() as conexion:
+        datos = conexion.execute(consulta, (int(tipo == "adultos"), -1)).fetchall()
+    return [dict(zip(columnas, fila)) for fila in datos]
+
+
+@pytest.mark.parametrize("tipo", TIPOS)
+@pytest.mark.parametrize("limite", [1, 2, 3, 7, 23, 46, 100])
+def test_paginas_igual_que_lectura_completa(historial, tipo, limite):
+    completa = _lectura_completa(tipo)
+    assert any(fila["timestamp"] is None for fila in completa)
+
+    paginas = []
+    cursor = None
+    while True:
+        pagina = utilidades.obtener_pagina_historial(tipo, limite, cursor)
+        assert len(pagina["filas"]) <= limite
+        paginas.append(pagina["filas"])
+        cursor = pagina["siguiente"]
+        if cursor is None:
+            break
+    assert [fila for filas in paginas for fila in filas] == completa
+    assert [fila for lote in utilidades.iterar_historial(tipo, limite) for fila in lote] == completa
+
+
+def test_orden_reciente_primero_y_sin_timestamp_al_final(historial):
+    completa = _lectura_completa("adultos")
+    claves = [(fila["timestamp"] is not None, fila["timestamp"] or 0, fila["id"]) for fila in completa]
+    assert claves == sorted(claves, reverse=True)
+
+
+def test_la_pagina_usa_el_indice(historial):
+    consulta = utilidades.SQL_PAGINA_HISTORIAL.format(columnas="id", filtro="AND (timestamp, id) < (?, ?)")
+    with utilidades.conexion_base_datos() as conexion:
+        plan = str(conexion.execute("EXPLAIN QUERY PLAN " + consulta, (1, 1_700_003_600, 10, 5)).fetchall())
+    assert "idx_perfiles_tipo_timestamp" in plan
+    assert "TEMP B-TREE" not in plan
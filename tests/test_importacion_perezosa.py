@@ -0,0 +1,46 @@
+###
+# Importación perezosa de pandas (y numpy)
+# Se comprueba en un proceso nuevo, porque en el de pytest otros tests ya los importan.
+# Los tiempos de importación y la memoria se miden en benchmarks/ejecutar_benchmarks.py.
+###
+
+import subprocess
+import sys
+
+from conftest import DIRECTORIO_PYTHON
+
+CODIGO = """
+import sys
+sys.path.insert(0, {ruta!r})
+import funciones_imc_android
+import calculos_menores
+calculos_menores.establecer_fuente_percentiles(calculos_menores.DIRECTORIO_ASSETS_LOCAL)
+{operacion}
+print(sorted(m for m in ("pandas", "numpy") if m in sys.modules))
+"""
+
+
+def _modulos_cargados(operacion=""):
+    salida = subprocess.run(
+        [sys.executable, "-c", CODIGO.format(ruta=DIRECTORIO_PYTHON, operacion=operacion)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return salida.stdout.strip().splitlines()[-1]
+
+
+def test_importar_la_fachada_no_carga_pandas():
+    assert _modulos_cargados() == "[]"
+
+
+def test_calculo_escalar_no_carga_pandas():
+    operacion = (
+        "assert 'error' not in funciones_imc_android.calcular_imc_menor('Masculino', 10, 30, 1.4)\n"
+        "funciones_imc_android.precargar_percentiles()"
+    )
+    assert _modulos_cargados(operacion) == "[]"
+
+
+def test_cargar_percentiles_si_carga_pandas():
+    assert "'pandas'" in _modulos_cargados("funciones_imc_android.cargar_percentiles('Femenino')")
@@ -0,0 +1,110 @@
+###
+# Histograma de latencias de la instrumentación: rango cubierto y error relativo
+###
+
+import time
+
+import pytest
+
+import funciones_imc_android
+import instrumentacion
+import utilidades
+from instrumentacion import BITS_MAXIMOS, SUBCUBETAS, HistogramaLatencias
+
+
+def test_rango_cubierto_hasta_2_elevado_a_bits_maximos():
+    histograma = HistogramaLatencias()
+    ultima = len(histograma.cuentas) - 1
+    assert HistogramaLatencias.indice(2**BITS_MAXIMOS - 1) == ultima
+    assert HistogramaLatencias.limite_superior(ultima) == 2**BITS_MAXIMOS - 1
+    assert HistogramaLatencias.indice(2 ** (BITS_MAXIMOS - 1)) < ultima
+
+
+def test_valores_fuera_de_rango_van_a_la_ultima_cubeta():
+    histograma = HistogramaLatencias()
+    for valor in (2**BITS_MAXIMOS, 2**50):
+        histograma.registrar(valor)
+    assert histograma.cuentas[-1] == 2
+    assert histograma.percentil(50) == 2**50
+
+
+def test_registrar_igual_que_indice_y_error_relativo():
+    for valor in [*range(0, 300), *(2**k + d for k in range(6, BITS_MAXIMOS) for d in (-1, 0, 1, 2 ** (k - 3)))]:
+        histograma = HistogramaLatencias()
+        histograma.registrar(valor)
+        indice = HistogramaLatencias.indice(valor)
+        assert histograma.cuentas[indice] == 1
+        limite = HistogramaLatencias.limite_superior(indice)
+        assert valor <= limite <= valor + max(1, valor / SUBCUBETAS)
+
+
+def test_instrumentacion_desactivada_por_defecto():
+    assert not instrumentacion.activa()
+
+
+@pytest.fixture
+def instrumentada():
+    """Activa la instrumentación de la fachada con los contadores a cero y la desactiva al terminar."""
+    funciones_imc_android.activar_instrumentacion()
+    funciones_imc_android.obtener_estadisticas(reiniciar=True)
+    yield
+    funciones_imc_android.desactivar_instrumentacion()
+
+
+def test_evaluar_no_cuenta_las_llamadas_internas(base_datos, instrumentada):
+    funciones_imc_android.evaluar_imc_adulto(70, 1.7, guardar=True)
+    funciones_imc_android.evaluar_imc_menor("Femenino", "01-01-2015", 30, 1.3, guardar=True)
+    funciones_imc_android.calcular_imc(70, 1.7)
+    funciones = funciones_imc_android.obtener_estadisticas()["funciones"]
+    assert {nombre: datos["llamadas"] for nombre, datos in funciones.items()} == {
+        "evaluar_imc_adulto": 1,
+        "evaluar_imc_menor": 1,
+        "calcular_imc": 1,
+    }
+
+
+def _generador_lento(espera_s, elementos, fallar=False):
+    for i in range(elementos):
+        time.sleep(espera_s)
+        yield i
+    if fallar:
+        raise RuntimeError("fallo a mitad del recorrido")
+
+
+@pytest.fixture
+def generador_instrumentado():
+    espacio = {"_generador_lento": _generador_lento}
+    instrumentacion.activar(espacio, ["_generador_lento"])
+    instrumentacion.obtener_estadisticas(reiniciar=True)
+    yield espacio["_generador_lento"]
+    instrumentacion.desactivar(espacio)
+
+
+def test_generador_se_mide_durante_el_recorrido(generador_instrumentado):
+    generador = generador_instrumentado(0.02, 3)
+    assert instrumentacion.obtener_estadisticas() == {}
+    for _ in generador:
+        # El tiempo del consumidor no cuenta
+        time.sleep(0.05)
+    datos = instrumentacion.obtener_estadisticas()["_generador_lento"]
+    assert datos["llamadas"] == 1 and datos["errores"] == 0
+    assert 55_000 <= datos["max_us"] < 150_000
+
+
+def test_generador_cerrado_o_con_error(generador_instrumentado):
+    generador = generador_instrumentado(0, 10)
+    next(generador)
+    generador.close()
+    with pytest.raises(RuntimeError):
+        list(generador_instrumentado(0, 2, fallar=True))
+    datos = instrumentacion.obtener_estadisticas()["_generador_lento"]
+    assert datos["llamadas"] == 2 and datos["errores"] == 1
+
+
+def test_iterar_historial_instrumentado(base_datos, instrumentada):
+    utilidades.guardar_mediciones_lote([{"peso": 70, "altura": 1.7, "imc": 24.2}] * 5)
+    lotes = list(funciones_imc_android.iterar_historial("adultos", 2))
+    assert [len(lote) for lote in lotes] == [2, 2, 1]
+    datos = funciones_imc_android.obtener_estadisticas()["funciones"]
+    assert datos["iterar_historial"]["llamadas"] == 1
+    assert "obtener_pagina_historial" not in datos
@@ -0,0 +1,100 @@
+###
+# Migraciones del esquema: una base de datos creada por la versión sin versionado
+# (PRAGMA user_version = 0) llega a VERSION_ESQUEMA, y volver a migrar no cambia nada.
+###
+
+import sqlite3
+
+import pytest
+
+import utilidades
+
+# Esquema y filas tal como los dejaba inicializar_base_de_datos antes del versionado
+SQL_PERFILES_SIN_VERSION = (
+    "CREATE TABLE perfiles(id INTEGER PRIMARY KEY AUTOINCREMENT, peso REAL, altura REAL, imc REAL, fecha TEXT)"
+)
+COLUMNAS_MENORES = ("sexo TEXT", "edad_meses INTEGER", "percentil REAL")
+FILAS_SIN_VERSION = [
+    (70, 1.7, 24.22, "14-11-2023 22:13:20", None, None, None),
+    (30, 1.3, 17.75, "01-02-2024 08:00:00", "Femenino", 120, 45.5),
+    (28, 1.25, 17.92, "15-02-2024 09:30:00", "Male", 100, None),
+    (80, 1.8, 24.69, "fecha rara", None, None, None),
+]
+
+
+@pytest.fixture(params=[True, False], ids=["con_columnas_menores", "sin_columnas_menores"])
+def base_sin_version(request, tmp_path):
+    """Ruta de una base de datos sin versionar; la más antigua aún no tiene las columnas de menores."""
+    ruta = str(tmp_path / "historial_imc.db")
+    conexion = sqlite3.connect(ruta)
+    conexion.execute(SQL_PERFILES_SIN_VERSION)
+    if request.param:
+        for columna in COLUMNAS_MENORES:
+            conexion.execute(f"ALTER TABLE perfiles ADD COLUMN {columna}")
+        conexion.executemany(
+            "INSERT INTO perfiles (peso, altura, imc, fecha, sexo, edad_meses, percentil) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            FILAS_SIN_VERSION,
+        )
+    else:
+        conexion.executemany(
+            "INSERT INTO perfiles (peso, altura, imc, fecha) VALUES (?, ?, ?, ?)",
+            [fila[:4] for fila in FILAS_SIN_VERSION if fila[4] is None],
+        )
+    conexion.commit()
+    conexion.close()
+    utilidades.establecer_ruta_base_datos(ruta)
+    yield ruta
+    utilidades.cerrar_base_datos()
+
+
+def _volcado(conexion):
+    return list(conexion.iterdump()) + [conexion.execute("PRAGMA user_version").fetchone()[0]]
+
+
+def test_migra_hasta_la_ultima_version(base_sin_version):
+    with utilidades.conexion_base_datos() as conexion:
+        assert conexion.execute("PRAGMA user_version").fetchone()[0] == utilidades.VERSION_ESQUEMA == 4
+        columnas = [fila[1] for fila in conexion.execute("PRAGMA table_info(perfiles)")]
+        tablas = {fila[0] for fila in conexion.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        generaciones = conexion.execute("SELECT tipo, generacion FROM generaciones_historial ORDER BY tipo").fetchall()
+    assert columnas == ["id", "peso", "altura", "imc", "fecha", "sexo", "edad_meses", "percentil", "timestamp"]
+    assert {"perfiles", "generaciones_historial", "resumen_mensual"} <= tablas
+    assert generaciones == [("adultos", 0), ("menores", 0)]
+
+
+def test_migrar_otra_vez_no_cambia_nada(base_sin_version):
+    with utilidades.conexion_base_datos() as conexion:
+        antes = _volcado(conexion)
+        utilidades._migrar_esquema(conexion)
+        assert _volcado(conexion) == antes
+    # Al reabrir la conexión se comprueba la versión y no se aplica ninguna migración
+    utilidades.cerrar_base_datos()
+    with utilidades.conexion_base_datos() as conexion:
+        assert _volcado(conexion) == antes
+
+
+def test_base_de_datos_nueva(base_datos):
+    with utilidades.conexion_base_datos() as conexion:
+        assert conexion.execute("PRAGMA user_version").fetchone()[0] == utilidades.VERSION_ESQUEMA
+        assert conexion.execute("SELECT COUNT(*) FROM perfiles").fetchone()[0] == 0
+
+
+def test_rellena_timestamp_e_indice(base_sin_version):
+    with utilidades.conexion_base_datos() as conexion:
+        filas = conexion.execute("SELECT fecha, timestamp, sexo IS NULL FROM perfiles ORDER BY id").fetchall()
+        indices = [fila[0] for fila in conexion.execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+        plan = str(conexion.execute("EXPLAIN QUERY PLAN " + utilidades.SQL_HISTORIAL_MENORES).fetchall())
+        resumen = conexion.execute(
+            "SELECT es_adulto, sexo, SUM(mediciones) FROM resumen_mensual GROUP BY es_adulto, sexo"
+        ).fetchall()
+    # La fecha en texto (hora local) pasa a timestamp; una fecha ilegible se queda sin él
+    for fecha, timestamp, _ in filas:
+        assert timestamp == utilidades.fecha_a_timestamp(fecha)
+    assert filas[-1][1] is None
+    assert "idx_perfiles_tipo_timestamp" in indices
+    assert "idx_perfiles_tipo_timestamp" in plan
+    # Tipo de historial (sexo IS NULL) y código de sexo de las filas con timestamp
+    esperado = {(1, -1): sum(1 for _, timestamp, adulto in filas if adulto and timestamp is not None)}
+    if len(filas) > 2:
+        esperado.update({(0, 0): 1, (0, 1): 1})
+    assert {(es_adulto, sexo): n for es_adulto, sexo, n in resumen} == esperado
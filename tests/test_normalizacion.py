@@ -0,0 +1,127 @@
+###
+# normalizar_pesos / normalizar_alturas: motivo de cada fila rechazada y mismos valores
+# que las conversiones escalares (coma decimal, centímetros -> metros)
+###
+
+import math
+
+import numpy as np
+import pytest
+
+import utilidades
+from utilidades import (
+    MOTIVO_FORMATO,
+    MOTIVO_FUERA_DE_RANGO,
+    MOTIVO_NO_FINITO,
+    MOTIVO_NO_POSITIVO,
+    MOTIVO_VACIO,
+    MOTIVO_VALIDO,
+    MOTIVOS_NORMALIZACION,
+)
+
+PESOS = {
+    MOTIVO_VALIDO: [70, 70.5, "70,5", " 70.5 ", "+70", "7e1", ".5", "999,9", np.float32(60)],
+    MOTIVO_VACIO: [None, "", "   "],
+    MOTIVO_FORMATO: ["abc", "70kg", "1.2.3", "70 5", "--5", "e5", ",", [70]],
+    MOTIVO_NO_FINITO: ["nan", "NaN", "inf", "-Infinity", float("nan"), float("inf")],
+    MOTIVO_NO_POSITIVO: [0, "0", "-0", "-5", -0.1],
+    MOTIVO_FUERA_DE_RANGO: [1000.01, "1001", "1e4"],
+}
+ALTURAS = {
+    MOTIVO_VALIDO: [1.7, "1,70", 170, "170", " 165,5 ", 11, 300, "2,99"],
+    MOTIVO_VACIO: [None, "", " "],
+    MOTIVO_FORMATO: ["uno setenta", "1.70m", "1,7,0"],
+    MOTIVO_NO_FINITO: ["inf", float("nan")],
+    MOTIVO_NO_POSITIVO: [0, "-170", "-1,7"],
+    # Hasta 10 se toma como metros
+    MOTIVO_FUERA_DE_RANGO: [3.01, 5, 10, "301", 9.99],
+}
+
+
+def _casos(tabla):
+    return [(valor, motivo) for motivo, valores in tabla.items() for valor in valores]
+
+
+@pytest.mark.parametrize(
+    "normalizar, tabla", [(utilidades.normalizar_pesos, PESOS), (utilidades.normalizar_alturas, ALTURAS)]
+)
+def test_motivo_de_cada_fila(normalizar, tabla):
+    casos = _casos(tabla)
+    valores = np.empty(len(casos), dtype=object)
+    valores[:] = [valor for valor, _ in casos]
+    normalizados, validos, motivos = normalizar(valores)
+    assert [MOTIVOS_NORMALIZACION[m] for m in motivos] == [MOTIVOS_NORMALIZACION[m] for _, m in casos]
+    assert validos.tolist() == [m == MOTIVO_VALIDO for _, m in casos]
+    assert np.isnan(normalizados[~validos]).all()
+    assert np.isfinite(normalizados[validos]).all()
+    assert motivos.dtype == np.int8 and len(MOTIVOS_NORMALIZACION) == MOTIVO_FUERA_DE_RANGO + 1
+
+
+def _escalar(convertir, valor):
+    try:
+        return convertir(valor)
+    except ValueError:
+        return None
+
+
+@pytest.mark.parametrize(
+    "normalizar, convertir, tabla",
+    [
+        (utilidades.normalizar_pesos, utilidades.convertir_peso_a_float, PESOS),
+        (utilidades.normalizar_alturas, utilidades.convertir_altura_a_metros, ALTURAS),
+    ],
+)
+def test_mismos_valores_que_la_conversion_escalar(normalizar, convertir, tabla):
+    valores = [valor for valor, motivo in _casos(tabla) if motivo == MOTIVO_VALIDO]
+    normalizados, validos, _ = normalizar(valores)
+    assert validos.all()
+    # Igualdad exacta: la coma decimal y el paso de cm a m dan el mismo float
+    assert normalizados.tolist() == [convertir(valor) for valor in valores]
+
+
+def test_validez_igual_que_calcular_imc():
+    # Para valores finitos, una fila es válida justo cuando calcular_imc la acepta
+    pesos = [valor for valor, motivo in _casos(PESOS) if motivo != MOTIVO_NO_FINITO and not isinstance(valor, list)]
+    alturas = [valor for valor, motivo in _casos(ALTURAS) if motivo != MOTIVO_NO_FINITO]
+    _, pesos_validos, _ = utilidades.normalizar_pesos(pesos)
+    _, alturas_validas, _ = utilidades.normalizar_alturas(alturas)
+    for peso, valido in zip(pesos, pesos_validos):
+        assert valido == (_escalar(lambda p: utilidades.calcular_imc(p, 1.7), peso) is not None), peso
+    for altura, valida in zip(alturas, alturas_validas):
+        assert valida == (_escalar(lambda a: utilidades.calcular_imc(70, a), altura) is not None), altura
+
+
+def test_no_finitos_se_rechazan_aunque_float_los_acepte():
+    # convertir_peso_a_float devuelve nan/inf; la versión por columnas los marca como no válidos
+    assert math.isinf(utilidades.convertir_peso_a_float("inf"))
+    _, validos, motivos = utilidades.normalizar_pesos(["inf", "nan"])
+    assert not validos.any() and (motivos == MOTIVO_NO_FINITO).all()
+
+
+@pytest.mark.parametrize("normalizar", [utilidades.normalizar_pesos, utilidades.normalizar_alturas])
+def test_columnas_vacias_nulas_o_basura(normalizar):
+    for valores in ([], np.array([], dtype=float)):
+        normalizados, validos, motivos = normalizar(valores)
+        assert len(normalizados) == len(validos) == len(motivos) == 0
+
+    _, validos, motivos = normalizar([None] * 5)
+    assert not validos.any() and (motivos == MOTIVO_VACIO).all()
+
+    basura = ["", "?", "N/A", "—", "70 kg", "setenta", "0x46", "1/2", "١٧٠"]
+    _, validos, motivos = normalizar(basura)
+    assert motivos.tolist() == [MOTIVO_VACIO] + [MOTIVO_FORMATO] * (len(basura) - 2) + [MOTIVO_VALIDO]
+
+
+def test_columna_numerica_sin_pasar_por_texto():
+    pesos = np.array([70.0, 0.0, -1.0, np.nan, 2000.0])
+    normalizados, validos, motivos = utilidades.normalizar_pesos(pesos)
+    assert motivos.tolist() == [
+        MOTIVO_VALIDO,
+        MOTIVO_NO_POSITIVO,
+        MOTIVO_NO_POSITIVO,
+        MOTIVO_NO_FINITO,
+        MOTIVO_FUERA_DE_RANGO,
+    ]
+    assert normalizados[0] == 70.0 and validos.tolist() == [True, False, False, False, False]
+    alturas, _, _ = utilidades.normalizar_alturas(np.array([170, 1.7, 2.5, 10.5]))
+    assert alturas.tolist() == [1.7, 1.7, 2.5, 0.105]
@@ -0,0 +1,70 @@
+###
+# EjecutorParalelo: mismas filas y en el mismo orden que las funciones de un solo proceso
+###
+
+import numpy as np
+import pytest
+
+import calculos_adultos
+import calculos_menores
+import paralelo
+
+
+def _iguales(esperado, obtenido):
+    assert esperado.keys() == obtenido.keys()
+    for clave, valores in esperado.items():
+        if valores.dtype.kind == "f":
+            assert np.array_equal(valores, obtenido[clave], equal_nan=True), clave
+        else:
+            assert valores.tolist() == obtenido[clave].tolist(), clave
+
+
+@pytest.mark.parametrize(
+    "valores, tipo",
+    [
+        ([70, 80], "i"),
+        ([70.5, 80], "f"),
+        ([True, False], "b"),
+        (["70", 80], "O"),
+        (["Masculino", "Femenino"], "O"),
+        ([70, None], "O"),
+        ([[1], [2, 3]], "O"),
+    ],
+)
+def test_como_columna_conserva_los_numeros(valores, tipo):
+    assert paralelo._como_columna(valores).dtype.kind == tipo
+
+
+def test_como_columna_deja_igual_arrays_y_valores_unicos():
+    array = np.array(["a"], dtype=object)
+    assert paralelo._como_columna(array) is array
+    assert paralelo._como_columna("Masculino") == "Masculino"
+    assert paralelo._como_columna(None) is None
+
+
+@pytest.fixture(scope="module")
+def ejecutor():
+    with paralelo.EjecutorParalelo(procesos=2, tamano_bloque=50) as ejecutor:
+        yield ejecutor
+
+
+def test_paridad_con_un_solo_proceso(ejecutor):
+    rng = np.random.default_rng(20240601)
+    n = 333
+    pesos = rng.uniform(10, 90, n).round(1).tolist()
+    alturas = rng.uniform(1.0, 1.9, n).round(2).tolist()
+    edades = rng.uniform(4, 20, n).tolist()
+    # Valores sucios mezclados con números: la columna va como objetos
+    pesos_sucios = pesos[:-3] + ["x", "55,2", None]
+
+    _iguales(
+        calculos_adultos.calcular_imc_adulto_batch(pesos, alturas), ejecutor.calcular_imc_adulto_batch(pesos, alturas)
+    )
+    _iguales(
+        calculos_adultos.calcular_imc_adulto_batch(pesos_sucios, alturas),
+        ejecutor.calcular_imc_adulto_batch(pesos_sucios, alturas),
+    )
+    _iguales(
+        calculos_menores.calcular_imc_menor_batch("Femenino", edades, pesos_sucios, alturas),
+        ejecutor.calcular_imc_menor_batch("Femenino", edades, pesos_sucios, alturas),
+    )
@@ -0,0 +1,110 @@
+###
+# Series del gráfico: reducción LTTB y agregación por intervalos en SQLite
+###
+
+import math
+import random
+
+import pytest
+
+import utilidades
+
+
+def _serie(n, semilla=9):
+    azar = random.Random(semilla)
+    xs = sorted(azar.sample(range(10 * n + 10), n))
+    ys = [math.sin(x / 50) + azar.uniform(-0.1, 0.1) for x in xs]
+    return xs, ys
+
+
+@pytest.mark.parametrize("n", [3, 10, 101, 1000])
+@pytest.mark.parametrize("max_puntos", [3, 4, 10, 100])
+def test_lttb_conserva_los_extremos_y_el_maximo_de_puntos(n, max_puntos):
+    xs, ys = _serie(n)
+    indices = utilidades.reducir_serie_lttb(xs, ys, max_puntos)
+    assert len(indices) == min(n, max_puntos)
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert indices == sorted(set(indices))
+
+
+def test_lttb_conserva_un_pico():
+    xs = list(range(1000))
+    ys = [0.0] * 1000
+    ys[537] = 50.0
+    assert 537 in utilidades.reducir_serie_lttb(xs, ys, 20)
+
+
+@pytest.mark.parametrize("max_puntos, esperados", [(-1, []), (0, []), (1, [0]), (2, [0, 9])])
+def test_lttb_umbrales_pequenos(max_puntos, esperados):
+    xs, ys = _serie(10)
+    assert utilidades.reducir_serie_lttb(xs, ys, max_puntos) == esperados
+
+
+def test_lttb_serie_mas_corta_que_el_umbral():
+    xs, ys = _serie(5)
+    assert utilidades.reducir_serie_lttb(xs, ys, 100) == [0, 1, 2, 3, 4]
+    assert utilidades.reducir_serie_lttb([], [], 10) == []
+
+
+@pytest.fixture
+def historial(base_datos):
+    azar = random.Random(9)
+    filas = [
+        (70, 1.7, azar.uniform(18, 30), "01-01-2024 10:00:00", None, None, None, 1_700_000_000 + azar.randint(0, 10**7))
+        for _ in range(500)
+    ]
+    # Filas antiguas sin timestamp: no entran en la serie
+    filas += [(70, 1.7, 99.0, "fecha rara", None, None, None, None)] * 5
+    with utilidades.conexion_base_datos() as conexion:
+        conexion.executemany(utilidades.SQL_INSERTAR_MEDICION, filas)
+    return filas[:500]
+
+
+@pytest.mark.parametrize("max_puntos", [1, 2, 7, 100, 499, 5000])
+def test_agregada_no_pasa_del_maximo_y_cuenta_todas_las_filas(historial, max_puntos):
+    serie = utilidades.obtener_serie_agregada("adultos", max_puntos=max_puntos)
+    assert 1 <= len(serie["fechas"]) <= max_puntos
+    assert sum(serie["mediciones"]) == len(historial)
+    assert max(serie["maximo"]) == max(fila[2] for fila in historial)
+    assert min(serie["minimo"]) == min(fila[2] for fila in historial)
+    assert serie["fechas"] == sorted(serie["fechas"])
+
+
+def test_agregada_serie_mas_corta_que_el_maximo(base_datos):
+    timestamps = [1_700_000_000, 1_700_000_000, 1_700_086_400, 1_700_900_000]
+    utilidades.guardar_mediciones_lote(
+        {"peso": 70, "altura": 1.7, "imc": 20 + i, "timestamp": ts} for i, ts in enumerate(timestamps)
+    )
+    serie = utilidades.obtener_serie_agregada("adultos", max_puntos=100)
+    # Cada timestamp distinto cae en su propio intervalo
+    assert serie["mediciones"] == [2, 1, 1]
+    assert serie["media"] == [20.5, 22, 23]
+
+
+@pytest.mark.parametrize("max_puntos", [0, -1])
+def test_agregada_maximo_menor_que_uno(historial, max_puntos):
+    serie = utilidades.obtener_serie_agregada("adultos", max_puntos=max_puntos)
+    assert serie == {"fechas": [], "media": [], "minimo": [], "maximo": [], "mediciones": []}
+    assert utilidades.obtener_serie_agregada("adultos", "dia", max_puntos)["fechas"] == []
+
+
+def test_agregada_por_periodo_devuelve_los_mas_recientes(historial):
+    todos = utilidades.obtener_serie_agregada("adultos", "dia", max_puntos=10**6)
+    recientes = utilidades.obtener_serie_agregada("adultos", "dia", max_puntos=5)
+    assert recientes["fechas"] == todos["fechas"][-5:]
+    assert sum(todos["mediciones"]) == len(historial)
+    with pytest.raises(ValueError, match="Periodo desconocido"):
+        utilidades.obtener_serie_agregada("adultos", "hora")
+
+
+def test_agregada_sin_mediciones(base_datos):
+    assert utilidades.obtener_serie_agregada("menores")["fechas"] == []
+
+
+def test_datos_para_grafico_reducidos(historial):
+    fechas, valores = utilidades.obtener_datos_para_grafico("adultos")
+    reducidas, reducidos = utilidades.obtener_datos_para_grafico("adultos", max_puntos=50)
+    assert len(fechas) == len(historial)
+    assert len(reducidas) == 50
+    assert (reducidas[0], reducidas[-1]) == (fechas[0], fechas[-1])
+    assert set(reducidos) <= set(valores)
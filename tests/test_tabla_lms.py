@@ -0,0 +1,87 @@
+###
+# Límites del índice denso mes -> fila de TablaLMS y de la tabla interpolada por días
+###
+
+import math
+
+import numpy as np
+import pytest
+
+import calculos_menores as cm
+
+SEXOS = list(cm.ARCHIVOS_PERCENTILES)
+
+
+@pytest.fixture(params=SEXOS)
+def tabla(request):
+    return cm.obtener_tabla_lms(request.param)
+
+
+def _indice_por_recorrido(tabla, edad_meses):
+    """Búsqueda original: la fila con menor |Month - edad|, la primera en caso de empate (idxmin)."""
+    return min(range(len(tabla)), key=lambda i: abs(tabla.meses[i] - edad_meses))
+
+
+def test_la_tabla_empieza_en_61_y_acaba_en_228(tabla):
+    assert tabla.meses[0] == 61
+    assert tabla.meses[-1] == cm.EDAD_MAXIMA_MESES
+
+
+@pytest.mark.parametrize("edad_meses", [-10, 0, 59, cm.EDAD_MINIMA_MESES, 61])
+def test_meses_hasta_61_usan_la_primera_fila(tabla, edad_meses):
+    assert tabla.indice_mas_cercano(edad_meses) == 0
+    assert tabla.meses[tabla.indice_mas_cercano(edad_meses)] == 61
+
+
+@pytest.mark.parametrize("edad_meses", [cm.EDAD_MAXIMA_MESES, 229, 240, 399, 10**6])
+def test_meses_desde_228_usan_la_ultima_fila(tabla, edad_meses):
+    assert tabla.indice_mas_cercano(edad_meses) == len(tabla) - 1
+
+
+def test_indice_denso_igual_que_recorrido(tabla):
+    meses = range(-10, 400)
+    esperados = [_indice_por_recorrido(tabla, m) for m in meses]
+    assert [tabla.indice_mas_cercano(m) for m in meses] == esperados
+    assert tabla.indices_mas_cercanos(np.arange(-10, 400)).tolist() == esperados
+    # Edades no enteras (incluidos los empates a medio mes) van por la búsqueda binaria
+    medios = [m + 0.5 for m in range(-10, 400)] + [m + 0.25 for m in range(55, 235)]
+    assert [tabla.indice_mas_cercano(m) for m in medios] == [_indice_por_recorrido(tabla, m) for m in medios]
+
+
+def test_indice_denso_igual_que_pandas(tabla):
+    df = cm.cargar_percentiles(tabla.sexo)
+    for edad_meses in range(-10, 400):
+        assert tabla.indice_mas_cercano(edad_meses) == abs(df["Month"] - edad_meses).idxmin()
+
+
+def test_lms_por_dia_en_los_extremos(tabla):
+    dia_inicial, L_dia, _, _ = tabla.tabla_diaria()
+    dia_final = dia_inicial + len(L_dia) - 1
+    primera = (tabla.L[0], tabla.M[0], tabla.S[0])
+    ultima = (tabla.L[-1], tabla.M[-1], tabla.S[-1])
+
+    assert dia_inicial == int(cm.EDAD_MINIMA_MESES * cm.DIAS_POR_MES)
+    assert dia_final == math.ceil(cm.EDAD_MAXIMA_MESES * cm.DIAS_POR_MES)
+    # Antes de la primera fila (mes 61) y después de la última se usan los valores del extremo
+    for dia in (-1, 0, dia_inicial - 1, dia_inicial, int(61 * cm.DIAS_POR_MES)):
+        assert tabla.lms_por_dia(dia) == pytest.approx(primera, abs=0)
+    for dia in (dia_final, dia_final + 1, 10**6):
+        assert tabla.lms_por_dia(dia) == pytest.approx(ultima, abs=0)
+
+
+def test_lms_por_dia_coincide_con_la_tabla_en_meses_exactos(tabla):
+    # 16 meses son exactamente 487 días, así que esos días caen en una fila de la tabla
+    for mes in range(64, cm.EDAD_MAXIMA_MESES + 1, 16):
+        i = tabla.meses.index(mes)
+        dia = int(mes * cm.DIAS_POR_MES)
+        assert tabla.lms_por_dia(dia) == pytest.approx((tabla.L[i], tabla.M[i], tabla.S[i]), rel=1e-12)
+
+
+def test_lms_por_dia_interpola_entre_meses(tabla):
+    i = tabla.meses.index(100)
+    dia = int(100.5 * cm.DIAS_POR_MES)
+    fraccion = dia / cm.DIAS_POR_MES - 100
+    L, M, S = tabla.lms_por_dia(dia)
+    assert M == pytest.approx(tabla.M[i] + fraccion * (tabla.M[i + 1] - tabla.M[i]), rel=1e-12)
+    assert min(tabla.L[i], tabla.L[i + 1]) <= L <= max(tabla.L[i], tabla.L[i + 1])
+    assert min(tabla.S[i], tabla.S[i + 1]) <= S <= max(tabla.S[i], tabla.S[i + 1])